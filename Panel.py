@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 from pathlib import Path
 import plotly.express as px
 import json
 from scraper.scheduler import run_scrape_once
-from scraper.storage import init_db
+from scraper.storage import init_db, write_queue, storage_writer, load_observations, ARCHIVE_DIR
 from scraper.robot_parser import robot_manager
+from scraper.fingerprint import page_fingerprints
+from scraper.parser import set_parse_engine
+from scraper.parse_pool import parse_pool
+from scraper.extractors import register_extractor
+from scraper.selenium_fetcher import register_render_profile
+from scraper.rate_limiter import limiter, SqliteRateStore
 from analyzer import detect_price_changes
+from scraper.prices import normalize_prices
 
 # --- URLs to scrape ---
 URLS = {
@@ -28,6 +34,11 @@ def load_config():
 
 config = load_config()
 
+@st.cache_resource
+def shared_rate_store(path):
+    """Jeden magazyn limitera (i połączenie SQLite na wątek) na cały proces panelu."""
+    return SqliteRateStore(path)
+
 # --- 1. KONFIGURACJA STRONY ---
 st.set_page_config(
     page_title="Dashboard Analizy Danych",
@@ -50,10 +61,12 @@ def load_data():
             'region': pd.Series(dtype='object')
         })
     try:
-        conn = sqlite3.connect(db_path)
-        query = "SELECT * FROM scraped_data"
-        df = pd.read_sql_query(query, conn, parse_dates=['data_zdarzenia'])
-        conn.close()
+        # Panel nie używa waluty — z archiwum Parquet czytane są tylko potrzebne kolumny
+        archive_dir = Path(__file__).resolve().parent / config.get("archive_dir", ARCHIVE_DIR)
+        df = load_observations(columns=['data_zdarzenia', 'kategoria', 'wartosc', 'region'],
+                               path=str(db_path), archive_dir=str(archive_dir))
+        # Starsze wiersze mogą mieć cenę zapisaną jako tekst — normalizacja całej kolumny naraz
+        df['wartosc'] = normalize_prices(df['wartosc'])
         return df.sort_values(by='data_zdarzenia')
     except Exception as e:
         st.error(f"Wystąpił błąd podczas odczytu danych z bazy SQLite: {e}")
@@ -88,8 +101,23 @@ if st.sidebar.button("Uruchom jednorazowe pobranie"):
         else:
             robot_manager.disabled = False
         
+        if config.get("shared_rate_limits", True):
+            limiter.store = shared_rate_store(config.get("rate_limit_db", "rate_limits.db"))
+        page_fingerprints.configure(config.get("fingerprint_rules", {}))
+        if "parse_engine" in config:
+            set_parse_engine(config["parse_engine"])
+        for key, selectors in config.get("extractors", {}).items():
+            register_extractor(key, **selectors)
+        parse_pool.configure(config.get("parse_workers", 0))
+        write_queue.configure(config.get("write_queue_size", 64))
+        storage_writer.set_mode(config.get("storage_mode", "observations"))
+        for domain, profile in config.get("render_profiles", {}).items():
+            register_render_profile(domain, **profile)
+
         with st.spinner("Trwa pobieranie danych..."):
-            run_scrape_once(URLS)
+            run_scrape_once(URLS, concurrent=config.get("concurrent_fetch", False),
+                            streaming=config.get("streaming_fetch", False))
+            write_queue.flush()  # dane muszą być w bazie przed ponownym wczytaniem
 
         st.sidebar.success("Jednorazowe pobieranie zakończone!")
         st.cache_data.clear()
@@ -230,9 +258,8 @@ elif not df_filtrowane.empty:
             st.info("Wybierz co najmniej jeden produkt z filtrów powyżej, aby zobaczyć analizę trendu.")
         else:
             # Uruchom analizę zmian cen
-            # Konwersja DataFrame do formatu listy krotek oczekiwanego przez analyzer
-            history_list = [tuple(row) for row in df_filtrowane[['kategoria', 'wartosc', 'region', 'data_zdarzenia']].to_numpy()]
-            price_changes = detect_price_changes(history_list)
+            # Analyzer przyjmuje DataFrame bezpośrednio (kolumny w kolejności: produkt, cena, sklep, czas)
+            price_changes = detect_price_changes(df_filtrowane[['kategoria', 'wartosc', 'region', 'data_zdarzenia']])
     
             for produkt in wybrana_kategoria:
                 st.markdown(f"---")
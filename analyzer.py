@@ -1,106 +1,58 @@
-import sqlite3
 from datetime import datetime, timedelta
 from difflib import SequenceMatcher
-from bs4 import BeautifulSoup
-import re
 import argparse
+import pandas as pd
+from scraper import storage
+from scraper.prices import normalize_price, normalize_prices
 
 DB_PATH = "scraped_data.db"
-TABLE_NAME = "scraped_data"
+ARCHIVE_DIR = storage.ARCHIVE_DIR
+HISTORY_COLUMNS = ["name", "price", "shop", "timestamp"]
+# Raport czyta tylko te kolumny (bez waluty), także z archiwum Parquet
+REPORT_COLUMNS = ["kategoria", "wartosc", "region", "data_zdarzenia"]
 
 def load_history(date_from=None, date_to=None):
     """Pobiera dane z zadanego okresu do analizy."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    return storage.load_history(date_from, date_to, path=DB_PATH, archive_dir=ARCHIVE_DIR)
 
-    query = f"SELECT kategoria, wartosc, region, data_zdarzenia FROM {TABLE_NAME}"
-    params = []
 
-    if date_from and date_to:
-        query += " WHERE data_zdarzenia BETWEEN ? AND ?"
-        params.extend([date_from, date_to])
-    elif date_from:
-        query += " WHERE data_zdarzenia >= ?"
-        params.append(date_from)
-    elif date_to:
-        query += " WHERE data_zdarzenia <= ?"
-        params.append(date_to)
-
-    c.execute(query, params)
-
-    rows = c.fetchall()
-    conn.close()
-    return rows
-    
 def clean_price(raw):
     """Zamienia HTML lub string z walutą na float."""
-    if not raw:
-        return 0.0
-    if isinstance(raw, (int, float)):
-        return float(raw)
-    
-    text = raw
-    # jeśli HTML
-    if "<" in text:
-        soup = BeautifulSoup(text, "html.parser")
-        text = soup.get_text()
-    
-    # remove spaces
-    text = text.replace(' ', '')
-
-    # For formats like "1,234.56", remove thousand separators
-    if ',' in text and '.' in text:
-        text = text.replace(',', '')
-    # For formats like "123,45", treat comma as a decimal point
-    else:
-        text = text.replace(',', '.')
-    
-    numbers = re.findall(r"[\d.]+", text)
-    
-    if numbers:
-        try:
-            return float(numbers[0])
-        except ValueError:
-            return 0.0 # Błąd konwersji, np. dla "1.2.3"
-    return 0.0
-
-
-
+    return normalize_price(raw, default=0.0)
 
 
 def detect_price_changes(history):
-    """Wykrywa zmiany cen w historii."""
-    changes = {}
-    grouped = {}
-
-    for name, price, shop, timestamp in history:
-        price = clean_price(price)
-        key = name
-        grouped.setdefault(key, []).append((timestamp, price))
-
-    for key, entries in grouped.items():
-        entries.sort()
-
-        # Potrzebujemy co najmniej dwóch punktów danych do porównania.
-        if len(entries) < 2:
-            continue
-
-        old_price = entries[0][1]
-        new_price = entries[-1][1]
+    """
+    Wykrywa zmiany cen w historii.
+    history -> lista krotek (nazwa, cena, sklep, czas) albo DataFrame z kolumnami w tej kolejności;
+    ceny są normalizowane jedną operacją na całej kolumnie.
+    """
+    if len(history) == 0:
+        return {}
+    if isinstance(history, pd.DataFrame):
+        df = history.set_axis(HISTORY_COLUMNS, axis=1)
+    else:
+        df = pd.DataFrame(list(history), columns=HISTORY_COLUMNS)
+    df = df.assign(price=normalize_prices(df["price"], default=0.0).to_numpy())
 
-        # Unikaj dzielenia przez zero i upewnij się, że zmiana jest znacząca.
-        if old_price > 0 and abs(new_price - old_price) >= 0.01:
-            percent = (new_price - old_price) / old_price * 100
-            # Ignoruj mikroskopijne zmiany wynikające z błędów zaokrągleń.
-            if abs(percent) < 0.01:
-                continue
-            changes[key] = percent
+    # Najstarszy i najnowszy punkt dla każdego produktu (przy równym czasie decyduje cena)
+    df = df.sort_values(["timestamp", "price"], kind="stable")
+    grouped = df.groupby("name", sort=False)["price"]
+    summary = pd.DataFrame({"old": grouped.first(), "new": grouped.last(), "count": grouped.size()})
 
-    return changes
+    # Potrzebujemy co najmniej dwóch punktów danych do porównania.
+    # Unikaj dzielenia przez zero i upewnij się, że zmiana jest znacząca.
+    summary = summary[(summary["count"] >= 2) & (summary["old"] > 0)]
+    summary = summary[(summary["new"] - summary["old"]).abs() >= 0.01]
+    percent = (summary["new"] - summary["old"]) / summary["old"] * 100
+    # Ignoruj mikroskopijne zmiany wynikające z błędów zaokrągleń.
+    percent = percent[percent.abs() >= 0.01]
+    return {key: float(value) for key, value in percent.items()}
 
 
 def generate_report(date_from=None, date_to=None):
-    history = load_history(date_from, date_to)
+    history = storage.load_observations(date_from, date_to, columns=REPORT_COLUMNS, path=DB_PATH,
+                                        archive_dir=ARCHIVE_DIR)
 
     if date_from and date_to:
         period_str = f"od {date_from} do {date_to}"
@@ -115,8 +67,8 @@ def generate_report(date_from=None, date_to=None):
 
     # 1. Zmiany cen
     print("\n>>> ZMIANY CEN:")
-    price_changes = detect_price_changes(history)
-    product_names = sorted(list(set(item[0] for item in history)))
+    price_changes = detect_price_changes(history[REPORT_COLUMNS])
+    product_names = sorted(history["kategoria"].unique())
 
     if not product_names:
         print(f"Brak produktów w analizowanym okresie: {period_str}.")
@@ -0,0 +1,90 @@
+"""
+Archiwum Parquet kontra historia w SQLite: rozmiar na dysku oraz czas
+odczytu całej historii, jednego sklepu z jednego tygodnia (przycinanie
+partycji) i samych cen (przycinanie kolumn).
+
+Uruchomienie: python -m benchmarks.archive [produkty] [dni] [sklepy]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from scraper.archive import archive_available
+from scraper.storage import StorageWriter, archive_old_data, load_observations
+
+
+def fill(path, products, days, shops):
+    # Cztery cykle dziennie, od `days` dni temu do wczoraj
+    started_at = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    writer = StorageWriter(path)
+    try:
+        for cycle in range(days * 4):
+            ts = started_at + timedelta(hours=6 * cycle)
+            with writer.cycle():
+                for shop in range(shops):
+                    writer.write([
+                        {"name": f"Produkt {i}", "price": 10 + (i * 7 + cycle) % 997 / 10, "currency": "PLN"}
+                        for i in range(products)
+                    ], f"Shop {shop}", ts)
+    finally:
+        writer.close()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return started_at
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def timed(fn, **kwargs):
+    started = time.perf_counter()
+    result = fn(**kwargs)
+    return time.perf_counter() - started, result
+
+
+def main(products=500, days=60, shops=5):
+    if not archive_available():
+        print("[ERROR] Benchmark wymaga pakietu pyarrow.")
+        return 1
+    print(f"{products} produktów x {shops} sklepów, {days} dni po 4 cykle")
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_path = os.path.join(tmp, "sqlite.db")
+        archive_path = os.path.join(tmp, "archive.db")
+        archive_dir = os.path.join(tmp, "archive")
+        started_at = fill(sqlite_path, products, days, shops)
+        fill(archive_path, products, days, shops)
+        moved = archive_old_data(0, path=archive_path, archive_dir=archive_dir)
+        print(f"SQLite {os.path.getsize(sqlite_path) / 1024 / 1024:8.2f} MB, "
+              f"Parquet {dir_size(archive_dir) / 1024 / 1024:8.2f} MB ({moved} wierszy)")
+
+        week = {"date_from": started_at + timedelta(days=7), "date_to": started_at + timedelta(days=14),
+                "regions": ["Shop 1"]}
+        queries = (
+            ("cała historia", {}),
+            ("sklep, tydzień", week),
+            ("tylko ceny", {"columns": ["wartosc"]}),
+        )
+        empty = os.path.join(tmp, "brak")
+        for label, kwargs in queries:
+            hot, expected = timed(load_observations, path=sqlite_path, archive_dir=empty, **kwargs)
+            cold, result = timed(load_observations, path=archive_path, archive_dir=archive_dir, **kwargs)
+            print(f"{label:<15} SQLite {hot * 1000:8.1f} ms  Parquet {cold * 1000:8.1f} ms  x{hot / cold:4.1f}")
+            if len(result) != len(expected):
+                print(f"[ERROR] {label}: różna liczba wierszy ({len(expected)} / {len(result)})!")
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(main(
+        int(args[0]) if len(args) > 0 else 500,
+        int(args[1]) if len(args) > 1 else 60,
+        int(args[2]) if len(args) > 2 else 5,
+    ))
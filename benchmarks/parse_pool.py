@@ -0,0 +1,63 @@
+"""
+Skalowanie przepustowości parsowania z liczbą procesów ParsePool.
+
+Uruchomienie: python -m benchmarks.parse_pool [liczba_stron]
+"""
+import os
+import sys
+import time
+
+from benchmarks.parser import build_pages
+from scraper.parse_pool import ParsePool
+
+URLS = [
+    "https://scrapeme.live/shop/",
+    "https://books.toscrape.com/catalogue/page-1.html",
+    "https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops",
+]
+
+
+def run(workers, pages):
+    pool = ParsePool(workers=workers)
+    try:
+        if workers:
+            pool.parse_many(pages[:workers * 2])  # rozgrzanie: start procesów
+            pool.pages = pool.batches = 0
+        started = time.perf_counter()
+        results = pool.parse_many(pages)
+        return time.perf_counter() - started, results, pool.stats()
+    finally:
+        pool.close()
+
+
+def main(page_count=600):
+    templates = list(zip(build_pages(), URLS))
+    pages = [templates[i % len(templates)] for i in range(page_count)]
+    counts = [0] + [n for n in (1, 2, 4, 8, 16, 32) if n <= (os.cpu_count() or 1)]
+
+    # Komunikaty parsera (także z procesów roboczych) trafiają do /dev/null
+    stdout_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    sys.stdout.flush()
+    os.dup2(devnull, 1)
+    try:
+        measurements = [(workers, *run(workers, pages)) for workers in counts]
+    finally:
+        sys.stdout.flush()
+        os.dup2(stdout_fd, 1)
+        os.close(devnull)
+
+    print(f"{page_count} stron, {os.cpu_count()} rdzeni")
+    baseline_elapsed, reference = measurements[0][1], measurements[0][2]
+    for workers, elapsed, results, stats in measurements:
+        label = "w procesie" if workers == 0 else f"{workers} proc."
+        print(f"{label:<11} {page_count / elapsed:8.1f} stron/s  x{baseline_elapsed / elapsed:4.2f}"
+              f"  paczki: {stats['batches']} (śr. {stats['avg_batch']})")
+        if results != reference:
+            print(f"[ERROR] {label}: wyniki różnią się od parsowania w procesie!")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 600))
@@ -0,0 +1,64 @@
+"""
+Benchmark przepustowości silników parse_products (strony/s i MB/s).
+
+Uruchomienie: python -m benchmarks.parser [liczba_stron]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from scraper.parser import PARSE_ENGINES, parse_products
+
+PAGE_HEAD = "<html><head><title>Sklep</title><script>var tracking = {};</script></head><body><nav>" + \
+    "".join(f'<a class="menu-item" href="/c/{i}">Kategoria {i}</a>' for i in range(60)) + "</nav><main>"
+PAGE_TAIL = "</main><footer>" + "<p>Stopka sklepu</p>" * 30 + "</footer></body></html>"
+
+ITEM_TEMPLATES = {
+    "Shop A": '<li class="product type-product"><a class="woocommerce-LoopProduct-link" href="/p/{i}">'
+              '<img src="/img/{i}.png" alt=""><h2 class="woocommerce-loop-product__title">Produkt {i}</h2>'
+              '<span class="price"><span class="woocommerce-Price-amount amount"><bdi>{i},99'
+              '<span class="woocommerce-Price-currencySymbol">€</span></bdi></span></span></a></li>',
+    "Shop B": '<li class="col-xs-6"><article class="product_pod"><div class="image_container">'
+              '<a href="/b/{i}"><img src="/img/{i}.jpg" class="thumbnail" alt=""></a></div>'
+              '<h3><a href="/b/{i}" title="Książka {i}">Książka {i}...</a></h3>'
+              '<div class="product_price"><p class="price_color">£{i}.50</p></div></article></li>',
+    "Shop C": '<div class="col-md-4"><div class="thumbnail"><img class="img-responsive" src="/l/{i}.png">'
+              '<div class="caption"><h4 class="pull-right price">${i}.95</h4>'
+              '<h4><a href="/l/{i}" class="title" title="Laptop {i}">Laptop {i}</a></h4>'
+              '<p class="description">Opis laptopa {i}</p></div></div></div>',
+}
+
+
+def build_pages(products_per_page=40):
+    return [
+        PAGE_HEAD + "".join(template.format(i=i) for i in range(products_per_page)) + PAGE_TAIL
+        for template in ITEM_TEMPLATES.values()
+    ]
+
+
+def main(page_count=300):
+    pages = build_pages()
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages) * page_count / len(pages)
+
+    reference = None
+    for engine in PARSE_ENGINES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [parse_products(page, engine=engine) for page in pages]
+            started = time.perf_counter()
+            for i in range(page_count):
+                parse_products(pages[i % len(pages)], engine=engine)
+            elapsed = time.perf_counter() - started
+
+        print(f"{engine:<6} {page_count / elapsed:8.1f} stron/s  {total_bytes / elapsed / 1e6:7.2f} MB/s")
+        if reference is None:
+            reference = results
+        elif results != reference:
+            print(f"[ERROR] Silnik {engine} zwraca inne produkty niż bs4!")
+            return 1
+    print("[INFO] Wszystkie silniki zwracają identyczne produkty.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
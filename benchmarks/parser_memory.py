@@ -0,0 +1,78 @@
+"""
+Szczytowa pamięć parsowania jednej strony: pełne drzewo vs. tylko poddrzewa
+kontenerów produktów (SoupStrainer / przycinany HTMLPullParser).
+
+Uruchomienie: python -m benchmarks.parser_memory [produktów_na_stronę]
+
+tracemalloc widzi tylko alokacje Pythona, a drzewo lxml żyje w pamięci libxml2,
+dlatego każdy pomiar działa w osobnym procesie i podajemy też przyrost
+szczytowego RSS (ru_maxrss) oraz liczbę węzłów drzewa.
+"""
+import gc
+import multiprocessing
+import resource
+import sys
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from benchmarks.parser import ITEM_TEMPLATES
+from scraper.extractors import EXTRACTORS
+from scraper.parser import PARSE_ENGINES, get_parse_engine, _containers
+
+# Ciężkie elementy spoza siatki produktów: skrypty, menu, stopka
+NOISE = (
+    "<script>" + "window.dataLayer.push({event: 'view', id: 1});" * 400 + "</script>"
+    + "<nav>" + "".join(f'<a class="menu-item" href="/c/{i}"><span>Kategoria {i}</span></a>' for i in range(800)) + "</nav>"
+)
+FOOTER = "<footer>" + "<p class='note'>Informacje o sklepie i regulamin.</p>" * 400 + "</footer>"
+
+SHOPS = {
+    "Shop A": "scrapeme.live",
+    "Shop B": "books.toscrape.com",
+    "Shop C": "webscraper.io",
+}
+
+
+def build_page(template, products):
+    return ("<html><head>" + NOISE + "</head><body><main>"
+            + "".join(template.format(i=i) for i in range(products)) + "</main>" + FOOTER + "</body></html>")
+
+
+def measure(engine_name, shop, products, strained):
+    """Pomiar w świeżym procesie: (szczyt tracemalloc, przyrost szczytowego RSS, węzły, produkty)."""
+    engine = get_parse_engine(engine_name)
+    html = build_page(ITEM_TEMPLATES[shop], products)
+    extractor = EXTRACTORS[SHOPS[shop]]
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    tree = engine.load(html, _containers([extractor]) if strained else None)
+    nodes = len(tree.find_all(True)) if isinstance(tree, BeautifulSoup) else sum(1 for _ in tree.iter())
+    products = engine.extract(tree, extractor)
+    engine.release(tree)
+    del tree
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    return peak, rss_growth, nodes, products
+
+
+def main(products=2000):
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for shop in SHOPS:
+            size = len(build_page(ITEM_TEMPLATES[shop], products))
+            print(f"{shop}: strona {size / 1024:.0f} KB, {products} produktów")
+            for name in PARSE_ENGINES:
+                full = pool.apply(measure, (name, shop, products, False))
+                part = pool.apply(measure, (name, shop, products, True))
+                if full[3] != part[3]:
+                    print(f"[ERROR] {name}: częściowe drzewo zwraca inne produkty!")
+                    return 1
+                print(f"  {name:<5} Python {full[0] / 1e6:6.2f} -> {part[0] / 1e6:6.2f} MB, "
+                      f"RSS {full[1] / 1e6:6.2f} -> {part[1] / 1e6:6.2f} MB, węzły {full[2]} -> {part[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,54 @@
+"""
+Normalizacja cen: pętla po wierszach (normalize_price) kontra jedna operacja
+na całej kolumnie (normalize_prices).
+
+Uruchomienie: python -m benchmarks.prices [liczba_wierszy]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from scraper.prices import normalize_price, normalize_prices
+
+# Zapisy cen spotykane w bazie: liczby, tekst z walutą, HTML, różne separatory
+SAMPLES = [
+    54.99, 120, "123,45 zł", "£51.77", "Price: $1 234.56", "<span>1,000.99</span>",
+    "1.234,56 €", "99", "No price", None, "€ 7,50", "2 499,00 PLN",
+]
+# Pętla po wierszach jest mierzona na próbce i ekstrapolowana
+LOOP_SAMPLE = 100_000
+
+
+def measure(label, column, rows):
+    sample = column.iloc[:LOOP_SAMPLE]
+    started = time.perf_counter()
+    looped = [normalize_price(value, default=0.0) for value in sample]
+    loop_elapsed = (time.perf_counter() - started) * rows / len(sample)
+
+    started = time.perf_counter()
+    vectorized = normalize_prices(column, default=0.0)
+    vector_elapsed = time.perf_counter() - started
+
+    print(f"{label}: {rows} wierszy, {column.nunique(dropna=False)} unikalnych")
+    print(f"  pętla (normalize_price)      {loop_elapsed:7.2f} s (ekstrapolacja z {len(sample)})")
+    print(f"  kolumna (normalize_prices)   {vector_elapsed:7.2f} s  x{loop_elapsed / vector_elapsed:4.1f}")
+    return vectorized.iloc[:LOOP_SAMPLE].tolist() == looped
+
+
+def main(rows=1_000_000):
+    repeated = pd.Series(np.resize(np.array(SAMPLES, dtype=object), rows))
+    # Najgorszy przypadek: każda cena inna
+    unique = pd.Series([f"{i / 100:,.2f} zł" for i in range(rows)], dtype=object)
+
+    ok = measure("historia (powtarzające się ceny)", repeated, rows)
+    ok = measure("same unikalne ceny", unique, rows) and ok
+    if not ok:
+        print("[ERROR] Wyniki wsadowe różnią się od normalize_price!")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,63 @@
+"""
+Mikrobenchmark: CompiledRobots vs urllib.robotparser.RobotFileParser.
+
+Uruchomienie: python -m benchmarks.robots_matcher [liczba_url]
+"""
+import random
+import sys
+import time
+from urllib import robotparser
+
+from scraper.robots_matcher import CompiledRobots
+
+
+def build_robots_txt(rule_count=200):
+    lines = ["User-agent: *"]
+    for i in range(rule_count):
+        lines.append(f"Disallow: /private-{i}/")
+    lines.append("Allow: /")
+    return "\n".join(lines)
+
+
+def build_urls(count, rule_count=200, distinct_paths=5000):
+    rng = random.Random(42)
+    urls = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            path = f"/private-{rng.randrange(rule_count)}/item-{rng.randrange(distinct_paths)}"
+        else:
+            path = f"/product/{rng.randrange(distinct_paths)}/?page={rng.randrange(20)}"
+        urls.append("https://shop.example" + path)
+    return urls
+
+
+def measure(label, fn, urls):
+    started = time.perf_counter()
+    results = fn(urls)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed * 1000:8.1f} ms  {len(urls) / elapsed:12.0f} URL/s")
+    return results
+
+
+def main(count=50000):
+    text = build_robots_txt()
+    urls = build_urls(count)
+
+    stdlib = robotparser.RobotFileParser()
+    stdlib.parse(text.splitlines())
+    compiled = CompiledRobots(text)
+
+    print(f"{count} URL, 200 reguł")
+    expected = measure("urllib.robotparser", lambda u: [stdlib.can_fetch("*", url) for url in u], urls)
+    cold = measure("CompiledRobots (zimny cache)", lambda u: compiled.can_fetch_many("*", u), urls)
+    warm = measure("CompiledRobots (ciepły cache)", lambda u: compiled.can_fetch_many("*", u), urls)
+
+    if expected != cold or expected != warm:
+        print("[ERROR] Wyniki różnią się od urllib.robotparser!")
+        return 1
+    print("[INFO] Wyniki zgodne z urllib.robotparser.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000))
@@ -0,0 +1,149 @@
+"""
+Przepustowość zapisu: dotychczasowa ścieżka (DataFrame + nowe połączenie
++ to_sql w trybie rollback journal) kontra StorageWriter (WAL, jedno
+połączenie, executemany, group commit), oraz odczyt historii jednego
+produktu: skan starej tabeli kontra indeksy pokrywające schematu znormalizowanego.
+
+Uruchomienie: python -m benchmarks.storage [rozmiar_paczki ...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from scraper.storage import StorageWriter, TABLE_NAME, load_observations
+
+SIZES = (1_000, 100_000, 1_000_000)
+# Paczka jest dzielona na źródła, jak w jednym cyklu scrapera
+SOURCES = 10
+
+# Stara, jedna tabela (przed schematem znormalizowanym)
+LEGACY_TABLE = f"""
+    CREATE TABLE {TABLE_NAME} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data_zdarzenia TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        kategoria TEXT NOT NULL,
+        wartosc REAL NOT NULL,
+        waluta TEXT,
+        region TEXT NOT NULL
+    )
+"""
+
+
+def build_batches(size):
+    per_source = size // SOURCES
+    return [
+        (f"Shop {s}", [
+            {"name": f"Produkt {s}-{i}", "price": 10 + (i % 997) / 100, "currency": "PLN"}
+            for i in range(per_source)
+        ])
+        for s in range(SOURCES)
+    ]
+
+
+def legacy_save(path, products, source):
+    """Odtworzenie save_products sprzed StorageWriter."""
+    df = pd.DataFrame(products)
+    df['region'] = source
+    df.rename(columns={'name': 'kategoria', 'price': 'wartosc', 'currency': 'waluta'}, inplace=True)
+    df['data_zdarzenia'] = datetime.now()
+    conn = sqlite3.connect(path)
+    df.to_sql(TABLE_NAME, conn, if_exists='append', index=False)
+    conn.close()
+
+
+def run_legacy(path, batches):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_TABLE)
+    conn.close()
+    for source, products in batches:
+        legacy_save(path, products, source)
+
+
+def run_writer(path, batches):
+    writer = StorageWriter(path)
+    try:
+        with writer.cycle():
+            for source, products in batches:
+                writer.write(products, source)
+    finally:
+        writer.close()
+
+
+def run_writer_next_cycle(path, batches):
+    """Kolejny cykl tego samego procesu: produkty i sklepy są już w słownikach."""
+    writer = StorageWriter(path)
+    try:
+        with writer.cycle():
+            for source, products in batches:
+                writer.write(products, source)
+        started = time.perf_counter()
+        with writer.cycle():
+            for source, products in batches:
+                writer.write(products, source)
+        return time.perf_counter() - started
+    finally:
+        writer.close()
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def read_legacy(path, name):
+    conn = sqlite3.connect(path)
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {TABLE_NAME} WHERE kategoria = ?", conn, params=[name])
+    finally:
+        conn.close()
+
+
+def read_normalized(path, name):
+    return load_observations(products=[name], path=path)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main(sizes=SIZES):
+    for size in sizes:
+        batches = build_batches(size)
+        rows = sum(len(products) for _, products in batches)
+        line = f"{rows:>9} wierszy"
+        rates = {}
+        reads = {}
+        for label, run, read in (("to_sql", run_legacy, read_legacy), ("StorageWriter", run_writer, read_normalized)):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.db")
+                elapsed, _ = timed(run, path, batches)
+                if count_rows(path) != rows:
+                    print(f"[ERROR] {label}: zapisano złą liczbę wierszy!")
+                    return 1
+                reads[label], history = timed(read, path, "Produkt 3-42")
+                if len(history) != 1:
+                    print(f"[ERROR] {label}: zły wynik odczytu!")
+                    return 1
+            rates[label] = rows / elapsed
+            line += f"  {label}: {rates[label]:>10,.0f} wierszy/s"
+        print(f"{line}  x{rates['StorageWriter'] / rates['to_sql']:4.1f}")
+        with tempfile.TemporaryDirectory() as tmp:
+            steady = rows / run_writer_next_cycle(os.path.join(tmp, "bench.db"), batches)
+        print(f"{'':>17}kolejny cykl (znane produkty): {steady:>10,.0f} wierszy/s")
+        print(f"{'':>17}odczyt produktu: skan {reads['to_sql'] * 1000:8.1f} ms, "
+              f"indeks {reads['StorageWriter'] * 1000:6.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main([int(arg) for arg in sys.argv[1:]] or SIZES))
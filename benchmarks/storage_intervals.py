@@ -0,0 +1,71 @@
+"""
+Zapis tylko zmian cen (mode="intervals") kontra obserwacja w każdym cyklu:
+rozmiar bazy, czas zapisu cyklu i czas odczytu całej historii.
+
+Uruchomienie: python -m benchmarks.storage_intervals [produkty] [cykle] [odsetek_zmian]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from scraper.storage import StorageWriter, load_observations
+
+
+def simulate(path, mode, products, cycles, change_rate):
+    rng = random.Random(42)
+    prices = [round(rng.uniform(10, 500), 2) for _ in range(products)]
+    started_at = datetime(2024, 1, 1)
+    writer = StorageWriter(path, mode=mode)
+    elapsed = 0.0
+    try:
+        for cycle in range(cycles):
+            for i in rng.sample(range(products), int(products * change_rate)):
+                prices[i] = round(prices[i] * rng.uniform(0.9, 1.1), 2)
+            batch = [{"name": f"Produkt {i}", "price": price, "currency": "PLN"} for i, price in enumerate(prices)]
+            started = time.perf_counter()
+            writer.write(batch, "Shop A", started_at + timedelta(hours=cycle))
+            elapsed += time.perf_counter() - started
+    finally:
+        writer.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return elapsed / cycles, os.path.getsize(path)
+
+
+def main(products=2000, cycles=200, change_rate=0.02):
+    print(f"{products} produktów, {cycles} cykli, {change_rate:.0%} zmian cen na cykl")
+    results = {}
+    for mode in ("observations", "intervals"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            per_cycle, size = simulate(path, mode, products, cycles, change_rate)
+            started = time.perf_counter()
+            history = load_observations(path=path)
+            read = time.perf_counter() - started
+            latest = history.sort_values("data_zdarzenia").groupby("kategoria")["wartosc"].last()
+        results[mode] = (size, read, latest)
+        print(f"{mode:<13} baza {size / 1024 / 1024:8.2f} MB  cykl {per_cycle * 1000:7.1f} ms  "
+              f"odczyt historii {read * 1000:8.1f} ms ({len(history)} wierszy)")
+
+    (obs_size, obs_read, obs_latest), (int_size, int_read, int_latest) = results.values()
+    print(f"mniejsza baza x{obs_size / int_size:.1f}, szybszy odczyt x{obs_read / int_read:.1f}")
+    if not obs_latest.equals(int_latest):
+        print("[ERROR] Ostatnie ceny różnią się między trybami!")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(main(
+        int(args[0]) if len(args) > 0 else 2000,
+        int(args[1]) if len(args) > 1 else 200,
+        float(args[2]) if len(args) > 2 else 0.02,
+    ))
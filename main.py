@@ -1,7 +1,13 @@
 import json
 from scraper.scheduler import run_scheduler
-from scraper.storage import init_db
+from scraper.storage import init_db, write_queue, storage_writer, ARCHIVE_DIR
 from scraper.robot_parser import robot_manager
+from scraper.fingerprint import page_fingerprints
+from scraper.parser import set_parse_engine
+from scraper.parse_pool import parse_pool
+from scraper.extractors import register_extractor
+from scraper.selenium_fetcher import driver_pool, register_render_profile
+from scraper.rate_limiter import limiter, SqliteRateStore
 
 def main():
     """
@@ -41,6 +47,38 @@ def main():
         robot_manager.disabled = False
         print("Sprawdzanie robots.txt jest włączone (zgodnie z config.json).")
 
+    # Wspólny (międzyprocesowy) stan limitów żądań
+    if config.get("shared_rate_limits", True):
+        limiter.store = SqliteRateStore(config.get("rate_limit_db", "rate_limits.db"))
+
+    # Liczba równoległych przeglądarek Selenium
+    driver_pool.max_size = config.get("selenium_pool_size", driver_pool.max_size)
+    for domain, profile in config.get("render_profiles", {}).items():
+        register_render_profile(domain, **profile)
+
+    # Reguły normalizacji HTML dla odcisków stron
+    page_fingerprints.configure(config.get("fingerprint_rules", {}))
+
+    # Silnik parsowania HTML (lxml lub referencyjny bs4)
+    if "parse_engine" in config:
+        print(f"Silnik parsowania: {set_parse_engine(config['parse_engine'])}")
+
+    # Dodatkowe sklepy: domena (lub domena/ścieżka) -> selektory produktów
+    for key, selectors in config.get("extractors", {}).items():
+        register_extractor(key, **selectors)
+
+    # Równoległe parsowanie w puli procesów (0 = w procesie głównym)
+    parse_pool.configure(config.get("parse_workers", 0))
+    if parse_pool.enabled:
+        print(f"Parsowanie w puli {parse_pool.workers} procesów.")
+
+    # Zapis do bazy w tle (pojemność kolejki w paczkach, 0 = zapis synchroniczny)
+    write_queue.configure(config.get("write_queue_size", 64))
+
+    # Zapis tylko zmian cen (przedziały) zamiast każdej obserwacji
+    if storage_writer.set_mode(config.get("storage_mode", "observations")) == "intervals":
+        print("Zapis zmian cen: nowy wiersz tylko przy zmianie ceny.")
+
     init_db()
 
     urls = {
@@ -57,10 +95,24 @@ def main():
         print(f"Powiadomienia email włączone. Wysyłanie na: {email_config.get('email_address')}")
     else:
         print("Powiadomienia email wyłączone.")
+    concurrent = config.get("concurrent_fetch", False)
+    if concurrent:
+        print("Tryb współbieżny włączony — domeny pobierane są równolegle.")
+    streaming = config.get("streaming_fetch", False)
+    if streaming:
+        print("Tryb strumieniowy włączony — produkty znanych sklepów parsowane są w trakcie pobierania.")
+    # Archiwum Parquet dla starych obserwacji (0 = cała historia w SQLite)
+    archive_after_days = config.get("archive_after_days", 0)
+    if archive_after_days:
+        print(f"Archiwizacja włączona — obserwacje starsze niż {archive_after_days} dni trafiają do "
+              f"{config.get('archive_dir', ARCHIVE_DIR)}.")
     print("Aby zatrzymać, naciśnij Ctrl+C.")
     
     try:
-        run_scheduler(urls, interval_minutes=interval, email_config=email_config)
+        run_scheduler(urls, interval_minutes=interval, email_config=email_config, concurrent=concurrent,
+                      streaming=streaming, archive_after_days=archive_after_days,
+                      archive_dir=config.get("archive_dir", ARCHIVE_DIR),
+                      archive_compression=config.get("archive_compression", "zstd"))
     except KeyboardInterrupt:
         print("\nZatrzymano cykliczne pobieranie.")
     except Exception as e:
@@ -0,0 +1,105 @@
+import os
+import time
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # bez pyarrow archiwum jest wyłączone, historia zostaje w SQLite
+    pa = ds = pq = None
+
+ARCHIVE_DIR = "archive"
+# Kolumny partycji (katalogi date=YYYY-MM-DD/region=...)
+PARTITIONS = ("date", "region")
+# Kolumny archiwum -> kolumny DataFrame z load_observations
+COLUMNS = {
+    "ts": "data_zdarzenia",
+    "product": "kategoria",
+    "price": "wartosc",
+    "currency": "waluta",
+    "region": "region",
+}
+
+
+def archive_available():
+    return pq is not None
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("date", pa.string()), ("region", pa.string())]), flavor="hive")
+
+
+def write_archive(df, archive_dir=ARCHIVE_DIR, compression="zstd"):
+    """
+    Dopisuje obserwacje (kolumny ts [epoka], product, price, currency, region)
+    do archiwum Parquet partycjonowanego po dniu i sklepie. Nazwy produktów
+    i walut są kodowane słownikowo. Zwraca liczbę zapisanych wierszy.
+    """
+    if df.empty:
+        return 0
+    ts = pd.to_datetime(df["ts"], unit="s")
+    table = pa.table({
+        "ts": pa.array(ts.to_numpy(dtype="datetime64[s]"), type=pa.timestamp("s")),
+        "product": pa.array(df["product"], type=pa.string()).dictionary_encode(),
+        "price": pa.array(df["price"], type=pa.float64()),
+        "currency": pa.array(df["currency"], type=pa.string()).dictionary_encode(),
+        "date": pa.array(ts.dt.strftime("%Y-%m-%d"), type=pa.string()),
+        "region": pa.array(df["region"], type=pa.string()),
+    })
+    # Unikalna nazwa pliku: kolejne kompaktowania dopisują pliki do istniejących partycji
+    pq.write_to_dataset(
+        table,
+        archive_dir,
+        partitioning=_partitioning(),
+        basename_template=f"part-{time.time_ns()}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        compression=compression,
+        use_dictionary=True,
+    )
+    return len(table)
+
+
+def _day(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _second(value):
+    return pa.scalar(pd.Timestamp(value).floor("s").to_pydatetime(), pa.timestamp("s"))
+
+
+def load_archive(date_from=None, date_to=None, products=None, regions=None, columns=None,
+                 archive_dir=ARCHIVE_DIR):
+    """
+    Obserwacje z archiwum jako DataFrame (kolumny jak w load_observations).
+    Filtry po dniu i sklepie odrzucają całe katalogi partycji bez ich czytania,
+    a czytane są tylko kolumny z `columns` (nazwy kolumn DataFrame).
+    """
+    wanted = list(columns or COLUMNS.values())
+    if not archive_available() or not os.path.isdir(archive_dir):
+        return pd.DataFrame(columns=wanted)
+
+    dataset = ds.dataset(archive_dir, format="parquet", partitioning=_partitioning())
+    conditions = []
+    if date_from:
+        conditions.append(ds.field("date") >= _day(date_from))
+        conditions.append(ds.field("ts") >= _second(date_from))
+    if date_to:
+        conditions.append(ds.field("date") <= _day(date_to))
+        conditions.append(ds.field("ts") <= _second(date_to))
+    if regions:
+        conditions.append(ds.field("region").isin(list(regions)))
+    if products:
+        conditions.append(ds.field("product").isin(list(products)))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    source = {name: column for column, name in COLUMNS.items()}
+    table = dataset.to_table(columns=[source[name] for name in wanted], filter=expression)
+    df = table.to_pandas()
+    df.columns = wanted
+    for name in ("kategoria", "waluta"):
+        if name in df and isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(object)
+    return df
@@ -0,0 +1,143 @@
+import re
+import threading
+from urllib.parse import urlparse
+
+# Rejestr ekstraktorów: klucz (domena lub domena/ścieżka) -> selektory sklepu.
+# item -> kontener produktu, name / price -> selektory względem kontenera,
+# name_attr -> atrybut z nazwą; name_fallback -> gdy brak atrybutu, bierzemy tekst
+EXTRACTORS = {}
+
+# Domeny, dla których zarejestrowano klucze ze ścieżką (np. "shop.example/sklep")
+_path_domains = set()
+
+# Indeks odcisku strukturalnego: klasa CSS kontenera -> klucze ekstraktorów
+_by_item_class = {}
+
+# Domeny bez wpisu w rejestrze, dla których odcisk wskazał ekstraktor
+_learned = {}
+_lock = threading.Lock()
+
+_CLASS_ATTR = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+
+
+def _selector_classes(selector):
+    """Klasy CSS występujące w prostym selektorze (".pull-right.price" -> {"pull-right", "price"})."""
+    return {cls for part in selector.split() for cls in part.split(".")[1:] if cls}
+
+
+def _container(selector):
+    """
+    (tag, klasy) kontenera dla prostego selektora ("article.product_pod"),
+    używane do budowy tylko potrzebnych poddrzew. None dla selektorów złożonych.
+    """
+    if " " in selector.strip() or ">" in selector:
+        return None
+    tag, *classes = selector.strip().split(".")
+    classes = frozenset(cls for cls in classes if cls)
+    return (tag or None, classes) if classes else None
+
+
+def register_extractor(key, item, name, price, name_attr=None, name_fallback=True, label=None):
+    """
+    Rejestruje ekstraktor sklepu.
+    key -> domena ("shop.example") lub domena ze ścieżką ("shop.example/katalog")
+    """
+    key = key.lower().strip("/")
+    if key.startswith("www."):
+        key = key[4:]
+    extractor = {
+        "key": key,
+        "label": label or key,
+        "item": item,
+        "name": name,
+        "price": price,
+        "name_attr": name_attr,
+        "name_fallback": name_fallback,
+        "container": _container(item),
+        "signature": frozenset(_selector_classes(item) | _selector_classes(name) | _selector_classes(price)),
+    }
+    with _lock:
+        EXTRACTORS[key] = extractor
+        if "/" in key:
+            _path_domains.add(key.split("/", 1)[0])
+        for cls in _selector_classes(item):
+            keys = _by_item_class.setdefault(cls, [])
+            if key not in keys:
+                keys.append(key)
+        _learned.clear()
+    return extractor
+
+
+def _host(parsed):
+    host = parsed.netloc.lower().split(":", 1)[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def extractor_for(url):
+    """
+    Zwraca ekstraktor dla adresu URL: najpierw najdłuższy pasujący klucz
+    ze ścieżką, potem domena (i jej domeny nadrzędne), na końcu domena
+    rozpoznana wcześniej po odcisku strukturalnym. None, gdy brak.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    host = _host(parsed)
+    labels = host.split(".")
+    for i in range(max(len(labels) - 1, 1)):
+        domain = ".".join(labels[i:])
+        if domain in _path_domains:
+            segments = [segment for segment in parsed.path.lower().split("/") if segment]
+            for depth in range(len(segments), 0, -1):
+                extractor = EXTRACTORS.get(domain + "/" + "/".join(segments[:depth]))
+                if extractor:
+                    return extractor
+        extractor = EXTRACTORS.get(domain)
+        if extractor:
+            return extractor
+    return EXTRACTORS.get(_learned.get(host))
+
+
+def remember_extractor(url, extractor):
+    """Zapamiętuje ekstraktor rozpoznany po odcisku dla domeny spoza rejestru."""
+    if url:
+        with _lock:
+            _learned[_host(urlparse(url))] = extractor["key"]
+
+
+def class_tokens(html):
+    """Odcisk strukturalny strony: zbiór klas CSS (jeden przebieg regexem, bez budowy drzewa)."""
+    tokens = set()
+    for match in _CLASS_ATTR.finditer(html):
+        tokens.update((match.group(1) or match.group(2) or "").split())
+    return tokens
+
+
+def guess_extractors(html):
+    """
+    Ekstraktory, których wszystkie klasy (kontener, nazwa, cena) występują
+    na stronie — kolejność jak w rejestrze. Używane dla nieznanych domen.
+    """
+    tokens = class_tokens(html)
+    keys = set()
+    for cls in tokens:
+        keys.update(_by_item_class.get(cls, ()))
+    return [
+        extractor for key, extractor in EXTRACTORS.items()
+        if key in keys and extractor["signature"] <= tokens
+    ]
+
+
+def ready_selector(url):
+    """Selektor kontenera produktów dla Selenium (strona gotowa, gdy się pojawi)."""
+    extractor = extractor_for(url)
+    return extractor["item"] if extractor else None
+
+
+# --- Wbudowane sklepy ---
+register_extractor("scrapeme.live", item=".product", name=".woocommerce-loop-product__title", price=".price",
+                   label="Shop A")
+register_extractor("books.toscrape.com", item=".product_pod", name="h3 a", price=".price_color",
+                   name_attr="title", name_fallback=False, label="Shop B")
+register_extractor("webscraper.io", item=".thumbnail", name=".title", price=".pull-right.price",
+                   name_attr="title", label="Shop C (webscraper.io)")
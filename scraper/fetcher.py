@@ -1,13 +1,17 @@
 import requests
 from requests.exceptions import HTTPError
 from .selenium_fetcher import fetch_html_selenium
-from .rate_limiter import limiter
+from .rate_limiter import limiter, parse_retry_after
 from .robot_parser import robot_manager
+from .http_session import session_manager
+from .http_cache import validator_cache, NOT_MODIFIED
+from .strategy import strategy_memory, MIN_HTML_SIZE
 from urllib.parse import urlparse
 
 def fetch_html(url, retries=1):
     """
     Pobiera kod HTML z podanego adresu URL, uwzględniając robots.txt i rate limiting.
+    Wysyła warunkowe GET (ETag / Last-Modified) — przy odpowiedzi 304 zwraca NOT_MODIFIED.
     """
     if not robot_manager.can_fetch(url):
         print(f"[INFO] Pobieranie {url} zabronione przez robots.txt")
@@ -19,13 +23,26 @@ def fetch_html(url, retries=1):
     
     print(f"[INFO] Pobieram {url}...")
     try:
-        response = requests.get(url, timeout=10)
+        headers = validator_cache.conditional_headers(url)
+        if headers:
+            response = session_manager.get(url, timeout=10, headers=headers)
+        else:
+            response = session_manager.get(url, timeout=10)
+        if response.status_code == 304:
+            print(f"[INFO] {url} bez zmian (304 Not Modified).")
+            limiter.record_success(url, response.elapsed.total_seconds())
+            validator_cache.record_hit(url)
+            return NOT_MODIFIED
         response.raise_for_status()  # Rzuci wyjątkiem dla kodów 4xx/5xx
+        limiter.record_success(url, response.elapsed.total_seconds())
+        validator_cache.record_miss(url, response)
         return response.text
     except HTTPError as e:
+        if e.response.status_code >= 500:
+            limiter.record_error(url, e.response.status_code, parse_retry_after(e.response.headers.get("Retry-After")))
         if e.response.status_code == 429:
             print(f"[WARNING] Otrzymano błąd 429 (Too Many Requests) dla {url}.")
-            limiter.handle_error_429(url)
+            limiter.handle_error_429(url, retry_after=parse_retry_after(e.response.headers.get("Retry-After")))
             if retries > 0:
                 print("[INFO] Ponawiam próbę pobrania...")
                 return fetch_html(url, retries - 1)
@@ -40,11 +57,32 @@ def fetch_with_fallback(url, wait_selector=None):
     """
     1. Próbuje pobrać Requests
     2. Jeśli HTML jest pusty lub za krótki → Selenium
+    Jeśli pamięć strategii wskazuje, że dla tego adresu działa tylko Selenium,
+    krok 1 jest pomijany.
+    Odpowiedź 304 (NOT_MODIFIED) jest zwracana bez zmian.
     """
+    if strategy_memory.choose(url) == "selenium":
+        print(f"[INFO] Strategia dla {url}: od razu Selenium.")
+        # Produkty z Selenium nie mogą trafić pod walidatory wcześniejszej odpowiedzi
+        # Requests (np. szkieletu strony JS) — inaczej kolejne 304 zamroziłyby ceny
+        validator_cache.invalidate(url)
+        html = fetch_html_selenium(url, wait_selector=wait_selector)
+        strategy_memory.record_fetch(url, "selenium", html)
+        return html
+
     html = fetch_html(url)
 
-    if html is None or len(html) < 2000:
+    if html is NOT_MODIFIED:
+        strategy_memory.record_not_modified(url)
+        return html
+
+    strategy_memory.record_fetch(url, "requests", html)
+
+    if html is None or len(html) < MIN_HTML_SIZE:
         print("[INFO] Przełączam na Selenium...")
+        # Walidatory dotyczą odpowiedzi Requests, a nie treści z Selenium
+        validator_cache.invalidate(url)
         html = fetch_html_selenium(url, wait_selector=wait_selector) 
+        strategy_memory.record_fetch(url, "selenium", html)
 
     return html
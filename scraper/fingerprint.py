@@ -0,0 +1,108 @@
+import hashlib
+import re
+import threading
+from .json_store import load_json, save_json
+
+FINGERPRINT_FILE = "fingerprints.json"
+
+# Domyślne reguły usuwające zmienne tokeny (nonce, CSRF, znaczniki czasu cache-bustingu)
+DEFAULT_RULES = [
+    r'\snonce="[^"]*"',
+    r'<meta[^>]+name="csrf[^"]*"[^>]*>',
+    r'<input[^>]+name="[^"]*(?:csrf|_token|nonce)[^"]*"[^>]*>',
+    r'[?&](?:ver|v|_)=\d+',
+]
+
+_WHITESPACE = re.compile(r"\s+")
+_BETWEEN_TAGS = re.compile(r">\s+<")
+
+
+class PageFingerprints:
+    """
+    Odciski (hash) znormalizowanego HTML zapisywane per źródło.
+
+    Jeśli strona po normalizacji jest identyczna jak w poprzednim cyklu,
+    scheduler pomija parsowanie BeautifulSoup i zapis do bazy, używając
+    zapamiętanej listy produktów.
+    """
+
+    def __init__(self, path=FINGERPRINT_FILE, rules=None):
+        self.path = path
+        self.default_rules = list(DEFAULT_RULES if rules is None else rules)
+        self.source_rules = {}
+        self.entries = {}
+        self._compiled = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def configure(self, rules_by_source):
+        """Ustawia dodatkowe reguły normalizacji (wyrażenia regularne) per źródło."""
+        with self._lock:
+            self.source_rules = {source: list(rules) for source, rules in (rules_by_source or {}).items()}
+            self._compiled = {}
+
+    def _pattern_for(self, source):
+        pattern = self._compiled.get(source)
+        if pattern is None:
+            rules = self.default_rules + self.source_rules.get(source, [])
+            pattern = re.compile("|".join(f"(?:{rule})" for rule in rules), re.IGNORECASE) if rules else None
+            self._compiled[source] = pattern
+        return pattern
+
+    def normalize(self, source, html):
+        """Usuwa zmienne tokeny i nadmiarowe białe znaki."""
+        with self._lock:
+            pattern = self._pattern_for(source)
+        if pattern is not None:
+            html = pattern.sub("", html)
+        html = _BETWEEN_TAGS.sub("><", html)
+        return _WHITESPACE.sub(" ", html).strip()
+
+    def fingerprint(self, source, html):
+        """Zwraca hash znormalizowanego HTML."""
+        normalized = self.normalize(source, html)
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        self.entries = load_json(self.path)
+
+    def cached_products(self, source, digest):
+        """
+        Zwraca zapamiętane produkty, jeśli hash strony się nie zmienił.
+        Pusta lista (np. z pliku zapisanego przez starszą wersję) to brak trafienia.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(source)
+            if entry and entry.get("hash") == digest and entry.get("products"):
+                return entry["products"]
+            return None
+
+    def remember(self, source, digest, products):
+        """
+        Zapamiętuje produkty dla hasha strony, z której powstały.
+        Strona bez produktów nie jest zapamiętywana, żeby kolejny cykl znów
+        spróbował parsowania i Selenium.
+        """
+        if not products:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            self.entries[source] = {"hash": digest, "products": list(products)}
+            self._dirty = True
+
+    def save(self):
+        """Zapisuje odciski na dysk (tylko jeśli coś się zmieniło)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            save_json(self.path, self.entries)
+            self._dirty = False
+
+
+# Global instance
+page_fingerprints = PageFingerprints()
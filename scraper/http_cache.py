@@ -0,0 +1,155 @@
+import json
+import threading
+from collections import OrderedDict
+from .json_store import load_json, save_json
+
+CACHE_FILE = "http_cache.json"
+
+
+class _NotModified:
+    """Znacznik zwracany przez fetch_html, gdy serwer odpowiedział 304."""
+
+    def __repr__(self):
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = _NotModified()
+
+
+class ValidatorCache:
+    """
+    Trwały cache walidatorów HTTP (ETag / Last-Modified) kluczowany adresem URL.
+
+    Razem z walidatorami przechowuje listę produktów sparsowaną z danej
+    strony, dzięki czemu odpowiedź 304 pozwala pominąć parsowanie i zapis.
+    Najdawniej używane wpisy są usuwane, gdy łączny rozmiar wpisów po serializacji
+    do JSON przekroczy `max_bytes` (to ogranicza pamięć i plik na dysku) albo
+    ich liczba przekroczy `max_entries`.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=500, max_bytes=8 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self._sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        self.entries = OrderedDict(load_json(self.path))
+        for url in self.entries:
+            self._resize(url)
+        self._evict()
+
+    def _resize(self, url):
+        """Aktualizuje zapamiętany rozmiar wpisu (bajty JSON klucza i wartości)."""
+        size = len(json.dumps({url: self.entries[url]}, ensure_ascii=False).encode("utf-8"))
+        self.bytes += size - self._sizes.get(url, 0)
+        self._sizes[url] = size
+
+    def _drop(self, url):
+        if self.entries.pop(url, None) is None:
+            return False
+        self.bytes -= self._sizes.pop(url, 0)
+        return True
+
+    def conditional_headers(self, url):
+        """
+        Zwraca nagłówki If-None-Match / If-Modified-Since dla adresu URL.
+        Wysyłamy je tylko wtedy, gdy mamy zapisaną niepustą listę produktów,
+        bo tylko wtedy odpowiedź 304 da się obsłużyć bez ponownego pobrania.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(url)
+            if not entry or not entry.get("products"):
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def record_hit(self, url):
+        """Rejestruje odpowiedź 304 dla adresu URL."""
+        with self._lock:
+            self._ensure_loaded()
+            self.hits += 1
+            if url in self.entries:
+                self.entries.move_to_end(url)
+                self._dirty = True
+
+    def record_miss(self, url, response):
+        """Zapamiętuje walidatory z pełnej odpowiedzi (200)."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        with self._lock:
+            self._ensure_loaded()
+            self.misses += 1
+            if not etag and not last_modified:
+                if self._drop(url):
+                    self._dirty = True
+                return
+            self.entries[url] = {"etag": etag, "last_modified": last_modified, "products": None}
+            self.entries.move_to_end(url)
+            self._resize(url)
+            self._evict()
+            self._dirty = True
+
+    def invalidate(self, url):
+        """Usuwa wpis, np. gdy treść strony pochodzi z Selenium."""
+        with self._lock:
+            self._ensure_loaded()
+            if self._drop(url):
+                self._dirty = True
+
+    def store_products(self, url, products):
+        """
+        Zapisuje listę produktów dla adresu URL z aktualnymi walidatorami.
+        Pusta lista nie jest zapisywana: strona bez produktów musi zostać
+        ponownie sparsowana (i ewentualnie pobrana przez Selenium).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry["products"] = list(products) or None
+                self._resize(url)
+                self._evict()
+                self._dirty = True
+
+    def cached_products(self, url):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(url)
+            return None if entry is None else entry.get("products")
+
+    def _evict(self):
+        # Wpis większy niż cały budżet też jest usuwany — takiej strony nie cache'ujemy
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._drop(next(iter(self.entries)))
+
+    def save(self):
+        """Zapisuje cache na dysk (tylko jeśli coś się zmieniło)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            save_json(self.path, self.entries)
+            self._dirty = False
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+# Global instance
+validator_cache = ValidatorCache()
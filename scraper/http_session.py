@@ -0,0 +1,96 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class SessionManager:
+    """
+    Zarządza współdzielonymi sesjami HTTP (osobna sesja na domenę).
+
+    Każda sesja ma własny `HTTPAdapter` z pulą połączeń keep-alive, dzięki
+    czemu kolejne żądania do tego samego sklepu nie płacą ponownie za
+    handshake TCP/TLS.
+    """
+
+    def __init__(self, pool_connections=4, pool_maxsize=8, headers=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        """Zwraca (i w razie potrzeby tworzy) sesję dla domeny adresu URL."""
+        domain = urlparse(url).netloc
+        with self._lock:
+            session = self.sessions.get(domain)
+            if session is None:
+                session = self._create_session()
+                self.sessions[domain] = session
+            return session
+
+    def _create_session(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        """Wykonuje żądanie GET przez sesję przypisaną do domeny."""
+        return self.session_for(url).get(url, **kwargs)
+
+    def stats(self):
+        """
+        Zwraca statystyki połączeń per domena:
+        liczbę żądań, otwartych połączeń i ponownie użytych połączeń.
+        """
+        with self._lock:
+            sessions = dict(self.sessions)
+
+        result = {}
+        for domain, session in sessions.items():
+            requests_count = 0
+            connections = 0
+            for pool in _connection_pools(session):
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+            result[domain] = {
+                "requests": requests_count,
+                "connections": connections,
+                "reused": max(requests_count - connections, 0),
+            }
+        return result
+
+    def close(self):
+        """Zamyka wszystkie sesje i ich pule połączeń."""
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+def _connection_pools(session):
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                yield pool
+
+
+# Global instance
+session_manager = SessionManager()
@@ -0,0 +1,19 @@
+import json
+import os
+
+
+def load_json(path, default=None):
+    """Wczytuje plik JSON; przy braku pliku lub uszkodzonej treści zwraca `default` ({} domyślnie)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {} if default is None else default
+
+
+def save_json(path, data):
+    """Zapisuje dane atomowo: do pliku tymczasowego, a potem os.replace na docelowy."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,188 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from . import parser
+from .extractors import EXTRACTORS, register_extractor
+from .parser import parse_products, parse_page, record_parse_path
+
+# Pola ekstraktora przekazywane do procesów roboczych (rejestr z config.json)
+_EXTRACTOR_FIELDS = ("item", "name", "price", "name_attr", "name_fallback", "label")
+
+
+def _init_worker(engine_name, extractors):
+    """Inicjalizacja procesu roboczego: ten sam silnik i rejestr co w procesie głównym."""
+    parser.set_parse_engine(engine_name)
+    for key, fields in extractors.items():
+        register_extractor(key, **fields)
+    parser.get_parse_engine()  # kompilacja selektorów raz na proces
+
+
+def _parse_batch(pages):
+    """
+    Parsuje paczkę stron w procesie roboczym.
+    Zwraca zwarte rekordy: dla każdej strony ścieżkę parsowania
+    i listę krotek (name, price, currency).
+    """
+    results = []
+    for html, url in pages:
+        products, path = parse_page(html, url)
+        results.append((path, [(p["name"], p["price"], p["currency"]) for p in products]))
+    return results
+
+
+def _expand(records):
+    return [{"name": name, "price": price, "currency": currency} for name, price, currency in records]
+
+
+class ParsePool:
+    """
+    Opcjonalny etap parsowania w puli procesów (parsowanie jest CPU-bound).
+
+    Strony z wielu wątków są zbierane w paczki (do `batch_bytes` bajtów lub
+    `max_batch` stron, albo po `linger` sekundach), żeby koszt IPC rozłożyć
+    na wiele małych stron. Procesy robocze mają wczytany parser i rejestr
+    ekstraktorów, a zwracają tylko krotki (name, price, currency).
+    Przy `workers=0` parsowanie odbywa się w bieżącym procesie.
+    """
+
+    def __init__(self, workers=0, batch_bytes=512 * 1024, max_batch=32, linger=0.005):
+        self.workers = workers
+        self.batch_bytes = batch_bytes
+        self.max_batch = max_batch
+        self.linger = linger
+        self.pages = 0
+        self.batches = 0
+        self._executor = None
+        self._pending = []
+        self._pending_bytes = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def configure(self, workers):
+        """Ustawia liczbę procesów roboczych (0 -> parsowanie w bieżącym procesie)."""
+        workers = max(int(workers or 0), 0)
+        if workers != self.workers:
+            self.close()
+            self.workers = workers
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                extractors = {
+                    key: {field: extractor[field] for field in _EXTRACTOR_FIELDS}
+                    for key, extractor in EXTRACTORS.items()
+                }
+                # spawn zamiast fork: pula powstaje z wątku scrapera, gdy działają już inne wątki
+                # (zapis w tle, robots.txt, timer paczek), a fork mógłby skopiować ich zajęte
+                # blokady (np. stdout) do procesu roboczego. Stan przekazuje _init_worker.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(parser.default_engine, extractors),
+                )
+            return self._executor
+
+    def parse(self, html, url=None):
+        """Parsuje stronę w puli (blokuje do wyniku); przy awarii puli — lokalnie."""
+        if not self.enabled:
+            return parse_products(html, url)
+        try:
+            return self.submit(html, url).result()
+        except Exception as e:
+            print(f"[ERROR] Pula parsowania zawiodła ({e}) — parsuję w bieżącym procesie.")
+            return parse_products(html, url)
+
+    def submit(self, html, url=None):
+        """Dodaje stronę do bieżącej paczki; zwraca Future z listą produktów."""
+        future = Future()
+        with self._lock:
+            self._pending.append((html, url, future))
+            self._pending_bytes += len(html)
+            if self._pending_bytes >= self.batch_bytes or len(self._pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.linger, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def flush(self):
+        """Wysyła niepełną paczkę od razu."""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def _take(self):
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _dispatch(self, batch):
+        urls = [url for _, url, _ in batch]
+        futures = [future for _, _, future in batch]
+        self.pages += len(batch)
+        self.batches += 1
+        try:
+            result = self._get_executor().submit(_parse_batch, [(html, url) for html, url, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def deliver(result):
+            try:
+                records = result.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for url, future, (path, page_records) in zip(urls, futures, records):
+                record_parse_path(url, path)
+                future.set_result(_expand(page_records))
+
+        result.add_done_callback(deliver)
+
+    def parse_many(self, pages):
+        """
+        Parsuje listę par (html, url) — np. cały katalog — i zwraca listy
+        produktów w tej samej kolejności. Paczki trafiają do wszystkich procesów naraz.
+        """
+        if not self.enabled:
+            return [parse_products(html, url) for html, url in pages]
+        futures = [self.submit(html, url) for html, url in pages]
+        self.flush()
+        return [future.result() for future in futures]
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pages": self.pages,
+            "batches": self.batches,
+            "avg_batch": round(self.pages / self.batches, 1) if self.batches else 0,
+        }
+
+    def close(self):
+        """Zamyka procesy robocze."""
+        self.flush()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# Global instance
+parse_pool = ParsePool()
+atexit.register(parse_pool.close)
@@ -1,104 +1,345 @@
-from bs4 import BeautifulSoup
-import re
+from bs4 import BeautifulSoup, SoupStrainer
+import threading
+from .prices import parse_price, detect_currency
+from .extractors import extractor_for, guess_extractors, remember_extractor
+from .structured import has_json_ld, extract_json_ld, has_microdata, extract_microdata
 
-# --- waluty ---
-def parse_price(text):
+try:
+    from lxml import etree
+    import lxml.html as lxml_html
+except ImportError:  # lxml jest opcjonalny — wtedy zostaje BeautifulSoup
+    etree = None
+    lxml_html = None
+
+
+def _css_to_xpath(selector, axis="descendant::"):
+    """
+    Tłumaczy proste selektory CSS używane w rejestrze ekstraktorów (tagi, klasy,
+    potomkowie: "h3 a", ".pull-right.price") na XPath względem elementu.
+    """
+    steps = []
+    for part in selector.split():
+        tag, *classes = part.split(".")
+        conditions = "".join(
+            f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]" for cls in classes
+        )
+        steps.append(f"{tag or '*'}{conditions}")
+    return axis + "//".join(steps)
+
+
+# Rozmiar fragmentu HTML podawanego parserowi strumieniowemu lxml
+PULL_CHUNK = 16 * 1024
+
+# Od tej wielkości strony lxml buduje tylko poddrzewa kontenerów; na mniejszych
+# stronach pełne drzewo libxml2 jest i tak małe, a przycinanie kosztuje czas
+LXML_PRUNE_MIN_SIZE = 256 * 1024
+
+
+def _containers(candidates):
     """
-    Parses a string to find a price and convert it to a float.
-    Handles both '.' and ',' as decimal separators, and ',' as a thousand separator.
+    Kontenery produktów (tag, klasy) kandydatów albo None, gdy któregoś
+    nie da się opisać prostym selektorem — wtedy budujemy pełne drzewo.
     """
-    if not text:
+    containers = [candidate["container"] for candidate in candidates]
+    if not containers or None in containers:
         return None
+    return containers
 
-    # For formats like "1,234.56", remove thousand separators
-    if ',' in text and '.' in text:
-        text = text.replace(',', '')
-    # For formats like "123,45", treat comma as a decimal point
-    else:
-        text = text.replace(',', '.')
-    
-    numbers = re.findall(r"[\d.]+", text)
-    if numbers:
-        try:
-            return float(numbers[0])
-        except ValueError:
-            return None # Handle cases like "1.2.3"
-    return None
 
-def detect_currency(text):
-    if "€" in text:
-        return "EUR"
-    if "£" in text:
-        return "GBP"
-    if "$" in text:
-        return "USD"
-    return None
+def _is_container(containers, tag, class_attr):
+    if not class_attr:
+        return False
+    tokens = set(class_attr.split())
+    return any((ctag is None or ctag == tag) and classes <= tokens for ctag, classes in containers)
 
 
-def parse_products(html):
-    soup = BeautifulSoup(html, "html.parser")
+def _build_product(name, raw_price):
+    return {
+        "name": name,
+        "price": parse_price(raw_price),
+        "currency": detect_currency(raw_price),
+    }
 
-    # --- SHOP A ---
-    shop_a = soup.select(".product")
-    if shop_a:
-        print("[Parser] Rozpoznano strukturę: Shop A")
-        products = []
 
-        for item in shop_a:
-            name = item.select_one(".woocommerce-loop-product__title")
-            price = item.select_one(".price")
+def _product_name(extractor, name_el, get_text):
+    if extractor["name_attr"] is None:
+        return get_text(name_el)
+    if extractor["name_fallback"]:
+        return name_el.get(extractor["name_attr"], get_text(name_el))
+    return name_el.get(extractor["name_attr"])
 
-            if name and price:
-                raw_price = price.get_text(strip=True)
-                products.append({
-                    "name": name.get_text(strip=True),
-                    "price": parse_price(raw_price),
-                    "currency": detect_currency(raw_price),
-                })
 
-        return products
+class Bs4Engine:
+    """Silnik referencyjny: BeautifulSoup z html.parser (wolny, ale zawsze dostępny)."""
 
-    # --- SHOP B ---
-    shop_b = soup.select(".product_pod")
-    if shop_b:
-        print("[Parser] Rozpoznano strukturę: Shop B")
-        products = []
+    name = "bs4"
 
-        for item in shop_b:
-            name = item.select_one("h3 a")
-            price = item.select_one(".price_color")
+    @staticmethod
+    def _get_text(element):
+        return element.get_text(strip=True)
 
-            if name and price:
-                raw_price = price.get_text(strip=True)
-                products.append({
-                    "name": name.get("title"),
-                    "price": parse_price(raw_price),
-                    "currency": detect_currency(raw_price),
-                })
+    def load(self, html, containers=None):
+        """Buduje drzewo; z `containers` tylko poddrzewa kontenerów produktów (SoupStrainer)."""
+        if not containers:
+            return BeautifulSoup(html, "html.parser")
+        strainer = SoupStrainer(class_=lambda value: _is_container(containers, None, value))
+        return BeautifulSoup(html, "html.parser", parse_only=strainer)
 
-        return products
+    def release(self, soup):
+        """Zwalnia drzewo od razu (BeautifulSoup ma cykle rodzic–dziecko)."""
+        soup.decompose()
 
-    # --- SHOP C (webscraper.io laptops) ---
-    shop_c = soup.select(".thumbnail")
-    if shop_c:
-        print("[Parser] Rozpoznano strukturę: Shop C (webscraper.io)")
+    def extract(self, soup, extractor):
+        """Produkty według ekstraktora; None, gdy strona nie ma jego kontenerów."""
+        items = soup.select(extractor["item"])
+        if not items:
+            return None
         products = []
 
-        for item in shop_c:
-            name_el = item.select_one(".title")
-            price_el = item.select_one(".pull-right.price")
+        for item in items:
+            name_el = item.select_one(extractor["name"])
+            price_el = item.select_one(extractor["price"])
 
             if name_el and price_el:
-                raw_price = price_el.get_text(strip=True)
-                products.append({
-                    "name": name_el.get('title', name_el.get_text(strip=True)),
-                    "price": parse_price(raw_price),
-                    "currency": detect_currency(raw_price),
-                })
+                name = _product_name(extractor, name_el, self._get_text)
+                products.append(_build_product(name, self._get_text(price_el)))
 
         return products
 
 
+class LxmlEngine:
+    """
+    Szybki silnik oparty na lxml: selektory ekstraktora są raz
+    kompilowane do XPath, a tekst zbierany tak jak get_text(strip=True).
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        # Tekst elementu bez komentarzy, skryptów i stylów (jak w BeautifulSoup)
+        self._text = etree.XPath("descendant-or-self::text()[not(ancestor::script or ancestor::style)]")
+        self._compiled = {}
+
+    def _get_text(self, element):
+        return "".join(part.strip() for part in self._text(element))
+
+    def _xpaths(self, extractor):
+        compiled = self._compiled.get(extractor["key"])
+        if compiled is None or compiled[0] is not extractor:
+            compiled = (
+                extractor,
+                etree.XPath(_css_to_xpath(extractor["item"], axis="//")),
+                etree.XPath(f"({_css_to_xpath(extractor['name'])})[1]"),
+                etree.XPath(f"({_css_to_xpath(extractor['price'])})[1]"),
+                etree.XPath(_css_to_xpath(extractor["item"], axis="descendant-or-self::")),
+            )
+            self._compiled[extractor["key"]] = compiled
+        return compiled[1:]
+
+    def load(self, html, containers=None):
+        """
+        Buduje drzewo; z `containers` parsuje strumieniowo (HTMLPullParser)
+        i zostawia tylko poddrzewa kontenerów produktów — reszta strony
+        (skrypty, nawigacja, stopka) jest usuwana zaraz po sparsowaniu.
+        """
+        try:
+            if not containers or len(html) < LXML_PRUNE_MIN_SIZE:
+                return lxml_html.fromstring(html)
+            holder = etree.Element("div")
+            chunks = (html[offset:offset + PULL_CHUNK] for offset in range(0, len(html), PULL_CHUNK))
+            for container in self._completed_containers(chunks, containers):
+                holder.append(container)
+            return holder
+        except (etree.LxmlError, ValueError):
+            return None
+
+    @staticmethod
+    def _completed_containers(chunks, containers, encoding=None):
+        """
+        Podaje kolejne fragmenty HTML parserowi przyrostowemu i zwraca (generator)
+        zakończone kontenery produktów, odpięte od drzewa. Zakończone elementy
+        spoza kontenerów są od razu czyszczone i odpinane, więc w pamięci
+        zostaje tylko bieżąca ścieżka dokumentu.
+        """
+        parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        depth = 0  # głębokość zagnieżdżenia wewnątrz bieżącego kontenera
+        finished = False
+        chunks = iter(chunks)
+        while not finished:
+            chunk = next(chunks, None)
+            if chunk is None:
+                try:
+                    parser.close()
+                except etree.XMLSyntaxError:
+                    pass  # pusty lub urwany dokument — zwracamy to, co już sparsowano
+                finished = True
+            else:
+                parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == "start":
+                    if depth or _is_container(containers, element.tag, element.get("class")):
+                        depth += 1
+                    continue
+                if depth:
+                    depth -= 1
+                    if depth:
+                        continue
+                    completed = True
+                else:
+                    element.clear()
+                    completed = False
+                parent = element.getparent()
+                if parent is not None:
+                    parent.remove(element)
+                if completed:
+                    yield element
+
+    def release(self, root):
+        if root is not None:
+            root.clear()
+
+    def _item_product(self, item, name_xpath, price_xpath, extractor):
+        name_el = name_xpath(item)
+        price_el = price_xpath(item)
+        if name_el and price_el:
+            name = _product_name(extractor, name_el[0], self._get_text)
+            return _build_product(name, self._get_text(price_el[0]))
+        return None
+
+    def extract(self, root, extractor):
+        """Produkty według ekstraktora; None, gdy strona nie ma jego kontenerów."""
+        if root is None:
+            return None
+        items_xpath, name_xpath, price_xpath, _ = self._xpaths(extractor)
+        items = items_xpath(root)
+        if not items:
+            return None
+        products = []
+
+        for item in items:
+            product = self._item_product(item, name_xpath, price_xpath, extractor)
+            if product:
+                products.append(product)
+
+        return products
+
+    def iter_products(self, chunks, extractor, encoding=None):
+        """
+        Generator produktów z HTML napływającego fragmentami (bajty lub tekst):
+        produkt jest zwracany, gdy tylko jego kontener zostanie domknięty,
+        a poddrzewo jest potem zwalniane. Wymaga prostego selektora kontenera.
+        """
+        _, name_xpath, price_xpath, self_items_xpath = self._xpaths(extractor)
+        for container in self._completed_containers(chunks, [extractor["container"]], encoding):
+            for item in self_items_xpath(container):
+                product = self._item_product(item, name_xpath, price_xpath, extractor)
+                if product:
+                    yield product
+            container.clear()
+
+
+PARSE_ENGINES = {"bs4": Bs4Engine}
+if lxml_html is not None:
+    PARSE_ENGINES["lxml"] = LxmlEngine
+
+_engines = {}
+default_engine = "lxml" if "lxml" in PARSE_ENGINES else "bs4"
+
+
+def get_parse_engine(name=None):
+    """Zwraca (tworzony raz) silnik parsowania; nieznana nazwa -> bs4."""
+    name = name or default_engine
+    if name not in PARSE_ENGINES:
+        print(f"[Parser] Silnik {name} niedostępny — używam bs4.")
+        name = "bs4"
+    if name not in _engines:
+        _engines[name] = PARSE_ENGINES[name]()
+    return _engines[name]
+
+
+def set_parse_engine(name):
+    """Ustawia domyślny silnik parsowania (np. z config.json)."""
+    global default_engine
+    default_engine = name if name in PARSE_ENGINES else "bs4"
+    return default_engine
+
+
+# Ścieżki parsowania: dane strukturalne (JSON-LD, mikrodane), selektory CSS, brak wyniku
+PARSE_PATHS = ("json-ld", "microdata", "css", "none")
+
+# Licznik ścieżek per adres źródła: url -> {ścieżka: liczba}
+parse_path_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_parse_path(url, path):
+    """Zlicza, która ścieżka parsowania zadziałała dla adresu URL."""
+    if not url:
+        return
+    with _stats_lock:
+        counts = parse_path_stats.setdefault(url, dict.fromkeys(PARSE_PATHS, 0))
+        counts[path] += 1
+
+
+def _parse_css(html, url, engine):
+    extractor = extractor_for(url)
+    candidates = [extractor] if extractor else guess_extractors(html)
+
+    if candidates:
+        engine = get_parse_engine(engine)
+        # Budujemy tylko poddrzewa kontenerów produktów i zwalniamy je po ekstrakcji
+        tree = engine.load(html, _containers(candidates))
+        try:
+            for candidate in candidates:
+                products = engine.extract(tree, candidate)
+                if products is not None:
+                    print(f"[Parser] Rozpoznano strukturę: {candidate['label']}")
+                    if not extractor:
+                        remember_extractor(url, candidate)
+                    return products
+        finally:
+            if tree is not None:
+                engine.release(tree)
+    return None
+
+
+def parse_page(html, url=None, engine=None):
+    """
+    Jak parse_products, ale zwraca też ścieżkę, która dała wynik:
+    (produkty, "json-ld" | "microdata" | "css" | "none").
+
+    Najpierw dane strukturalne: bloki JSON-LD są wyszukiwane w surowym
+    tekście i czytane przez json.loads bez budowy DOM, potem mikrodane
+    schema.org. Selektory CSS uruchamiamy tylko, gdy danych strukturalnych brak.
+    """
+    if has_json_ld(html):
+        products = extract_json_ld(html)
+        if products:
+            print(f"[Parser] Dane strukturalne JSON-LD ({len(products)} produktów).")
+            return products, "json-ld"
+
+    if has_microdata(html):
+        products = extract_microdata(html)
+        if products:
+            print(f"[Parser] Mikrodane schema.org ({len(products)} produktów).")
+            return products, "microdata"
+
+    products = _parse_css(html, url, engine)
+    if products is not None:
+        return products, "css"
+
     # --- KONIEC: brak dopasowania ---
     print("[Parser] Nie rozpoznano struktury strony.")
-    return []   
+    return [], "none"
+
+
+def parse_products(html, url=None, engine=None):
+    """
+    Wyciąga produkty ze strony sklepu.
+    url -> adres strony; ekstraktor wybierany jest z rejestru po domenie,
+           a dla nieznanych domen po odcisku strukturalnym (klasy CSS)
+    engine -> "lxml" (domyślnie, jeśli zainstalowany) lub "bs4" (silnik referencyjny)
+    """
+    products, path = parse_page(html, url, engine)
+    record_parse_path(url, path)
+    return products
@@ -0,0 +1,137 @@
+import html
+import re
+import numpy as np
+import pandas as pd
+
+# Reguły lokalizacji: separator dziesiętny. "auto" zgaduje z zapisu liczby:
+# oba separatory -> dziesiętny jest ostatni ("1,234.56", "1.234,56"),
+# jeden przecinek -> dziesiętny ("123,45"), kilka takich samych -> tysiące ("1.234.567").
+# Separator tysięcy jest przyjmowany tylko przy poprawnych grupach (po 3 cyfry);
+# inaczej ("10.008.00" ze sklejonych cen) brana jest pierwsza poprawna liczba ("10.00").
+LOCALES = {
+    "auto": None,
+    "en": ".",
+    "pl": ",",
+    "de": ",",
+    "fr": ",",
+}
+
+# Symbole i kody walut (kolejność = priorytet, jak w dotychczasowym detect_currency)
+CURRENCY_SYMBOLS = (("€", "EUR"), ("£", "GBP"), ("$", "USD"))
+_CURRENCY_CODE = re.compile(r"\b(EUR|GBP|USD|PLN|CHF|CZK)\b")
+
+_TAGS = re.compile(r"<[^>]*>")
+# Spacje (także twarde i wąskie: \xa0, \u202f) tylko wewnątrz grup tysięcy ("2 499,00")
+_SPACED_THOUSANDS = re.compile(r"(?<![\d.,])\d{1,3}(?:[ \xa0\u202f]\d{3})+(?!\d)")
+_SPACES = re.compile(r"[ \xa0\u202f]")
+_TOKEN = re.compile(r"\d[\d.,]*|[.,]\d[\d.,]*")
+_FIRST_NUMBER = re.compile(r"\d+(?:[.,]\d{1,2})?|[.,]\d{1,2}")
+
+
+def _strip_markup(text):
+    """Usuwa znaczniki HTML i encje (zamiast budować BeautifulSoup)."""
+    if "<" in text:
+        text = _TAGS.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def _normalize_token(token, decimal):
+    """
+    Zamienia token liczby ("1.234,56") na zapis z kropką dziesiętną ("1234.56").
+    None, gdy separatory nie tworzą poprawnych grup tysięcy ("10.008.00").
+    """
+    commas, dots = token.count(","), token.count(".")
+    if decimal is None:
+        if commas and dots:
+            decimal = "," if token.rfind(",") > token.rfind(".") else "."
+        elif commas == 1:
+            decimal = ","
+        elif dots == 1:
+            decimal = "."
+    if decimal is None:
+        thousands = "." if dots else ","
+        integer, fraction = token, ""
+    else:
+        thousands = "." if decimal == "," else ","
+        integer, _, fraction = token.rpartition(decimal) if decimal in token else (token, "", "")
+
+    if decimal and decimal in integer or fraction and not fraction.isdigit():
+        return None
+    groups = integer.split(thousands)
+    if len(groups) > 1 and not (1 <= len(groups[0]) <= 3 and all(len(group) == 3 for group in groups[1:])):
+        return None
+    return "".join(groups) + ("." + fraction if fraction else "")
+
+
+def parse_price(text, locale="auto"):
+    """
+    Zwraca pierwszą cenę z tekstu jako float (None, gdy jej brak).
+    Obsługuje HTML, spacje jako separator tysięcy oraz '.' i ',' jako separator dziesiętny.
+    locale -> "auto" lub klucz LOCALES (np. "pl": przecinek dziesiętny)
+    """
+    if not text:
+        return None
+    text = _SPACED_THOUSANDS.sub(lambda match: _SPACES.sub("", match.group()), _strip_markup(text))
+    match = _TOKEN.search(text)
+    if not match:
+        return None
+    number = _normalize_token(match.group(), LOCALES[locale])
+    if number is None:
+        # Sklejone lub ucięte liczby: pierwsza liczba z co najwyżej dwoma miejscami po przecinku
+        number = _normalize_token(_FIRST_NUMBER.match(match.group()).group(), None)
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def detect_currency(text):
+    """Kod waluty z symbolu (€, £, $) lub kodu ISO w tekście; None, gdy brak."""
+    if not text:
+        return None
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return code
+    match = _CURRENCY_CODE.search(text)
+    return match.group(1) if match else None
+
+
+def normalize_price(raw, default=None, locale="auto"):
+    """Cena z liczby lub tekstu (także HTML) jako float; `default`, gdy się nie da."""
+    if isinstance(raw, (int, float, np.number)) and not isinstance(raw, bool):
+        return default if raw != raw else float(raw)  # NaN -> default
+    if not isinstance(raw, str):
+        return default
+    price = parse_price(raw, locale)
+    return default if price is None else price
+
+
+def normalize_prices(values, default=np.nan, locale="auto"):
+    """
+    Wsadowa wersja normalize_price dla całej kolumny (pandas Series,
+    tablica NumPy lub lista). Zwraca Series float (z indeksem wejścia)
+    albo tablicę NumPy, jeśli na wejściu była tablica.
+
+    Kolumny liczbowe są tylko rzutowane; w tekstowych każda unikalna wartość
+    (pd.factorize) jest parsowana raz, a wynik rozkładany z powrotem przez take.
+    """
+    as_array = isinstance(values, np.ndarray)
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    fill = np.nan if default is None else default
+
+    if series.dtype.kind in "iuf":
+        result = series.astype(float)
+        if fill == fill:
+            result = result.fillna(fill)
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        parsed = np.fromiter(
+            (normalize_price(value, fill, locale) for value in uniques),
+            dtype=float, count=len(uniques),
+        )
+        # kod -1 (None/NaN) -> ostatni element: wartość domyślna
+        prices = np.append(parsed, fill).take(codes)
+        result = pd.Series(prices, index=series.index)
+    return result.to_numpy() if as_array else result
@@ -1,53 +1,297 @@
+import asyncio
+import sqlite3
+import threading
 import time
 import random
+from email.utils import parsedate_to_datetime
 from urllib.parse import urlparse
-from collections import deque
+
+
+def parse_retry_after(value):
+    """Zamienia nagłówek Retry-After (sekundy lub data HTTP) na liczbę sekund."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+# Pola stanu domeny współdzielone przez magazyny:
+# tat (GCRA), last (ostatnie żądanie), blocked_until (Retry-After),
+# rate (aktualne RPM), min_delay / max_delay (opóźnienia po 429)
+STATE_FIELDS = ("tat", "last", "blocked_until", "rate", "min_delay", "max_delay")
+
+
+class MemoryRateStore:
+    """Stan limitera w pamięci procesu (domyślny magazyn)."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, domain, fn):
+        """Atomowo modyfikuje stan domeny funkcją fn(state) i zwraca jej wynik."""
+        with self._lock:
+            state = self._states.setdefault(domain, {})
+            return fn(state)
+
+    def get(self, domain):
+        with self._lock:
+            return dict(self._states.get(domain, {}))
+
+
+class SqliteRateStore:
+    """
+    Stan limitera współdzielony przez wszystkie procesy na hoście.
+
+    Każda rezerwacja to krótka transakcja BEGIN IMMEDIATE na tabeli w trybie
+    WAL, więc scheduler (main.py) i panel (Panel.py) korzystają z jednego
+    budżetu RPM na domenę zamiast go po cichu mnożyć.
+    """
+
+    def __init__(self, path="rate_limits.db"):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    domain TEXT PRIMARY KEY,
+                    {", ".join(f"{field} REAL" for field in STATE_FIELDS)}
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def update(self, domain, fn):
+        """Atomowo (między procesami) modyfikuje stan domeny funkcją fn(state)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = self._read(conn, domain)
+            result = fn(state)
+            conn.execute(
+                f"INSERT OR REPLACE INTO rate_limits (domain, {', '.join(STATE_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' for _ in STATE_FIELDS)})",
+                [domain] + [state.get(field) for field in STATE_FIELDS],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def get(self, domain):
+        return self._read(self._connection(), domain)
+
+    @staticmethod
+    def _read(conn, domain):
+        row = conn.execute(
+            f"SELECT {', '.join(STATE_FIELDS)} FROM rate_limits WHERE domain = ?", (domain,)
+        ).fetchone()
+        if row is None:
+            return {}
+        return {field: value for field, value in zip(STATE_FIELDS, row) if value is not None}
+
 
 class RateLimiter:
-    def __init__(self, min_delay=1, max_delay=5, requests_per_minute=60, error_increase_factor=2):
+    """
+    Limiter żądań per domena oparty na GCRA (Generic Cell Rate Algorithm).
+
+    Dla każdej domeny przechowujemy tylko „teoretyczny czas nadejścia” (TAT),
+    więc dopuszczenie żądania kosztuje O(1). Limit `requests_per_minute`
+    może być wykorzystany seriami do `burst` żądań (domyślnie tyle, ile RPM),
+    a między kolejnymi żądaniami zachowujemy losowe opóźnienie min_delay–max_delay
+    (przycięte do odstępu 60 / tempo, żeby tempo AIMD rzeczywiście sterowało przepustowością).
+
+    Tempo każdej domeny jest regulowane adaptacyjnie (AIMD): po `success_window`
+    udanych żądaniach z rzędu rośnie o `additive_step` RPM (do
+    `max_requests_per_minute`), a po 429/5xx lub wyraźnym wzroście czasu
+    odpowiedzi serwera spada multiplikatywnie. Retry-After wstrzymuje domenę.
+
+    Stan domen trzymany jest w magazynie `store` (domyślnie w pamięci;
+    SqliteRateStore współdzieli go między procesami).
+    """
+
+    def __init__(self, min_delay=1, max_delay=5, requests_per_minute=60, error_increase_factor=2, burst=None,
+                 max_requests_per_minute=None, min_requests_per_minute=1, additive_step=1,
+                 decrease_factor=0.5, success_window=10, latency_factor=2.0, baseline_decay=0.05, store=None):
         self.min_delay = min_delay
         self.max_delay = max_delay
         self.requests_per_minute = requests_per_minute
         self.error_increase_factor = error_increase_factor
-        self.last_request_times = {}
-        self.domain_delays = {}
-        self.domain_requests = {}
+        self.burst = burst
+        self.max_requests_per_minute = max_requests_per_minute or requests_per_minute * 4
+        self.min_requests_per_minute = min_requests_per_minute
+        self.additive_step = additive_step
+        self.decrease_factor = decrease_factor
+        self.success_window = success_window
+        self.latency_factor = latency_factor
+        self.baseline_decay = baseline_decay
+        self.store = store or MemoryRateStore()
+        self.robots_policies = {}
+        self._success_streak = {}
+        self._latency = {}
+        self._baseline_latency = {}
+        self._lock = threading.Lock()
+
+    def domain_state(self, domain):
+        """Zwraca kopię stanu domeny (tat, last, rate, opóźnienia...)."""
+        return self.store.get(domain)
+
+    def apply_robots_policy(self, domain, crawl_delay=None, requests_per_minute=None):
+        """
+        Ustawia ograniczenia z robots.txt: Crawl-delay (minimalny odstęp w sekundach)
+        i Request-rate (maksymalne RPM). AIMD nigdy ich nie przekroczy.
+        Bez obu wartości poprzednia polityka domeny jest usuwana.
+        """
+        with self._lock:
+            if crawl_delay is None and requests_per_minute is None:
+                self.robots_policies.pop(domain, None)
+            else:
+                self.robots_policies[domain] = (crawl_delay, requests_per_minute)
+
+    def _max_rate(self, domain):
+        _, robots_rate = self.robots_policies.get(domain, (None, None))
+        return min(self.max_requests_per_minute, robots_rate or self.max_requests_per_minute)
+
+    def reserve(self, url):
+        """
+        Rezerwuje miejsce na żądanie do domeny adresu URL bez blokowania.
+        Zwraca czas (time.time()), od którego żądanie może zostać wysłane.
+        """
+        domain = urlparse(url).netloc
+        crawl_delay, _ = self.robots_policies.get(domain, (None, None))
+        max_rate = self._max_rate(domain)
+
+        def admit(state):
+            now = time.time()
+            rate = min(state.get("rate", self.requests_per_minute), max_rate)
+            interval = 60.0 / rate
+            tolerance = max((self.burst or rate) - 1, 0) * interval
+
+            tat = state.get("tat", now)
+            ready_at = max(now, tat - tolerance, state.get("blocked_until", 0))
+
+            if "last" in state:
+                # Losowe opóźnienie nie dłuższe niż odstęp wynikający z tempa — inaczej
+                # (1–5 s, średnio 3 s) ograniczałoby domenę do ~20 RPM niezależnie od AIMD.
+                # Crawl-delay z robots.txt pozostaje twardym minimum.
+                min_delay = min(state.get("min_delay", self.min_delay), interval)
+                max_delay = max(min(state.get("max_delay", self.max_delay), interval), min_delay)
+                delay = max(random.uniform(min_delay, max_delay), crawl_delay or 0)
+                ready_at = max(ready_at, state["last"] + delay)
+
+            state["tat"] = max(tat, ready_at) + interval
+            state["last"] = ready_at
+            return ready_at
+
+        return self.store.update(domain, admit)
 
     def wait(self, url):
+        """Blokuje bieżący wątek do czasu zarezerwowanego przez reserve()."""
+        delay = self.reserve(url) - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        """Wersja wait() dla asyncio — nie blokuje pętli zdarzeń."""
+        delay = self.reserve(url) - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self, url, latency=None):
+        """
+        Rejestruje udane żądanie (opcjonalnie z czasem odpowiedzi w sekundach).
+        Po serii sukcesów zwiększa tempo domeny i zmniejsza opóźnienia podniesione po 429,
+        chyba że czas odpowiedzi wyraźnie wzrósł — wtedy tempo spada.
+        """
         domain = urlparse(url).netloc
-        
-        # RPM limit
-        now = time.time()
-        if domain not in self.domain_requests:
-            self.domain_requests[domain] = deque()
-        
-        while len(self.domain_requests[domain]) >= self.requests_per_minute:
-            if now - self.domain_requests[domain][0] > 60:
-                self.domain_requests[domain].popleft()
-            else:
-                time.sleep(1)
-                now = time.time()
+        with self._lock:
+            slow = latency is not None and self._is_slowing_down(domain, latency)
 
-        min_delay, max_delay = self.domain_delays.get(domain, (self.min_delay, self.max_delay))
+            streak = self._success_streak.get(domain, 0) + 1
+            if streak < self.success_window:
+                self._success_streak[domain] = streak
+                return
+            self._success_streak[domain] = 0
 
-        last_time = self.last_request_times.get(domain, 0)
-        elapsed = time.time() - last_time
-        delay = random.uniform(min_delay, max_delay)
-        if elapsed < delay:
-            time.sleep(delay - elapsed)
-        
-        self.last_request_times[domain] = time.time()
-        self.domain_requests[domain].append(time.time())
+        # Serwer odpowiada coraz wolniej — zwalniamy zamiast przyspieszać
+        if slow:
+            self.store.update(domain, self._decrease_rate)
+            return
 
-    def handle_error_429(self, url):
+        max_rate = self._max_rate(domain)
+
+        def increase(state):
+            rate = state.get("rate", self.requests_per_minute)
+            state["rate"] = min(rate + self.additive_step, max_rate)
+
+            if "min_delay" in state:
+                state["min_delay"] = max(state["min_delay"] / self.error_increase_factor, self.min_delay)
+                state["max_delay"] = max(state["max_delay"] / self.error_increase_factor, self.max_delay)
+                if (state["min_delay"], state["max_delay"]) == (self.min_delay, self.max_delay):
+                    del state["min_delay"], state["max_delay"]
+
+        self.store.update(domain, increase)
+
+    def record_error(self, url, status_code=None, retry_after=None):
+        """
+        Rejestruje odpowiedź 429/5xx: multiplikatywnie zmniejsza tempo domeny
+        i — jeśli serwer podał Retry-After — wstrzymuje ją na podany czas.
+        """
+        domain = urlparse(url).netloc
+        with self._lock:
+            self._success_streak[domain] = 0
+
+        def decrease(state):
+            rate = self._decrease_rate(state)
+            if retry_after:
+                state["blocked_until"] = max(state.get("blocked_until", 0), time.time() + retry_after)
+            return rate
+
+        rate = self.store.update(domain, decrease)
+        print(f"[RateLimiter] {domain}: błąd {status_code}, tempo obniżone do {rate:.1f} żądań/min.")
+
+    def _decrease_rate(self, state):
+        rate = state.get("rate", self.requests_per_minute)
+        state["rate"] = max(rate * self.decrease_factor, self.min_requests_per_minute)
+        return state["rate"]
+
+    def _is_slowing_down(self, domain, latency):
+        """
+        Średnia wykładnicza czasu odpowiedzi vs. poziom odniesienia.
+        Poziom odniesienia to najlepsza średnia, powoli (baseline_decay na próbkę)
+        dociągana do bieżącej — po trwałej zmianie opóźnień (inny CDN, region)
+        domena po kilkunastu próbkach przestaje być uznawana za zwalniającą.
+        """
+        average = self._latency.get(domain)
+        average = latency if average is None else 0.8 * average + 0.2 * latency
+        self._latency[domain] = average
+        baseline = min(self._baseline_latency.get(domain, average), average)
+        self._baseline_latency[domain] = baseline + self.baseline_decay * (average - baseline)
+        return average > baseline * self.latency_factor
+
+    def handle_error_429(self, url, retry_after=None):
         domain = urlparse(url).netloc
-        min_delay, max_delay = self.domain_delays.get(domain, (self.min_delay, self.max_delay))
-        
-        new_min_delay = min_delay * self.error_increase_factor
-        new_max_delay = max_delay * self.error_increase_factor
-        
-        self.domain_delays[domain] = (new_min_delay, new_max_delay)
+
+        def increase_delays(state):
+            state["min_delay"] = state.get("min_delay", self.min_delay) * self.error_increase_factor
+            state["max_delay"] = state.get("max_delay", self.max_delay) * self.error_increase_factor
+            return state["min_delay"], state["max_delay"]
+
+        new_min_delay, new_max_delay = self.store.update(domain, increase_delays)
         print(f"Increased delay for {domain} to {new_min_delay}-{new_max_delay}s after 429 error.")
+        self.record_error(url, 429, retry_after)
 
 # Global instance
 limiter = RateLimiter(min_delay=1, max_delay=5, requests_per_minute=15)
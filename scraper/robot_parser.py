@@ -1,41 +1,187 @@
-from urllib import robotparser
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
+import time
+from .http_session import session_manager
+from .json_store import load_json, save_json
+from .rate_limiter import limiter as default_limiter
+from .robots_matcher import CompiledRobots
 
 # Konfiguracja podstawowego loggera
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+ROBOTS_CACHE_FILE = "robots_cache.json"
+
 class RobotManager:
-    def __init__(self):
+    """
+    Sprawdza robots.txt z cache'em na dysku.
+
+    Wpisy są ważne przez `ttl` sekund (błędy pobrania przez `negative_ttl`).
+    Przeterminowany wpis jest dalej używany, a w tle pobierana jest nowa wersja.
+    Crawl-delay i Request-rate trafiają automatycznie do RateLimitera.
+    Reguły każdej domeny są kompilowane (CompiledRobots), a wyniki
+    zapamiętywane per ścieżka, więc sprawdzanie dużych list URL jest tanie.
+    """
+
+    def __init__(self, cache_path=ROBOTS_CACHE_FILE, ttl=24 * 3600, negative_ttl=3600, timeout=10, limiter=None):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.limiter = limiter or default_limiter
         self.parsers = {}
+        self.entries = {}
         self.disabled = False
+        self._loaded = False
+        self._refreshing = set()
+        self._executor = None
+        self._lock = threading.Lock()
 
     def can_fetch(self, url, user_agent='*'):
         if self.disabled:
             return True
-            
+
         domain = urlparse(url).scheme + "://" + urlparse(url).netloc
-        if domain not in self.parsers:
-            rp = robotparser.RobotFileParser()
-            rp.set_url(domain + '/robots.txt')
-            try:
-                rp.read()
-                self.parsers[domain] = rp
-            except Exception as e:
-                logging.warning(f"Nie można odczytać pliku robots.txt dla domeny {domain}: {e}. Przyjmuję, że można pobierać.")
-                # Zapisujemy None, aby nie próbować ponownie dla tej samej domeny
-                self.parsers[domain] = None
-                return True
-        
-        parser = self.parsers.get(domain)
+        parser = self._parser_for(domain)
         if parser:
             allowed = parser.can_fetch(user_agent, url)
             if not allowed:
                 logging.info(f"URL odrzucony przez robots.txt: {url} (User-agent: {user_agent})")
             return allowed
-        
+
         # Domyślnie zezwalaj, jeśli parser nie został znaleziony (np. błąd odczytu)
         return True
 
+    def can_fetch_many(self, urls, user_agent='*'):
+        """
+        Sprawdza wiele adresów naraz (np. całą paginację katalogu).
+        Zwraca listę wartości logicznych w kolejności `urls`.
+        """
+        if self.disabled:
+            return [True] * len(urls)
+
+        by_domain = {}
+        for index, url in enumerate(urls):
+            parsed = urlparse(url)
+            by_domain.setdefault(parsed.scheme + "://" + parsed.netloc, []).append(index)
+
+        results = [True] * len(urls)
+        for domain, indexes in by_domain.items():
+            parser = self._parser_for(domain)
+            if not parser:
+                continue
+            allowed = parser.can_fetch_many(user_agent, [urls[i] for i in indexes])
+            for index, ok in zip(indexes, allowed):
+                results[index] = ok
+            rejected = len(allowed) - sum(allowed)
+            if rejected:
+                logging.info(f"robots.txt odrzucił {rejected} z {len(allowed)} URL dla {domain}")
+        return results
+
+    def _parser_for(self, domain):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(domain)
+            stale = entry is not None and entry["expires_at"] <= time.time()
+            if stale and domain not in self._refreshing:
+                self._refreshing.add(domain)
+                self._background().submit(self._refresh, domain)
+            if entry is not None and domain in self.parsers:
+                return self.parsers[domain]
+
+        if entry is None:
+            entry = self._refresh(domain)
+        return self._build_parser(domain, entry)
+
+    def _refresh(self, domain):
+        """Pobiera robots.txt i zapisuje wynik w cache (również błąd — cache negatywny)."""
+        fetched_at = time.time()
+        try:
+            entry = self._download(domain)
+        except Exception as e:
+            logging.warning(f"Nie można odczytać pliku robots.txt dla domeny {domain}: {e}. Przyjmuję, że można pobierać.")
+            entry = None
+
+        with self._lock:
+            previous = self.entries.get(domain)
+            if previous and previous.get("fetched_at", 0) > fetched_at:
+                # Wolniejsze pobranie rozpoczęte wcześniej nie nadpisuje nowszych reguł
+                self._refreshing.discard(domain)
+                return previous
+            if entry is None:
+                # Zachowujemy poprzednie reguły (jeśli były), ponowna próba po negative_ttl
+                entry = dict(previous) if previous and previous["status"] != "error" else {"status": "error", "body": ""}
+                entry["expires_at"] = time.time() + self.negative_ttl
+            entry["fetched_at"] = fetched_at
+            self.entries[domain] = entry
+            self.parsers.pop(domain, None)
+            self._refreshing.discard(domain)
+            self._save()
+
+        self._build_parser(domain, entry)
+        return entry
+
+    def _download(self, domain):
+        """Pobiera robots.txt przez współdzieloną sesję HTTP (z timeoutem)."""
+        response = session_manager.get(domain + '/robots.txt', timeout=self.timeout)
+        # Kody odpowiedzi traktujemy tak samo jak RobotFileParser.read()
+        if response.status_code in (401, 403):
+            status, body = "disallow_all", ""
+        elif 400 <= response.status_code < 500:
+            status, body = "allow_all", ""
+        else:
+            response.raise_for_status()
+            status, body = "ok", response.text
+        return {"status": status, "body": body, "expires_at": time.time() + self.ttl}
+
+    def _build_parser(self, domain, entry):
+        """Kompiluje reguły z wpisu cache i przekazuje Crawl-delay / Request-rate do limitera."""
+        with self._lock:
+            if domain in self.parsers:
+                return self.parsers[domain]
+
+        if entry["status"] == "error":
+            rp = None
+        else:
+            rp = CompiledRobots(entry["body"] if entry["status"] == "ok" else "",
+                                allow_all=entry["status"] == "allow_all",
+                                disallow_all=entry["status"] == "disallow_all")
+
+        with self._lock:
+            # Parser dla wpisu, który w międzyczasie został zastąpiony, nie trafia do cache ani do limitera
+            if self.entries.get(domain) is entry:
+                if rp is not None:
+                    self._apply_policy(domain, rp)
+                self.parsers[domain] = rp
+        return rp
+
+    def _apply_policy(self, domain, rp):
+        crawl_delay = rp.crawl_delay('*')
+        request_rate = rp.request_rate('*')
+        requests_per_minute = None
+        if request_rate and request_rate.seconds:
+            requests_per_minute = request_rate.requests * 60.0 / request_rate.seconds
+        # Wywołujemy zawsze — brak dyrektyw w nowej wersji robots.txt usuwa poprzednią politykę
+        self.limiter.apply_robots_policy(urlparse(domain).netloc, float(crawl_delay or 0) or None,
+                                         requests_per_minute)
+
+    def _background(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="robots-refresh")
+        return self._executor
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        self.entries = load_json(self.cache_path)
+
+    def _save(self):
+        try:
+            save_json(self.cache_path, self.entries)
+        except OSError as e:
+            logging.warning(f"Nie można zapisać cache robots.txt: {e}")
+
 # Global instance
 robot_manager = RobotManager()
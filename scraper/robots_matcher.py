@@ -0,0 +1,187 @@
+import functools
+import re
+from collections import namedtuple
+from urllib.parse import urlparse, quote, unquote
+
+RequestRate = namedtuple("RequestRate", "requests seconds")
+
+# Maksymalna liczba zapamiętanych wyników na grupę reguł
+MEMO_LIMIT = 50000
+
+
+class _RuleGroup:
+    """
+    Reguły jednej grupy User-agent skompilowane do szybkiego dopasowania.
+
+    Reguły bez symboli wieloznacznych trafiają do drzewa prefiksów (trie),
+    reguły z `*` i `$` do prekompilowanych wyrażeń regularnych. Wygrywa
+    najdłuższa pasująca reguła, a przy remisie Allow (RFC 9309).
+    """
+
+    def __init__(self, agents):
+        self.agents = agents
+        self.rules = []
+        self.crawl_delay = None
+        self.request_rate = None
+        self._trie = {}
+        self._wildcards = []
+        self._memo = {}
+
+    def add_rule(self, allow, path):
+        self.rules.append((allow, path))
+
+    def compile(self):
+        self._trie = {}
+        self._wildcards = []
+        for allow, path in self.rules:
+            if "*" in path or path.endswith("$"):
+                pattern = re.escape(path.rstrip("$")).replace(r"\*", ".*")
+                if path.endswith("$"):
+                    pattern += r"\Z"
+                self._wildcards.append((len(path), allow, re.compile(pattern)))
+            else:
+                node = self._trie
+                for char in path:
+                    node = node.setdefault(char, {})
+                # Przy tej samej ścieżce Allow ma pierwszeństwo
+                node[None] = node.get(None, False) or allow
+        self._wildcards.sort(key=lambda rule: (-rule[0], not rule[1]))
+        self._memo = {}
+
+    def allowed(self, path):
+        result = self._memo.get(path)
+        if result is not None:
+            return result
+
+        best_length, best_allow = -1, True
+        node = self._trie
+        if None in node:
+            best_length, best_allow = 0, node[None]
+        for depth, char in enumerate(path, 1):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                best_length, best_allow = depth, node[None]
+
+        for length, allow, regex in self._wildcards:
+            if length < best_length or (length == best_length and not allow):
+                break
+            if regex.match(path):
+                best_length, best_allow = length, allow
+                break
+
+        if len(self._memo) >= MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[path] = best_allow
+        return best_allow
+
+
+class CompiledRobots:
+    """
+    Skompilowany robots.txt — zamiennik urllib.robotparser.RobotFileParser.
+
+    Obsługuje symbole `*` i `$`, dopasowanie najdłuższej reguły oraz
+    sprawdzanie wielu adresów naraz (can_fetch_many) z pamięcią wyników per ścieżka.
+    """
+
+    def __init__(self, text="", allow_all=False, disallow_all=False):
+        self.allow_all = allow_all
+        self.disallow_all = disallow_all
+        self.groups = []
+        self.default_group = None
+        if text:
+            self.parse(text.splitlines())
+
+    def parse(self, lines):
+        groups = []
+        current = None
+        in_rules = False
+        for line in lines:
+            line = line.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            field, value = (part.strip() for part in line.split(":", 1))
+            field = field.lower()
+            if field == "user-agent":
+                if current is None or in_rules:
+                    current = _RuleGroup([])
+                    groups.append(current)
+                    in_rules = False
+                current.agents.append(value.lower())
+            elif current is None:
+                continue
+            elif field in ("allow", "disallow"):
+                in_rules = True
+                if value:
+                    current.add_rule(field == "allow", _normalize_path(value))
+            elif field == "crawl-delay":
+                in_rules = True
+                try:
+                    current.crawl_delay = float(value)
+                except ValueError:
+                    pass
+            elif field == "request-rate":
+                in_rules = True
+                requests, _, seconds = value.partition("/")
+                if requests.strip().isdigit() and seconds.strip().isdigit():
+                    current.request_rate = RequestRate(int(requests), int(seconds))
+
+        self.groups = []
+        self.default_group = None
+        for group in groups:
+            group.compile()
+            if "*" in group.agents:
+                if self.default_group is None:
+                    self.default_group = group
+            else:
+                self.groups.append(group)
+
+    def _group_for(self, user_agent):
+        name = user_agent.split("/")[0].lower()
+        for group in self.groups:
+            if any(agent in name for agent in group.agents):
+                return group
+        return self.default_group
+
+    def can_fetch(self, user_agent, url):
+        if self.disallow_all:
+            return False
+        if self.allow_all:
+            return True
+        group = self._group_for(user_agent)
+        if group is None:
+            return True
+        return group.allowed(_url_path(url))
+
+    def can_fetch_many(self, user_agent, urls):
+        """Sprawdza listę adresów; zwraca listę wartości logicznych w tej samej kolejności."""
+        if self.disallow_all or self.allow_all:
+            return [self.allow_all and not self.disallow_all] * len(urls)
+        group = self._group_for(user_agent)
+        if group is None:
+            return [True] * len(urls)
+        return [group.allowed(_url_path(url)) for url in urls]
+
+    def crawl_delay(self, user_agent):
+        group = self._group_for(user_agent)
+        return group.crawl_delay if group else None
+
+    def request_rate(self, user_agent):
+        group = self._group_for(user_agent)
+        return group.request_rate if group else None
+
+
+def _normalize_path(path):
+    return quote(unquote(path), safe="/*$?=&;:@+,%")
+
+
+@functools.lru_cache(maxsize=MEMO_LIMIT)
+def _url_path(url):
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    if parsed.params:
+        path += ";" + parsed.params
+    if parsed.query:
+        path += "?" + parsed.query
+    return _normalize_path(path)
@@ -1,60 +1,227 @@
+import asyncio
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urlparse
 from .fetcher import fetch_with_fallback
-from .parser import parse_products
-from .storage import save_products
+from .parser import parse_products, parse_path_stats
+from .storage import save_products, storage_writer, write_queue, archive_old_data, ARCHIVE_DIR
 from .email_alerter import send_email_alert
+from .http_session import session_manager
+from .http_cache import validator_cache, NOT_MODIFIED
+from .fingerprint import page_fingerprints
+from .strategy import strategy_memory
+from .streaming import ProductStream, can_stream
+from .parse_pool import parse_pool
 
-def run_scrape_once(urls: dict):
+def _parse(html: str, url: str):
+    """Parsuje stronę w puli procesów (jeśli włączona) albo w bieżącym procesie."""
+    if parse_pool.enabled:
+        return parse_pool.parse(html, url)
+    return parse_products(html, url)
+
+
+def _stream_source(source: str, url: str):
     """
-    Jednorazowe pobranie danych.
+    Pobiera i parsuje źródło strumieniowo (produkty powstają w trakcie pobierania).
+    Zwraca liczbę produktów albo None, gdy trzeba wrócić do zwykłej ścieżki.
+    """
+    stream = ProductStream(url)
+    products = list(stream)
+
+    if stream.not_modified:
+        cached = validator_cache.cached_products(url) or []
+        print(f"[{source}] Strona bez zmian (304) — pomijam zapis ({len(cached)} produktów).")
+        return len(cached)
+
+    if not products:
+        print(f"[{source}] Strumień nie dał produktów — przechodzę do zwykłego pobierania.")
+        return None
+
+    print(f"[{source}] Znaleziono {len(products)} produktów (strumieniowo: pierwszy po "
+          f"{stream.first_product_ms} ms, całość {stream.total_ms} ms).")
+    validator_cache.store_products(url, products)
+    save_products(products, source)
+    return len(products)
+
+
+def _scrape_source(source: str, url: str, streaming: bool = False):
+    """
+    Pobiera, parsuje i zapisuje dane jednego źródła.
+    streaming -> dla domen z rejestru ekstraktorów parsuje odpowiedź w trakcie pobierania
     Zwraca liczbę znalezionych produktów.
     """
-    print("\n===== NOWE WYKONANIE SCRAPERA =====")
-    print(f"Data: {datetime.now()}\n")
-    total_products_found = 0
+    print(f"[{source}] Pobieram dane...")
+
+    if streaming and can_stream(url):
+        found = _stream_source(source, url)
+        if found is not None:
+            return found
+
+    # --- Krok 1: Requests ---
+    html = fetch_with_fallback(url)
+
+    if not html:
+        print(f"[{source}] Błąd pobierania (Requests).")
+        return 0
+
+    if html is NOT_MODIFIED:
+        cached = validator_cache.cached_products(url) or []
+        print(f"[{source}] Strona bez zmian (304) — pomijam parsowanie i zapis ({len(cached)} produktów).")
+        return len(cached)
+
+    # --- Odcisk treści: identyczna strona → bez parsowania i zapisu ---
+    digest = page_fingerprints.fingerprint(source, html)
+    cached = page_fingerprints.cached_products(source, digest)
+    if cached is not None:
+        print(f"[{source}] Treść strony bez zmian — pomijam parsowanie i zapis ({len(cached)} produktów).")
+        strategy_memory.record_result(url, len(cached))
+        return len(cached)
+
+    products = _parse(html, url)
+    strategy_memory.record_result(url, len(products))
+
+    # --- Krok 2: Jeśli parser nic nie wykrył → Selenium ---
+    if len(products) == 0:
+        print(f"[{source}] Parser nic nie znalazł — próbuję Selenium...")
+
+        html = fetch_with_fallback(url, wait_selector=".thumbnail")  
+        # ".thumbnail" jest OGÓLNYM selektorem produktów dla wielu sklepów
+
+        if html and html is not NOT_MODIFIED:
+            digest = page_fingerprints.fingerprint(source, html)
+            cached = page_fingerprints.cached_products(source, digest)
+            if cached is not None:
+                print(f"[{source}] Treść strony bez zmian — pomijam parsowanie i zapis ({len(cached)} produktów).")
+                strategy_memory.record_result(url, len(cached))
+                return len(cached)
+            products = _parse(html, url)
+            strategy_memory.record_result(url, len(products))
 
+    print(f"[{source}] Znaleziono {len(products)} produktów.")
+    validator_cache.store_products(url, products)
+    if products:
+        # digest pochodzi z ostatnio sparsowanego HTML, czyli z tego, który dał produkty;
+        # pustej strony nie zapamiętujemy, żeby kolejny cykl znów spróbował Selenium
+        page_fingerprints.remember(source, digest, products)
+    save_products(products, source)
+    return len(products)
+
+
+async def run_scrape_once_async(urls: dict, streaming: bool = False):
+    """
+    Współbieżne pobranie danych ze wszystkich źródeł.
+
+    Źródła są grupowane po domenie: domeny przetwarzane są równolegle,
+    a źródła z tej samej domeny po kolei, więc limity RateLimitera
+    i sprawdzanie robots.txt działają jak w trybie sekwencyjnym.
+    Zwraca liczbę znalezionych produktów.
+    """
+    by_domain = {}
     for source, url in urls.items():
-        print(f"[{source}] Pobieram dane...")
+        by_domain.setdefault(urlparse(url).netloc, []).append((source, url))
 
-        # --- Krok 1: Requests ---
-        html = fetch_with_fallback(url)
+    if not by_domain:
+        return 0
 
-        if not html:
-            print(f"[{source}] Błąd pobierania (Requests).")
-            continue
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=len(by_domain)) as executor:
 
-        products = parse_products(html)
+        async def scrape_domain(sources):
+            found = 0
+            for source, url in sources:
+                found += await loop.run_in_executor(executor, _scrape_source, source, url, streaming)
+            return found
 
-        # --- Krok 2: Jeśli parser nic nie wykrył → Selenium ---
-        if len(products) == 0:
-            print(f"[{source}] Parser nic nie znalazł — próbuję Selenium...")
+        results = await asyncio.gather(*(scrape_domain(sources) for sources in by_domain.values()))
 
-            html = fetch_with_fallback(url, wait_selector=".thumbnail")  
-            # ".thumbnail" jest OGÓLNYM selektorem produktów dla wielu sklepów
+    return sum(results)
 
-            if html:
-                products = parse_products(html)
 
-        print(f"[{source}] Znaleziono {len(products)} produktów.")
-        total_products_found += len(products)
-        save_products(products, source)
+def run_scrape_once(urls: dict, concurrent: bool = False, streaming: bool = False):
+    """
+    Jednorazowe pobranie danych.
+    concurrent -> pobiera wszystkie domeny współbieżnie (asyncio)
+    streaming -> parsuje strony znanych sklepów w trakcie pobierania
+    Zwraca liczbę znalezionych produktów.
+    """
+    print("\n===== NOWE WYKONANIE SCRAPERA =====")
+    print(f"Data: {datetime.now()}\n")
+
+    # Zapisy ze wszystkich źródeł trafiają do bazy jedną transakcją na końcu cyklu
+    with storage_writer.cycle():
+        if concurrent:
+            total_products_found = asyncio.run(run_scrape_once_async(urls, streaming))
+        else:
+            total_products_found = 0
+            for source, url in urls.items():
+                total_products_found += _scrape_source(source, url, streaming)
+    storage_stats = storage_writer.stats()
+    print(f"[Storage] zapisano {storage_stats['rows']} wierszy w {storage_stats['commits']} transakcjach")
+    if storage_writer.mode == "intervals":
+        print(f"[Storage] przedziały cen: {storage_stats['intervals_opened']} nowych, "
+              f"{storage_stats['intervals_extended']} przedłużonych")
+    if write_queue.enabled:
+        queue_stats = write_queue.stats()
+        print(f"[Storage] kolejka: {queue_stats['depth']} paczek (maks. {queue_stats['max_depth']}), "
+              f"commit śr. {queue_stats['avg_commit_ms']} ms / maks. {queue_stats['max_commit_ms']} ms, "
+              f"blokady: {queue_stats['blocked']} ({queue_stats['blocked_ms']} ms)")
+
+    for domain, stats in session_manager.stats().items():
+        print(f"[HTTP] {domain}: {stats['requests']} żądań, {stats['connections']} połączeń, "
+              f"{stats['reused']} ponownie użytych")
+
+    cache_stats = validator_cache.stats()
+    print(f"[HTTP cache] trafienia: {cache_stats['hits']}, chybienia: {cache_stats['misses']}, "
+          f"wpisy: {cache_stats['entries']}")
+    for source, url in urls.items():
+        paths = parse_path_stats.get(url)
+        if paths:
+            print(f"[Parser] {source}: " + ", ".join(f"{path}: {count}" for path, count in paths.items()))
+
+    if parse_pool.enabled:
+        pool_stats = parse_pool.stats()
+        print(f"[Parser] pula {pool_stats['workers']} procesów: {pool_stats['pages']} stron "
+              f"w {pool_stats['batches']} paczkach (średnio {pool_stats['avg_batch']})")
+    validator_cache.save()
+    page_fingerprints.save()
+    strategy_memory.save()
 
     print("\n===== KONIEC WYKONANIA =====\n")
     return total_products_found
 
 
-def run_scheduler(urls: dict, interval_minutes: int = 1, email_config: dict = None):
+def _archive(archive_after_days: int, archive_dir: str, compression: str):
+    """Przenosi stare obserwacje do archiwum Parquet; błąd nie zatrzymuje schedulera."""
+    # Wiersze z kolejki muszą trafić do bazy, zanim sprawdzimy, co jest stare
+    write_queue.flush()
+    try:
+        archive_old_data(archive_after_days, archive_dir=archive_dir, compression=compression)
+    except Exception as e:
+        print(f"[ERROR] Archiwizacja nie powiodła się: {e}")
+
+
+def run_scheduler(urls: dict, interval_minutes: int = 1, email_config: dict = None, concurrent: bool = False,
+                  streaming: bool = False, archive_after_days: int = 0, archive_dir: str = ARCHIVE_DIR,
+                  archive_compression: str = "zstd"):
     """
     Uruchamia scraper co X minut.
+    concurrent -> każdy cykl pobiera domeny współbieżnie
+    streaming -> strony znanych sklepów są parsowane w trakcie pobierania
+    archive_after_days -> raz dziennie przenosi starsze obserwacje do archiwum Parquet (0 = wyłączone)
     Zatrzymanie: Ctrl + C
     """
     print(f"Scheduler uruchomiony. Odpytuję co {interval_minutes} minut.")
     print("Aby przerwać — wciśnij CTRL + C.\n")
 
+    archived_on = None
     try:
         while True:
-            products_found = run_scrape_once(urls)
+            products_found = run_scrape_once(urls, concurrent=concurrent, streaming=streaming)
+
+            if archive_after_days and archived_on != date.today():
+                _archive(archive_after_days, archive_dir, archive_compression)
+                archived_on = date.today()
             
             if email_config and email_config.get("alerts_enabled"):
                 receiver_email = email_config.get("email_address")
@@ -66,3 +233,8 @@ def run_scheduler(urls: dict, interval_minutes: int = 1, email_config: dict = No
             time.sleep(interval_minutes * 60)
     except KeyboardInterrupt:
         print("\nZatrzymano scheduler.")
+    finally:
+        # Nic z kolejki zapisu w tle nie może przepaść przy zatrzymaniu
+        if write_queue.enabled:
+            print(f"[Storage] Zapisuję {write_queue.stats()['depth']} oczekujących paczek...")
+        write_queue.close()
@@ -2,34 +2,256 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+import atexit
+import collections
+import functools
+import threading
 import time
 from .rate_limiter import limiter
 from .robot_parser import robot_manager
+from .extractors import ready_selector
 from urllib.parse import urlparse
 
-def create_driver():
+IMAGE_URL_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico"]
+
+# Lekki profil renderowania — do ekstrakcji cen wystarczy sam DOM.
+# page_load_strategy i window_size obowiązują przy starcie przeglądarki (pula trzyma
+# osobne przeglądarki dla każdej pary ustawień), block_images i blocked_urls są
+# ustawiane przez CDP przy każdym pobraniu.
+DEFAULT_RENDER_PROFILE = {
+    "page_load_strategy": "eager",
+    "window_size": "1280,800",
+    "block_images": True,
+    "blocked_urls": [
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        "*.mp4", "*.webm", "*.mp3",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*googlesyndication.com*", "*facebook.net*", "*hotjar.com*",
+    ],
+}
+
+# Nadpisania profilu per domena, np. {"shop.example": {"blocked_urls": [...]}}
+render_profiles = {}
+
+# Ostatnie pomiary pobrań (bajty, czas ładowania)
+fetch_stats = collections.deque(maxlen=200)
+
+_METRICS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || nav.encodedBodySize || 0) : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+return {
+    bytes: bytes,
+    resources: resources.length,
+    dom_ready_ms: nav ? Math.round(nav.domContentLoadedEventEnd - nav.startTime) : null,
+    js_heap: performance.memory ? performance.memory.usedJSHeapSize : null
+};
+"""
+
+# Gotowość DOM: brak mutacji przez stable_ms, brak zakończonych żądań sieciowych
+# przez idle_ms i obecny selektor produktów. Jeśli strona jest stabilna przez
+# settle_ms, a selektor się nie pojawił, uznajemy, że już się nie pojawi.
+_READY_JS = """
+const selector = arguments[0], stableMs = arguments[1], idleMs = arguments[2], settleMs = arguments[3];
+if (!window.__scraperReady) {
+    window.__scraperReady = {lastMutation: performance.now()};
+    new MutationObserver(() => { window.__scraperReady.lastMutation = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+if (document.readyState === 'loading') { return false; }
+const now = performance.now();
+let lastResponse = 0;
+for (const r of performance.getEntriesByType('resource')) {
+    if (r.responseEnd > lastResponse) { lastResponse = r.responseEnd; }
+}
+const quietFor = Math.min(now - window.__scraperReady.lastMutation, now - lastResponse);
+if (selector && !document.querySelector(selector)) { return quietFor >= settleMs; }
+return now - window.__scraperReady.lastMutation >= stableMs && now - lastResponse >= idleMs;
+"""
+
+def wait_until_ready(driver, selectors=(), timeout=10, stable_ms=300, idle_ms=500, settle_ms=2000):
+    """
+    Czeka, aż strona będzie gotowa do parsowania, zamiast stałego time.sleep.
+    selectors -> selektory produktów; wystarczy, że pojawi się którykolwiek z nich
+    """
+    selector = ", ".join(s for s in selectors if s) or None
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+        lambda d: d.execute_script(_READY_JS, selector, stable_ms, idle_ms, settle_ms)
+    )
+
+def register_render_profile(domain, **overrides):
+    """Ustawia nadpisania profilu renderowania dla domeny."""
+    render_profiles[domain] = dict(overrides)
+
+def get_render_profile(url):
+    """Zwraca profil renderowania dla adresu URL (domyślny + nadpisania domeny)."""
+    profile = dict(DEFAULT_RENDER_PROFILE)
+    profile.update(render_profiles.get(urlparse(url).netloc, {}))
+    return profile
+
+def _startup_key(profile):
+    """Ustawienia profilu, z którymi przeglądarka musi zostać uruchomiona."""
+    profile = profile or DEFAULT_RENDER_PROFILE
+    return profile["page_load_strategy"], profile["window_size"]
+
+@functools.lru_cache(maxsize=1)
+def _driver_path():
+    """Ścieżka do chromedrivera — ustalana raz na proces."""
+    return ChromeDriverManager().install()
+
+def create_driver(profile=None):
     """
     Tworzy headless Chrome driver.
+    profile -> profil renderowania (strategia ładowania, rozmiar okna)
     """
+    profile = profile or DEFAULT_RENDER_PROFILE
     options = Options()
     options.add_argument("--headless")
-    options.add_argument("--window-size=1920,1080")
+    options.add_argument(f"--window-size={profile['window_size']}")
+    options.page_load_strategy = profile["page_load_strategy"]
     try:
-        service = Service(ChromeDriverManager().install())
+        service = Service(_driver_path())
         driver = webdriver.Chrome(service=service, options=options)
         return driver
     except Exception as e:
         print(f"[ERROR] Nie udało się zainstalować lub uruchomić Chrome Drivera: {e}")
         return None
 
-def fetch_html_selenium(url, wait_selector=None, timeout=10, retries=1):
+def _apply_network_profile(driver, profile):
+    """Blokuje wzorce URL (obrazy, reklamy, analityka, media) przez CDP."""
+    urls = list(profile.get("blocked_urls", []))
+    if profile.get("block_images"):
+        urls += IMAGE_URL_PATTERNS
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+    except Exception as e:
+        print(f"[Selenium] Nie udało się ustawić blokowania zasobów: {e}")
+
+def _record_metrics(driver, url, load_seconds):
+    """Zapisuje i wypisuje liczbę pobranych bajtów oraz czas ładowania strony."""
+    try:
+        metrics = driver.execute_script(_METRICS_JS)
+    except Exception:
+        metrics = None
+    if not isinstance(metrics, dict):
+        metrics = {}
+    metrics["url"] = url
+    metrics["load_ms"] = round(load_seconds * 1000)
+    fetch_stats.append(metrics)
+
+    kb = (metrics.get("bytes") or 0) / 1024
+    print(f"[Selenium] {url}: {kb:.0f} KB, {metrics['load_ms']} ms")
+    return metrics
+
+class DriverPool:
+    """
+    Ograniczona pula długo żyjących przeglądarek.
+
+    Driver jest wypożyczany na czas jednego pobrania i zwracany do puli.
+    Po `max_pages` stronach lub po awarii jest zamykany i zastępowany nowym.
+    Kilka wątków może korzystać z puli jednocześnie (maks. `max_size` przeglądarek).
+    Driver jest wydawany tylko dla profilu z tymi samymi ustawieniami startowymi
+    (strategia ładowania, rozmiar okna); przy pełnej puli bezczynny driver
+    z innymi ustawieniami jest zamykany i zastępowany.
+    """
+
+    def __init__(self, max_size=2, max_pages=50):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self._idle = []
+        self._pages = {}
+        self._startup = {}
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None, profile=None):
+        """
+        Wypożycza sprawny driver (lub None, gdy nie da się go utworzyć).
+        profile -> profil renderowania; driver jest uruchomiony z jego ustawieniami startowymi
+        """
+        key = _startup_key(profile)
+        while True:
+            stale = None
+            with self._cond:
+                while True:
+                    driver = next((d for d in reversed(self._idle) if self._startup.get(id(d)) == key), None)
+                    if driver is not None:
+                        self._idle.remove(driver)
+                        break
+                    if self._created < self.max_size or self._idle:
+                        if self._created >= self.max_size:
+                            # Miejsce zwalnia bezczynny driver z innym profilem startowym
+                            stale = self._idle.pop(0)
+                        self._created += 1
+                        break
+                    if not self._cond.wait(timeout):
+                        return None
+
+            if stale is not None:
+                self._discard(stale)
+            if driver is None:
+                driver = create_driver(profile)
+                if driver is None:
+                    self._forget(None)
+                    return None
+                self._pages[id(driver)] = 0
+                self._startup[id(driver)] = key
+                return driver
+
+            if self._is_healthy(driver):
+                return driver
+            print("[Selenium] Driver nie odpowiada — uruchamiam nowy.")
+            self._discard(driver)
+
+    def release(self, driver, broken=False):
+        """Zwraca driver do puli; zepsuty lub „zużyty” driver jest zamykany."""
+        pages = self._pages.get(id(driver), 0) + 1
+        self._pages[id(driver)] = pages
+        if broken or pages >= self.max_pages:
+            self._discard(driver)
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def close(self):
+        """Zamyka wszystkie bezczynne przeglądarki."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self._forget(driver)
+
+    def _forget(self, driver):
+        self._pages.pop(id(driver), None)
+        self._startup.pop(id(driver), None)
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+def fetch_html_selenium(url, wait_selector=None, timeout=10, retries=1, profile=None):
     """
     Pobiera HTML dynamicznej strony za pomocą Selenium + Chrome.
-    wait_selector -> CSS selector, na który Selenium czeka (opcjonalne)
+    wait_selector -> CSS selector, na który Selenium czeka (opcjonalne, obok kontenera produktów z rejestru ekstraktorów)
+    profile -> profil renderowania (domyślnie: get_render_profile(url))
     """
     if not robot_manager.can_fetch(url):
         print(f"[INFO] Pobieranie {url} zabronione przez robots.txt")
@@ -41,33 +263,50 @@ def fetch_html_selenium(url, wait_selector=None, timeout=10, retries=1):
 
     print(f"[Selenium] Pobieram stronę: {url}")
 
-    driver = create_driver()
+    profile = profile or get_render_profile(url)
+    driver = driver_pool.acquire(profile=profile)
     if not driver:
         return None
-        
-    driver.get(url)
+
+    _apply_network_profile(driver, profile)
+
+    try:
+        started = time.monotonic()
+        driver.get(url)
+    except Exception as e:
+        print(f"[Selenium] Błąd przeglądarki podczas ładowania {url}: {e}")
+        driver_pool.release(driver, broken=True)
+        return None
 
     try:
         # Check for 429 error
         if "Too Many Requests" in driver.title or "429" in driver.page_source:
             print(f"[WARNING] Otrzymano błąd 429 (Too Many Requests) dla {url}.")
             limiter.handle_error_429(url)
-            driver.quit()
+            driver_pool.release(driver)
             if retries > 0:
                 print("[INFO] Ponawiam próbę pobrania...")
-                return fetch_html_selenium(url, wait_selector, timeout, retries - 1)
+                return fetch_html_selenium(url, wait_selector, timeout, retries - 1, profile)
             return None
 
-        if wait_selector:
-            WebDriverWait(driver, timeout).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
-            )
-        else:
-            time.sleep(2)  # minimalne oczekiwanie, jeśli nie ma wait_selector
+        wait_until_ready(driver, (ready_selector(url), wait_selector), timeout=timeout)
             
     except Exception as e:
         print(f"[Selenium] Timeout lub błąd podczas oczekiwania na element: {e}")
 
-    html = driver.page_source
-    driver.quit()
+    _record_metrics(driver, url, time.monotonic() - started)
+
+    try:
+        html = driver.page_source
+    except Exception as e:
+        print(f"[Selenium] Nie udało się odczytać strony {url}: {e}")
+        driver_pool.release(driver, broken=True)
+        return None
+
+    limiter.record_success(url)
+    driver_pool.release(driver)
     return html
+
+# Global instance
+driver_pool = DriverPool(max_size=2)
+atexit.register(driver_pool.close)
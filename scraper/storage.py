@@ -1,43 +1,755 @@
+import atexit
+import calendar
+import hashlib
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 import pandas as pd
-from datetime import datetime
+from .archive import ARCHIVE_DIR, archive_available, load_archive, write_archive
+from .prices import normalize_price
 
 DB_NAME = "scraped_data.db"
+# Widok ze starymi kolumnami (data_zdarzenia, kategoria, wartosc, waluta, region)
 TABLE_NAME = "scraped_data"
+LEGACY_TABLE = "scraped_data_legacy"
+
+# Schemat znormalizowany: słowniki regionów (sklepów) i produktów oraz wąska
+# tabela obserwacji. ts -> sekundy epoki liczone z lokalnego czasu
+# (naiwne datetime.now(), jak dotychczasowe data_zdarzenia).
+# W trybie "intervals" zamiast obserwacji zapisywane są przedziały stałej ceny:
+# [valid_from, valid_to) i last_seen — ostatni cykl, w którym cenę widziano.
+_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS regions (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY,
+        key INTEGER NOT NULL UNIQUE,
+        region_id INTEGER NOT NULL REFERENCES regions(id),
+        name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS observations (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        region_id INTEGER NOT NULL REFERENCES regions(id),
+        ts INTEGER NOT NULL,
+        price REAL NOT NULL,
+        currency TEXT
+    );
+    CREATE TABLE IF NOT EXISTS price_intervals (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        region_id INTEGER NOT NULL REFERENCES regions(id),
+        valid_from INTEGER NOT NULL,
+        valid_to INTEGER,
+        last_seen INTEGER NOT NULL,
+        price REAL NOT NULL,
+        currency TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_products_name ON products (name);
+    CREATE INDEX IF NOT EXISTS idx_observations_product_ts ON observations (product_id, ts, price, currency, region_id);
+    CREATE INDEX IF NOT EXISTS idx_observations_region_ts ON observations (region_id, ts, product_id, price, currency);
+    CREATE INDEX IF NOT EXISTS idx_intervals_product ON price_intervals (product_id, valid_from);
+    CREATE INDEX IF NOT EXISTS idx_intervals_region ON price_intervals (region_id, valid_from);
+    CREATE INDEX IF NOT EXISTS idx_intervals_open ON price_intervals (product_id) WHERE valid_to IS NULL
+"""
+# Przedział ceny czytany jest jak obserwacje na jego początku i w last_seen
+_VIEW = f"""
+    CREATE VIEW IF NOT EXISTS {TABLE_NAME} AS
+    SELECT o.id, datetime(o.ts, 'unixepoch') AS data_zdarzenia, p.name AS kategoria,
+           o.price AS wartosc, o.currency AS waluta, r.name AS region
+    FROM (
+        SELECT id, product_id, region_id, ts, price, currency FROM observations
+        UNION ALL
+        SELECT NULL, product_id, region_id, valid_from, price, currency FROM price_intervals
+        UNION ALL
+        SELECT NULL, product_id, region_id, last_seen, price, currency FROM price_intervals
+        WHERE last_seen > valid_from
+    ) o
+    JOIN products p ON p.id = o.product_id
+    JOIN regions r ON r.id = o.region_id
+"""
+# Wersja schematu (PRAGMA user_version); zmiana definicji widoku wymaga jego odtworzenia
+SCHEMA_VERSION = 2
+STORAGE_MODES = ("observations", "intervals")
+_INSERT = "INSERT INTO observations (product_id, region_id, ts, price, currency) VALUES (?, ?, ?, ?, ?)"
+_OPEN_INTERVAL = (
+    "INSERT INTO price_intervals (product_id, region_id, valid_from, last_seen, price, currency) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def product_key(region, name):
+    """Stabilny 64-bitowy skrót pary (sklep, nazwa produktu)."""
+    digest = hashlib.blake2b(f"{region}\x00{name}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def to_epoch(value):
+    """datetime / date / tekst ISO -> sekundy epoki czasu lokalnego (jak kolumna ts)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return calendar.timegm(value.timetuple())
+
+
+class _StaleIndex(Exception):
+    """Indeks otwartych przedziałów w pamięci nie zgadza się z bazą."""
+
+
+def _chunks(items, size=500):
+    """Porcje parametrów dla zapytań IN (...) — limit zmiennych SQLite."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _object_type(conn, name):
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def migrate_legacy(conn):
+    """
+    Jednorazowa migracja starej tabeli scraped_data do schematu znormalizowanego.
+    Stara tabela zostaje jako scraped_data_legacy, a w jej miejscu powstaje widok.
+    Zwraca liczbę przeniesionych obserwacji (0, gdy nie było czego migrować).
+    """
+    if _object_type(conn, TABLE_NAME) != "table":
+        return 0
+    conn.create_function("product_key", 2, product_key, deterministic=True)
+    conn.create_function("normalize_price", 1, normalize_price, deterministic=True)
+    conn.execute("BEGIN IMMEDIATE")
+    # Ponowne sprawdzenie pod blokadą zapisu: inny proces (analizator, panel)
+    # mógł zmigrować bazę między pierwszym sprawdzeniem a BEGIN
+    if _object_type(conn, TABLE_NAME) != "table":
+        conn.execute("ROLLBACK")
+        return 0
+    try:
+        conn.execute(f"ALTER TABLE {TABLE_NAME} RENAME TO {LEGACY_TABLE}")
+        for statement in filter(str.strip, _SCHEMA.split(";")):
+            conn.execute(statement)
+        conn.execute(f"INSERT OR IGNORE INTO regions (name) SELECT DISTINCT region FROM {LEGACY_TABLE}")
+        conn.execute(f"""
+            INSERT OR IGNORE INTO products (key, region_id, name)
+            SELECT product_key(l.region, l.kategoria), r.id, l.kategoria
+            FROM (SELECT DISTINCT region, kategoria FROM {LEGACY_TABLE}) l
+            JOIN regions r ON r.name = l.region
+        """)
+        migrated = conn.execute(f"""
+            INSERT INTO observations (product_id, region_id, ts, price, currency)
+            SELECT p.id, p.region_id, ts, price, waluta FROM (
+                SELECT product_key(region, kategoria) AS key,
+                       CAST(strftime('%s', data_zdarzenia) AS INTEGER) AS ts,
+                       normalize_price(wartosc) AS price, waluta, id
+                FROM {LEGACY_TABLE}
+            ) l
+            JOIN products p ON p.key = l.key
+            WHERE l.ts IS NOT NULL AND l.price IS NOT NULL
+            ORDER BY l.id
+        """).rowcount
+        conn.execute(_VIEW)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("ANALYZE")
+    print(f"[INFO] Zmigrowano {migrated} obserwacji do schematu znormalizowanego "
+          f"(stara tabela: {LEGACY_TABLE}).")
+    return migrated
+
+
+def ensure_schema(conn):
+    """Tworzy schemat (i migruje starą tabelę, jeśli jest)."""
+    migrate_legacy(conn)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        conn.executescript(f"DROP VIEW IF EXISTS {TABLE_NAME}; PRAGMA user_version = {SCHEMA_VERSION};")
+    conn.executescript(_SCHEMA + ";" + _VIEW + ";")
+
+
+class StorageWriter:
+    """
+    Zapis obserwacji do SQLite przez jedno długo żyjące połączenie.
+
+    Baza pracuje w trybie WAL (synchronous=NORMAL, większy cache stron),
+    wiersze trafiają do bazy przez executemany z jednym przygotowanym INSERT-em,
+    a klucze produktów i regionów są trzymane w pamięci.
+    W obrębie `cycle()` wiersze ze wszystkich źródeł są buforowane w pamięci
+    i zapisywane jedną transakcją na końcu cyklu (group commit) — blokada
+    zapisu nie jest trzymana w trakcie pobierania stron.
+
+    mode="observations" -> każdy produkt z każdego cyklu to nowy wiersz
+    mode="intervals" -> nowy przedział tylko przy zmianie ceny, w przeciwnym
+    razie przesuwane jest last_seen otwartego przedziału; ostatnie ceny są
+    trzymane w pamięci (wczytywane z otwartych przedziałów przy starcie)
+    """
+
+    def __init__(self, path=DB_NAME, cache_kb=65536, mode="observations"):
+        self.path = path
+        self.cache_kb = cache_kb
+        self.mode = mode if mode in STORAGE_MODES else "observations"
+        self.rows_written = 0
+        self.commits = 0
+        self.intervals_opened = 0
+        self.intervals_extended = 0
+        self._open = None
+        self._conn = None
+        self._buffer = []
+        self._cycles = 0
+        self._regions = {}
+        self._products = {}
+        self._lock = threading.RLock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_kb)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            ensure_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    def init(self):
+        """Otwiera połączenie i tworzy tabele; w trybie "intervals" wczytuje ostatnie ceny."""
+        with self._lock:
+            conn = self._connection()
+            if self.mode == "intervals":
+                self._open_intervals(conn)
+
+    def set_mode(self, mode):
+        """Ustawia tryb zapisu ("observations" lub "intervals"); zwraca tryb faktycznie ustawiony."""
+        with self._lock:
+            self.flush()
+            self.mode = mode if mode in STORAGE_MODES else "observations"
+            return self.mode
+
+    def _open_intervals(self, conn):
+        """Indeks w pamięci: product_id -> (id przedziału, cena, waluta, last_seen)."""
+        if self._open is None:
+            self._open = {
+                product_id: (interval_id, price, currency, last_seen)
+                for product_id, interval_id, price, currency, last_seen in conn.execute(
+                    "SELECT product_id, id, price, currency, last_seen FROM price_intervals WHERE valid_to IS NULL"
+                )
+            }
+            self._products.update(
+                ((region, name), product_id) for product_id, region, name in conn.execute(
+                    "SELECT p.id, r.name, p.name FROM products p JOIN regions r ON r.id = p.region_id"
+                )
+            )
+        return self._open
+
+    def _write_intervals(self, conn, resolved, opened):
+        """
+        Zapis zmian: nowy przedział przy innej cenie (poprzedni dostaje valid_to),
+        dla tej samej ceny tylko last_seen. Zmienione przedziały trafiają do `opened`.
+        Kilka wierszy tego samego produktu z tej samej chwili (np. warianty o tej
+        samej nazwie w jednym sklepie) daje jeden punkt: najniższą cenę. Inaczej
+        przedziały zamykałyby się nawzajem w każdym cyklu.
+        Zwraca liczby (otwartych, przedłużonych) przedziałów.
+        """
+        lowest = {}
+        for row in resolved:
+            key = row[0], row[2]
+            if key not in lowest or row[3] < lowest[key][3]:
+                lowest[key] = row
+
+        current = self._open_intervals(conn)
+        extend = {}
+        new_intervals = 0
+        for product_id, region_id, ts, price, currency in lowest.values():
+            state = opened.get(product_id) or current.get(product_id)
+            if state is not None and state[1] == price and state[2] == currency:
+                if ts > state[3]:
+                    opened[product_id] = (state[0], price, currency, ts)
+                    extend[state[0]] = ts
+                continue
+            if state is not None:
+                extend.pop(state[0], None)
+                closed = conn.execute(
+                    "UPDATE price_intervals SET valid_to = ?, last_seen = ? WHERE id = ? AND valid_to IS NULL",
+                    (ts, state[3], state[0]),
+                ).rowcount
+                if not closed:
+                    raise _StaleIndex
+            interval_id = conn.execute(_OPEN_INTERVAL, (product_id, region_id, ts, ts, price, currency)).lastrowid
+            opened[product_id] = (interval_id, price, currency, ts)
+            new_intervals += 1
+        extended = conn.executemany(
+            "UPDATE price_intervals SET last_seen = ? WHERE id = ? AND valid_to IS NULL",
+            [(ts, interval_id) for interval_id, ts in extend.items()],
+        ).rowcount
+        if extend and extended != len(extend):
+            raise _StaleIndex
+        return new_intervals, len(extend)
+
+    @staticmethod
+    def _rows(products, source, timestamp):
+        ts = to_epoch(timestamp or datetime.now())
+        return [
+            (p["name"], p["price"], p.get("currency"), source, ts)
+            for p in products if p.get("price") is not None
+        ]
+
+    def _resolve(self, conn, rows, regions, products):
+        """Zamienia (nazwa, sklep) na klucze słowników; nowe wpisy trafiają do `regions` / `products`."""
+        new_regions = {source for _, _, _, source, _ in rows} - self._regions.keys()
+        if new_regions:
+            conn.executemany("INSERT OR IGNORE INTO regions (name) VALUES (?)", [(name,) for name in new_regions])
+            for chunk in _chunks(sorted(new_regions)):
+                regions.update(conn.execute(
+                    f"SELECT name, id FROM regions WHERE name IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+        region_ids = {**self._regions, **regions}
+
+        new_products = {(source, name) for name, _, _, source, _ in rows} - self._products.keys()
+        if new_products:
+            keys = {product_key(source, name): (source, name) for source, name in new_products}
+            conn.executemany(
+                "INSERT OR IGNORE INTO products (key, region_id, name) VALUES (?, ?, ?)",
+                # w kolejności klucza: wstawianie do indeksu UNIQUE bez losowych skoków po B-drzewie
+                [(key, region_ids[source], name) for key, (source, name) in sorted(keys.items())],
+            )
+            for chunk in _chunks(list(keys)):
+                for key, product_id in conn.execute(
+                    f"SELECT key, id FROM products WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                ):
+                    products[keys[key]] = product_id
+        product_ids = {**self._products, **products} if products else self._products
+
+        return [
+            (product_ids[(source, name)], region_ids[source], ts, price, currency)
+            for name, price, currency, source, ts in rows
+        ]
+
+    def write(self, products, source, timestamp=None):
+        """
+        Dodaje produkty źródła; poza cyklem zapisuje je od razu.
+        Zwraca liczbę przyjętych wierszy (produkty bez ceny są pomijane).
+        """
+        rows = self._rows(products, source, timestamp)
+        if not rows:
+            return 0
+        with self._lock:
+            self._buffer.extend(rows)
+            if not self._cycles:
+                self.flush()
+        return len(rows)
+
+    def write_many(self, batches):
+        """Zapisuje paczki (products, source, timestamp) jedną transakcją; zwraca liczbę wierszy."""
+        with self._lock:
+            for products, source, timestamp in batches:
+                self._buffer.extend(self._rows(products, source, timestamp))
+            return self.flush()
+
+    def flush(self):
+        """Zapisuje zbuforowane wiersze jedną transakcją."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            conn = self._connection()
+            for attempt in (1, 2):
+                # Nowe klucze i przedziały trafiają do pamięci podręcznej dopiero po udanym COMMIT
+                regions, products, opened = {}, {}, {}
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if self.mode == "intervals":
+                        self._open_intervals(conn)  # przed _resolve: tylko zatwierdzone klucze
+                    resolved = self._resolve(conn, rows, regions, products)
+                    if self.mode == "intervals":
+                        opened_count, extended_count = self._write_intervals(conn, resolved, opened)
+                    else:
+                        conn.executemany(_INSERT, resolved)
+                    conn.execute("COMMIT")
+                    break
+                except _StaleIndex:
+                    # Przedziały zmienił inny proces — wczytaj indeks od nowa i powtórz
+                    conn.execute("ROLLBACK")
+                    self._open = None
+                    if attempt == 2:
+                        self._buffer = rows + self._buffer
+                        raise RuntimeError("Indeks przedziałów cen jest niespójny z bazą.")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    self._buffer = rows + self._buffer
+                    raise
+            self._regions.update(regions)
+            self._products.update(products)
+            if self.mode == "intervals":
+                self._open.update(opened)
+                self.intervals_opened += opened_count
+                self.intervals_extended += extended_count
+            self.rows_written += len(rows)
+            self.commits += 1
+            return len(rows)
+
+    @contextmanager
+    def cycle(self):
+        """Grupuje zapisy z całego cyklu scrapera w jedną transakcję (także przy wyjątku)."""
+        with self._lock:
+            self._cycles += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._cycles -= 1
+                if not self._cycles:
+                    self.flush()
+
+    def stats(self):
+        return {
+            "rows": self.rows_written,
+            "commits": self.commits,
+            "buffered": len(self._buffer),
+            "intervals_opened": self.intervals_opened,
+            "intervals_extended": self.intervals_extended,
+        }
+
+    def close(self):
+        """Zapisuje bufor i zamyka połączenie."""
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+
+
+class WriteBehindQueue:
+    """
+    Zapis w tle: wątki scrapera wrzucają produkty do ograniczonej kolejki,
+    a jeden wątek zapisujący łączy wszystko, co się w niej zebrało (do
+    `max_rows` wierszy), w jedną transakcję StorageWriter.
+
+    Pełna kolejka blokuje `put` (backpressure) — pamięć jest ograniczona
+    do `maxsize` paczek. `flush()` czeka na zapis wszystkiego, co przyjęto,
+    `close()` dodatkowo zatrzymuje wątek. Przy `maxsize=0` zapis jest synchroniczny.
+    """
+
+    def __init__(self, writer, maxsize=0, max_rows=100_000):
+        self.writer = writer
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        self.batches = 0
+        self.commits = 0
+        self.failures = 0
+        self.max_depth = 0
+        self.blocked = 0
+        self.blocked_ms = 0.0
+        self.last_commit_ms = None
+        self.max_commit_ms = 0.0
+        self._commit_ms_total = 0.0
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def configure(self, maxsize):
+        """Ustawia pojemność kolejki w paczkach (0 -> zapis synchroniczny)."""
+        maxsize = max(int(maxsize or 0), 0)
+        if maxsize != self.maxsize:
+            self.close()
+            self.maxsize = maxsize
+            self._queue = queue.Queue(maxsize)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, products, source, timestamp=None):
+        """Przekazuje produkty do zapisu w tle; blokuje, gdy kolejka jest pełna."""
+        self._ensure_thread()
+        item = (products, source, timestamp or datetime.now())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            started = time.perf_counter()
+            self._queue.put(item)
+            with self._lock:
+                self.blocked += 1
+                self.blocked_ms += (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.batches += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch, rows = [item], len(item[0])
+            while rows < self.max_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            started = time.perf_counter()
+            try:
+                self.writer.write_many(batch)
+            except Exception as e:
+                # Wiersze zostają w buforze StorageWriter i trafią do bazy przy następnym zapisie
+                self.failures += 1
+                print(f"[ERROR] Zapis w tle nie powiódł się: {e}")
+            else:
+                elapsed = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self.commits += 1
+                    self.last_commit_ms = elapsed
+                    self.max_commit_ms = max(self.max_commit_ms, elapsed)
+                    self._commit_ms_total += elapsed
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+
+    def flush(self):
+        """Czeka, aż wszystkie przyjęte paczki zostaną zapisane."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self):
+        return {
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "batches": self.batches,
+            "commits": self.commits,
+            "failures": self.failures,
+            "blocked": self.blocked,
+            "blocked_ms": round(self.blocked_ms, 1),
+            "last_commit_ms": None if self.last_commit_ms is None else round(self.last_commit_ms, 1),
+            "avg_commit_ms": round(self._commit_ms_total / self.commits, 1) if self.commits else 0,
+            "max_commit_ms": round(self.max_commit_ms, 1),
+        }
+
+    def close(self):
+        """Zapisuje wszystko z kolejki i zatrzymuje wątek zapisujący."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+        self.writer.flush()
+
+
+# Global instance
+storage_writer = StorageWriter()
+atexit.register(storage_writer.close)
+write_queue = WriteBehindQueue(storage_writer)
+atexit.register(write_queue.close)  # atexit: najpierw kolejka, potem połączenie
 
 
 def init_db():
     """Inicjalizuje bazę danych i tworzy tabelę, jeśli nie istnieje."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            data_zdarzenia TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            kategoria TEXT NOT NULL,
-            wartosc REAL NOT NULL,
-            waluta TEXT,
-            region TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    storage_writer.init()
     print(f"Baza danych '{DB_NAME}' zainicjalizowana.")
 
 
 def save_products(products: list[dict], source: str):
-    """Zapisuje listę produktów do bazy danych."""
+    """
+    Zapisuje listę produktów do bazy danych: w tle (gdy kolejka jest włączona),
+    przy końcu cyklu albo od razu.
+    """
     if not products:
         return
 
-    df = pd.DataFrame(products)
-    df['region'] = source
-    df.rename(columns={'name': 'kategoria', 'price': 'wartosc', 'currency': 'waluta'}, inplace=True)
+    if write_queue.enabled:
+        write_queue.put(products, source)
+        print(f"[{source}] Przekazano {len(products)} produktów do zapisu w tle.")
+        return
+    saved = storage_writer.write(products, source)
+    print(f"[{source}] Zapisano {saved} produktów do bazy danych.")
+
+
+def _key_filters(alias, products, regions):
+    # region_id jest pierwszą kolumną indeksu (region_id, ts, ...), więc zakres czasu
+    # dla każdego sklepu czytany jest z indeksu pokrywającego, bez skanu tabeli
+    conditions, params = [], []
+    if regions or not products:
+        region_filter = f" WHERE name IN ({', '.join('?' * len(regions))})" if regions else ""
+        conditions.append(f"{alias}.region_id IN (SELECT id FROM regions{region_filter})")
+        params.extend(regions or [])
+    if products:
+        conditions.append(
+            f"{alias}.product_id IN (SELECT id FROM products WHERE name IN ({', '.join('?' * len(products))}))"
+        )
+        params.extend(products)
+    return conditions, params
+
+
+def _observations_query(columns, date_from, date_to, products, regions):
+    """
+    Historia cen z obu trybów zapisu: obserwacje oraz przedziały cen zamienione
+    na punkty na początku przedziału i w last_seen (przycięte do zakresu dat).
+    W `columns` dostępne są o.ts / o.price / o.currency, p (produkt) i r (sklep).
+    """
+    start = to_epoch(date_from) if date_from else None
+    end = to_epoch(date_to) if date_to else None
+    first = f"MAX(i.valid_from, {start})" if start is not None else "i.valid_from"
+    last = f"MIN(i.last_seen, {end})" if end is not None else "i.last_seen"
+
+    observed, observed_params = _key_filters("o", products, regions)
+    if start is not None:
+        observed.append(f"o.ts >= {start}")
+    if end is not None:
+        observed.append(f"o.ts <= {end}")
+    intervals, interval_params = _key_filters("i", products, regions)
+    if start is not None:
+        intervals.append(f"i.last_seen >= {start}")
+    if end is not None:
+        intervals.append(f"i.valid_from <= {end}")
+    intervals_where = " AND ".join(intervals)
+
+    query = f"""
+        SELECT {columns}
+        FROM (
+            SELECT o.product_id, o.region_id, o.ts, o.price, o.currency FROM observations o
+            WHERE {" AND ".join(observed)}
+            UNION ALL
+            SELECT i.product_id, i.region_id, {first}, i.price, i.currency FROM price_intervals i
+            WHERE {intervals_where}
+            UNION ALL
+            SELECT i.product_id, i.region_id, {last}, i.price, i.currency FROM price_intervals i
+            WHERE {intervals_where} AND {last} > {first}
+        ) o
+        JOIN products p ON p.id = o.product_id
+        JOIN regions r ON r.id = o.region_id
+    """
+    return query, observed_params + interval_params * 2
+
+
+def _read_connection(path):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    ensure_schema(conn)
+    return conn
+
+
+# Kolumny DataFrame z load_observations -> wyrażenia SQL
+_OBSERVATION_COLUMNS = {
+    "data_zdarzenia": "o.ts AS data_zdarzenia",
+    "kategoria": "p.name AS kategoria",
+    "wartosc": "o.price AS wartosc",
+    "waluta": "o.currency AS waluta",
+    "region": "r.name AS region",
+}
+
+
+def load_observations(date_from=None, date_to=None, products=None, regions=None, columns=None,
+                      path=DB_NAME, archive_dir=ARCHIVE_DIR):
+    """
+    Obserwacje jako DataFrame z kolumnami data_zdarzenia, kategoria, wartosc, waluta, region.
+    products / regions -> listy nazw produktów / sklepów do wczytania (None = wszystkie)
+    columns -> podzbiór kolumn do wczytania (None = wszystkie)
+    Dane starsze niż próg archiwizacji doczytywane są z archiwum Parquet w archive_dir.
+    """
+    wanted = list(columns or _OBSERVATION_COLUMNS)
+    query, params = _observations_query(
+        ", ".join(_OBSERVATION_COLUMNS[name] for name in wanted), date_from, date_to, products, regions,
+    )
+    conn = _read_connection(path)
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    if "data_zdarzenia" in df:
+        df["data_zdarzenia"] = pd.to_datetime(df["data_zdarzenia"], unit="s")
+
+    archived = load_archive(date_from, date_to, products, regions, wanted, archive_dir)
+    if not archived.empty:
+        df = pd.concat([archived, df], ignore_index=True) if not df.empty else archived
+    return df
+
+
+def load_history(date_from=None, date_to=None, path=DB_NAME, archive_dir=ARCHIVE_DIR):
+    """Krotki (kategoria, wartosc, region, data_zdarzenia) z zadanego okresu do analizy."""
+    query, params = _observations_query(
+        "p.name, o.price, r.name, datetime(o.ts, 'unixepoch')", date_from, date_to, None, None,
+    )
+    conn = _read_connection(path)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    archived = load_archive(date_from, date_to, columns=["kategoria", "wartosc", "region", "data_zdarzenia"],
+                            archive_dir=archive_dir)
+    if archived.empty:
+        return rows
+    archived["data_zdarzenia"] = archived["data_zdarzenia"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return list(archived.itertuples(index=False, name=None)) + rows
+
+
+# Obserwacje i zamknięte przedziały cen starsze niż próg (? = sekundy epoki).
+# Przedział trafia do archiwum jako punkty w valid_from i last_seen, jak w odczycie.
+_ARCHIVE_SELECT = """
+    SELECT o.ts, p.name AS product, o.price, o.currency, r.name AS region
+    FROM observations o
+    JOIN products p ON p.id = o.product_id
+    JOIN regions r ON r.id = o.region_id
+    WHERE o.region_id IN (SELECT id FROM regions) AND o.ts < :cutoff
+    UNION ALL
+    SELECT i.valid_from, p.name, i.price, i.currency, r.name
+    FROM price_intervals i
+    JOIN products p ON p.id = i.product_id
+    JOIN regions r ON r.id = i.region_id
+    WHERE i.valid_to IS NOT NULL AND i.last_seen < :cutoff
+    UNION ALL
+    SELECT i.last_seen, p.name, i.price, i.currency, r.name
+    FROM price_intervals i
+    JOIN products p ON p.id = i.product_id
+    JOIN regions r ON r.id = i.region_id
+    WHERE i.valid_to IS NOT NULL AND i.last_seen < :cutoff AND i.last_seen > i.valid_from
+"""
 
-    # DODANA POPRAWKA – dodanie daty zdarzenia
-    df['data_zdarzenia'] = datetime.now()
 
-    conn = sqlite3.connect(DB_NAME)
-    df.to_sql(TABLE_NAME, conn, if_exists='append', index=False)
-    conn.close()
-    print(f"[{source}] Zapisano {len(df)} produktów do bazy danych.")
\ No newline at end of file
+def archive_old_data(older_than_days=30, path=DB_NAME, archive_dir=ARCHIVE_DIR, compression="zstd"):
+    """
+    Przenosi obserwacje starsze niż `older_than_days` dni z SQLite do archiwum
+    Parquet (partycje dzień/sklep). Otwarte przedziały cen zostają w bazie.
+    Zwraca liczbę zarchiwizowanych wierszy.
+    """
+    if not archive_available():
+        print("[ERROR] Archiwizacja wymaga pakietu pyarrow.")
+        return 0
+    cutoff = to_epoch(date.today() - timedelta(days=older_than_days))
+    conn = _read_connection(path)
+    try:
+        # Blokada zapisu na czas przenoszenia: nowe cykle czekają, a usuwane są
+        # dokładnie te wiersze, które trafiły do archiwum
+        conn.execute("BEGIN IMMEDIATE")
+        df = pd.read_sql_query(_ARCHIVE_SELECT, conn, params={"cutoff": cutoff})
+        if df.empty:
+            conn.execute("ROLLBACK")
+            return 0
+        conn.execute("DELETE FROM observations WHERE region_id IN (SELECT id FROM regions) AND ts < ?", (cutoff,))
+        conn.execute("DELETE FROM price_intervals WHERE valid_to IS NOT NULL AND last_seen < ?", (cutoff,))
+        write_archive(df, archive_dir, compression)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    print(f"[INFO] Przeniesiono {len(df)} obserwacji starszych niż {older_than_days} dni do archiwum {archive_dir}.")
+    return len(df)
@@ -0,0 +1,125 @@
+import threading
+from .json_store import load_json, save_json
+
+STRATEGY_FILE = "fetch_strategy.json"
+BACKENDS = ("requests", "selenium")
+
+# Minimalna długość HTML, którą uznajemy za poprawną odpowiedź Requests
+MIN_HTML_SIZE = 2000
+
+
+class StrategyMemory:
+    """
+    Zapamiętuje per adres URL, który backend (Requests / Selenium) działał.
+
+    Dla każdego backendu przechowuje liczbę prób, skuteczność (średnia
+    wykładnicza) i średni rozmiar HTML. Kolejny cykl idzie od razu do
+    skuteczniejszego backendu; co `reprobe_every` wyborów Selenium
+    ponownie sprawdzamy tańszy Requests.
+    """
+
+    def __init__(self, path=STRATEGY_FILE, reprobe_every=10, alpha=0.5):
+        self.path = path
+        self.reprobe_every = reprobe_every
+        self.alpha = alpha
+        self.entries = {}
+        self._pending = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        self.entries = load_json(self.path)
+
+    def _entry(self, url):
+        self._ensure_loaded()
+        entry = self.entries.get(url)
+        if entry is None:
+            entry = {
+                "last_backend": None,
+                "since_probe": 0,
+                "backends": {name: {"attempts": 0, "success_rate": None, "avg_size": None} for name in BACKENDS},
+            }
+            self.entries[url] = entry
+        return entry
+
+    @staticmethod
+    def _score(stats):
+        return 0.5 if stats["success_rate"] is None else stats["success_rate"]
+
+    def choose(self, url):
+        """Zwraca backend, od którego należy zacząć pobieranie adresu URL."""
+        with self._lock:
+            entry = self._entry(url)
+            requests_score = self._score(entry["backends"]["requests"])
+            selenium_score = self._score(entry["backends"]["selenium"])
+            if requests_score >= 0.5 or selenium_score <= requests_score:
+                return "requests"
+
+            entry["since_probe"] += 1
+            self._dirty = True
+            if entry["since_probe"] >= self.reprobe_every:
+                entry["since_probe"] = 0
+                return "requests"
+            return "selenium"
+
+    def _update(self, entry, backend, success):
+        stats = entry["backends"][backend]
+        outcome = 1.0 if success else 0.0
+        if stats["success_rate"] is None:
+            stats["success_rate"] = outcome
+        else:
+            stats["success_rate"] = (1 - self.alpha) * stats["success_rate"] + self.alpha * outcome
+        if success:
+            entry["last_backend"] = backend
+        self._dirty = True
+
+    def record_fetch(self, url, backend, html):
+        """
+        Rejestruje wynik pobrania. Pusty lub za krótki HTML z Requests jest
+        od razu porażką; w pozostałych przypadkach o sukcesie decyduje parser
+        (record_result).
+        """
+        with self._lock:
+            entry = self._entry(url)
+            stats = entry["backends"][backend]
+            stats["attempts"] += 1
+            self._dirty = True
+            if html:
+                size = len(html)
+                stats["avg_size"] = size if stats["avg_size"] is None else round(
+                    (1 - self.alpha) * stats["avg_size"] + self.alpha * size)
+            if not html or (backend == "requests" and len(html) < MIN_HTML_SIZE):
+                self._update(entry, backend, False)
+                self._pending.pop(url, None)
+            else:
+                self._pending[url] = backend
+
+    def record_not_modified(self, url):
+        """Odpowiedź 304 oznacza, że Requests nadal działa dla tego adresu."""
+        with self._lock:
+            entry = self._entry(url)
+            entry["backends"]["requests"]["attempts"] += 1
+            self._update(entry, "requests", True)
+
+    def record_result(self, url, product_count):
+        """Przypisuje wynik parsowania do backendu, który dostarczył HTML."""
+        with self._lock:
+            backend = self._pending.pop(url, None)
+            if backend is not None:
+                self._update(self._entry(url), backend, product_count > 0)
+
+    def save(self):
+        """Zapisuje pamięć strategii na dysk (tylko jeśli coś się zmieniło)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            save_json(self.path, self.entries)
+            self._dirty = False
+
+
+# Global instance
+strategy_memory = StrategyMemory()
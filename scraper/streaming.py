@@ -0,0 +1,116 @@
+import itertools
+import re
+import time
+import requests
+from urllib.parse import urlparse
+from .extractors import extractor_for
+from .http_cache import validator_cache
+from .http_session import session_manager
+from .parser import PARSE_ENGINES, get_parse_engine
+from .rate_limiter import limiter, parse_retry_after
+from .robot_parser import robot_manager
+
+# Rozmiar fragmentu odpowiedzi przekazywanego parserowi
+STREAM_CHUNK = 16 * 1024
+
+_META_CHARSET = re.compile(rb"<meta[^>]+charset", re.IGNORECASE)
+
+
+def can_stream(url):
+    """Strumieniowo parsujemy tylko domeny z rejestru z prostym selektorem kontenera (wymaga lxml)."""
+    extractor = extractor_for(url)
+    return "lxml" in PARSE_ENGINES and extractor is not None and extractor["container"] is not None
+
+
+class ProductStream:
+    """
+    Pobiera stronę z `stream=True` i zwraca produkty (iterator), gdy tylko
+    ich kontenery zostaną odebrane — parsowanie nakłada się na pobieranie,
+    a w pamięci trzymany jest tylko bieżący fragment dokumentu.
+
+    Po iteracji: `not_modified` -> serwer odpowiedział 304 (brak produktów),
+    `first_product_ms` / `total_ms` -> czas do pierwszego produktu i całego pobrania.
+    """
+
+    def __init__(self, url, extractor=None, chunk_size=STREAM_CHUNK, retries=1):
+        self.url = url
+        self.extractor = extractor or extractor_for(url)
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.not_modified = False
+        self.first_product_ms = None
+        self.total_ms = None
+
+    def __iter__(self):
+        url = self.url
+        if not robot_manager.can_fetch(url):
+            print(f"[INFO] Pobieranie {url} zabronione przez robots.txt")
+            return
+
+        print(f"[INFO] Czekam na rate limit dla {urlparse(url).netloc}...")
+        limiter.wait(url)
+
+        print(f"[INFO] Pobieram strumieniowo {url}...")
+        started = time.monotonic()
+        headers = validator_cache.conditional_headers(url)
+        try:
+            if headers:
+                response = session_manager.get(url, timeout=10, stream=True, headers=headers)
+            else:
+                response = session_manager.get(url, timeout=10, stream=True)
+        except requests.RequestException as e:
+            print(f"[ERROR] Nie udało się pobrać {url}: {e}")
+            return
+
+        with response:
+            if response.status_code == 304:
+                print(f"[INFO] {url} bez zmian (304 Not Modified).")
+                limiter.record_success(url, response.elapsed.total_seconds())
+                validator_cache.record_hit(url)
+                self.not_modified = True
+                return
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429:
+                print(f"[WARNING] Otrzymano błąd 429 (Too Many Requests) dla {url}.")
+                limiter.handle_error_429(url, retry_after=retry_after)
+                if self.retries > 0:
+                    print("[INFO] Ponawiam próbę pobrania...")
+                    self.retries -= 1
+                    yield from self
+                return
+            if response.status_code >= 400:
+                if response.status_code >= 500:
+                    limiter.record_error(url, response.status_code, retry_after)
+                print(f"[ERROR] Nie udało się pobrać {url}: HTTP {response.status_code}")
+                return
+
+            limiter.record_success(url, response.elapsed.total_seconds())
+            validator_cache.record_miss(url, response)
+
+            engine = get_parse_engine("lxml")
+            try:
+                # Kodowanie z nagłówka, potem z <meta charset> (odczyta je libxml2), domyślnie UTF-8
+                chunks = response.iter_content(chunk_size=self.chunk_size)
+                first = next(chunks, b"")
+                chunks = itertools.chain([first], chunks)
+                if "charset" in response.headers.get("Content-Type", "").lower():
+                    encoding = response.encoding
+                else:
+                    encoding = None if _META_CHARSET.search(first[:4096]) else "utf-8"
+
+                for product in engine.iter_products(chunks, self.extractor, encoding):
+                    if self.first_product_ms is None:
+                        self.first_product_ms = round((time.monotonic() - started) * 1000)
+                    yield product
+            except requests.RequestException as e:
+                print(f"[ERROR] Przerwane pobieranie {url}: {e}")
+            except (ValueError, LookupError) as e:
+                print(f"[ERROR] Nie udało się sparsować {url}: {e}")
+            finally:
+                self.total_ms = round((time.monotonic() - started) * 1000)
+
+
+def stream_products(url, extractor=None, chunk_size=STREAM_CHUNK):
+    """Generator produktów pobieranych strumieniowo (skrót dla ProductStream)."""
+    return iter(ProductStream(url, extractor, chunk_size))
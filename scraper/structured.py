@@ -0,0 +1,129 @@
+import json
+import re
+
+try:
+    import lxml.html as lxml_html
+except ImportError:  # bez lxml mikrodane czyta BeautifulSoup
+    lxml_html = None
+from bs4 import BeautifulSoup
+from .prices import CURRENCY_SYMBOLS, normalize_price
+
+# Bloki <script type="application/ld+json"> — wyszukiwane w surowym tekście, bez budowy DOM
+_LD_JSON = re.compile(
+    r"""<script[^>]*type\s*=\s*["']?application/ld\+json["']?[^>]*>(.*?)</script\s*>""",
+    re.IGNORECASE | re.DOTALL,
+)
+_MICRODATA_PRICE = re.compile(r"""itemprop\s*=\s*["']?price\b""", re.IGNORECASE)
+
+_CURRENCY_SYMBOLS = dict(CURRENCY_SYMBOLS)
+
+
+def has_json_ld(html):
+    return "ld+json" in html
+
+
+def has_microdata(html):
+    return "itemprop" in html and _MICRODATA_PRICE.search(html) is not None
+
+
+def _to_price(value):
+    return normalize_price(value)
+
+
+def _to_currency(value):
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    return _CURRENCY_SYMBOLS.get(value, value.upper())
+
+
+def _types(node):
+    types = node.get("@type", [])
+    return types if isinstance(types, list) else [types]
+
+
+def _offer(offers):
+    """Pierwsza oferta z ceną: Offer, AggregateOffer (lowPrice) albo lista ofert."""
+    if isinstance(offers, list):
+        for offer in offers:
+            price, currency = _offer(offer)
+            if price is not None:
+                return price, currency
+        return None, None
+    if not isinstance(offers, dict):
+        return None, None
+    price = offers.get("price", offers.get("lowPrice"))
+    if price is None and isinstance(offers.get("priceSpecification"), dict):
+        price = offers["priceSpecification"].get("price")
+    return _to_price(price), _to_currency(offers.get("priceCurrency"))
+
+
+def _walk(node, products):
+    """Zbiera obiekty Product z dowolnie zagnieżdżonego JSON-LD (@graph, ItemList, listy)."""
+    if isinstance(node, list):
+        for child in node:
+            _walk(child, products)
+        return
+    if not isinstance(node, dict):
+        return
+
+    if "Product" in _types(node):
+        price, currency = _offer(node.get("offers"))
+        name = node.get("name")
+        if isinstance(name, str) and price is not None:
+            products.append({"name": name.strip(), "price": price, "currency": currency})
+        return
+
+    for key in ("@graph", "itemListElement", "item", "mainEntity"):
+        if key in node:
+            _walk(node[key], products)
+
+
+def extract_json_ld(html):
+    """Produkty z bloków JSON-LD (json.loads bez budowy drzewa HTML); None, gdy brak."""
+    products = []
+    for match in _LD_JSON.finditer(html):
+        try:
+            data = json.loads(match.group(1))
+        except ValueError:
+            continue
+        _walk(data, products)
+    return products or None
+
+
+def _microdata_value(element):
+    value = element.get("content")
+    if value is None:
+        value = element.text_content() if hasattr(element, "text_content") else element.get_text()
+    return value.strip()
+
+
+def extract_microdata(html):
+    """Produkty z mikrodanych schema.org/Product (itemprop name / price / priceCurrency); None, gdy brak."""
+    if lxml_html is not None:
+        try:
+            root = lxml_html.fromstring(html)
+        except (ValueError, TypeError):
+            return None
+        scopes = root.xpath("//*[@itemscope][contains(@itemtype, 'schema.org/Product')]")
+        find = lambda scope, prop: (scope.xpath(f".//*[@itemprop='{prop}']") or [None])[0]
+    else:
+        root = BeautifulSoup(html, "html.parser")
+        scopes = [tag for tag in root.select("[itemscope][itemtype]") if "schema.org/Product" in tag["itemtype"]]
+        find = lambda scope, prop: scope.select_one(f"[itemprop='{prop}']")
+
+    products = []
+    for scope in scopes:
+        name_el, price_el = find(scope, "name"), find(scope, "price")
+        if name_el is None or price_el is None:
+            continue
+        price = _to_price(_microdata_value(price_el))
+        if price is None:
+            continue
+        currency_el = find(scope, "priceCurrency")
+        products.append({
+            "name": _microdata_value(name_el),
+            "price": price,
+            "currency": _to_currency(_microdata_value(currency_el)) if currency_el is not None else None,
+        })
+    return products or None
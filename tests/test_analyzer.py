@@ -1,4 +1,5 @@
 import unittest
+import pandas as pd
 from analyzer import clean_price, detect_price_changes
 
 class TestAnalyzer(unittest.TestCase):
@@ -54,5 +55,17 @@ class TestAnalyzer(unittest.TestCase):
 
         self.assertNotIn("Product 6", changes) # old_price is 0, so no division
 
+    def test_detect_price_changes_dataframe(self):
+        df = pd.DataFrame({
+            "kategoria": ["Product 1", "Product 1", "Product 2"],
+            "wartosc": ["100,00 zł", "<span>110,00 zł</span>", 5],
+            "region": ["ShopA", "ShopA", "ShopB"],
+            "data_zdarzenia": ["2023-01-01", "2023-01-02", "2023-01-01"],
+        })
+        changes = detect_price_changes(df)
+        self.assertEqual(list(changes), ["Product 1"])
+        self.assertAlmostEqual(changes["Product 1"], 10.0)
+        self.assertEqual(detect_price_changes([]), {})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import pandas as pd
+from datetime import datetime, timedelta
+from scraper.archive import archive_available, load_archive, write_archive
+from scraper.storage import StorageWriter, archive_old_data, load_observations, load_history, to_epoch
+
+
+@unittest.skipUnless(archive_available(), "wymaga pyarrow")
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive_dir = os.path.join(self.tmp.name, "archive")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self):
+        return write_archive(pd.DataFrame({
+            "ts": [to_epoch(datetime(2024, 1, 1, 10)), to_epoch(datetime(2024, 1, 1, 11)),
+                   to_epoch(datetime(2024, 1, 2, 10))],
+            "product": ["Laptop", "Mouse", "Laptop"],
+            "price": [2999.0, 49.99, 2899.0],
+            "currency": ["PLN", "PLN", "PLN"],
+            "region": ["Shop A", "Shop B", "Shop A"],
+        }), self.archive_dir)
+
+    def test_round_trip(self):
+        self.assertEqual(self.write(), 3)
+        df = load_archive(archive_dir=self.archive_dir).sort_values("data_zdarzenia", ignore_index=True)
+        self.assertEqual(list(df.columns), ["data_zdarzenia", "kategoria", "wartosc", "waluta", "region"])
+        self.assertEqual(df["kategoria"].tolist(), ["Laptop", "Mouse", "Laptop"])
+        self.assertEqual(df["wartosc"].tolist(), [2999.0, 49.99, 2899.0])
+        self.assertEqual(df["data_zdarzenia"].iloc[0], pd.Timestamp(2024, 1, 1, 10))
+
+    def test_partitioned_by_day_and_region(self):
+        self.write()
+        self.assertTrue(os.path.isdir(os.path.join(self.archive_dir, "date=2024-01-01", "region=Shop%20A")))
+        self.assertTrue(os.path.isdir(os.path.join(self.archive_dir, "date=2024-01-02", "region=Shop%20A")))
+        self.assertFalse(os.path.exists(os.path.join(self.archive_dir, "date=2024-01-02", "region=Shop%20B")))
+
+    def test_filters_and_columns(self):
+        self.write()
+        df = load_archive(date_from="2024-01-02", regions=["Shop A"], columns=["kategoria", "wartosc"],
+                          archive_dir=self.archive_dir)
+        self.assertEqual(list(df.columns), ["kategoria", "wartosc"])
+        self.assertEqual(df.values.tolist(), [["Laptop", 2899.0]])
+        df = load_archive(products=["Mouse"], archive_dir=self.archive_dir)
+        self.assertEqual(df["region"].tolist(), ["Shop B"])
+
+    def test_missing_archive_is_empty(self):
+        df = load_archive(columns=["kategoria"], archive_dir=self.archive_dir)
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), ["kategoria"])
+
+
+@unittest.skipUnless(archive_available(), "wymaga pyarrow")
+class TestArchiveOldData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.archive_dir = os.path.join(self.tmp.name, "archive")
+        self.old = datetime.now().replace(microsecond=0) - timedelta(days=40)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def count(self, table):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_moves_old_observations(self):
+        writer = StorageWriter(self.path)
+        writer.write([{"name": "Laptop", "price": 2999.0, "currency": "PLN"}], "Shop A", self.old)
+        writer.write([{"name": "Laptop", "price": 2899.0, "currency": "PLN"}], "Shop A")
+        writer.close()
+
+        self.assertEqual(archive_old_data(30, path=self.path, archive_dir=self.archive_dir), 1)
+        self.assertEqual(self.count("observations"), 1)
+        self.assertEqual(archive_old_data(30, path=self.path, archive_dir=self.archive_dir), 0)
+
+        # Odczyt łączy archiwum z bazą
+        df = load_observations(path=self.path, archive_dir=self.archive_dir).sort_values("data_zdarzenia")
+        self.assertEqual(df["wartosc"].tolist(), [2999.0, 2899.0])
+        self.assertEqual(df["data_zdarzenia"].iloc[0], pd.Timestamp(self.old))
+        history = load_history(path=self.path, archive_dir=self.archive_dir)
+        self.assertIn(("Laptop", 2999.0, "Shop A", self.old.strftime("%Y-%m-%d %H:%M:%S")), history)
+        recent = load_observations(date_from=datetime.now() - timedelta(days=1), path=self.path,
+                                   archive_dir=self.archive_dir)
+        self.assertEqual(recent["wartosc"].tolist(), [2899.0])
+
+    def test_moves_closed_intervals_only(self):
+        writer = StorageWriter(self.path, mode="intervals")
+        writer.write([{"name": "Laptop", "price": 2999.0, "currency": "PLN"}], "Shop A", self.old)
+        writer.write([{"name": "Laptop", "price": 2999.0, "currency": "PLN"}], "Shop A", self.old + timedelta(days=1))
+        writer.write([{"name": "Laptop", "price": 2899.0, "currency": "PLN"}], "Shop A", self.old + timedelta(days=2))
+        writer.close()
+
+        # Zamknięty przedział -> dwa punkty (początek i ostatnie wystąpienie), otwarty zostaje w bazie
+        self.assertEqual(archive_old_data(30, path=self.path, archive_dir=self.archive_dir), 2)
+        self.assertEqual(self.count("price_intervals"), 1)
+        df = load_observations(path=self.path, archive_dir=self.archive_dir).sort_values("data_zdarzenia")
+        self.assertEqual(df["wartosc"].tolist(), [2999.0, 2999.0, 2899.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+from scraper import extractors
+from scraper.extractors import (
+    register_extractor, extractor_for, guess_extractors, class_tokens, ready_selector,
+)
+from scraper.parser import parse_products
+
+SHOP_D_HTML = """
+<ul>
+    <li class="tile"><span class="tile-name">Lamp</span><span class="tile-price">19,99 €</span></li>
+    <li class="tile"><span class="tile-name">Desk</span><span class="tile-price">120,00 €</span></li>
+</ul>
+"""
+
+class TestExtractorRegistry(unittest.TestCase):
+
+    def setUp(self):
+        # Każdy test pracuje na kopii rejestru
+        for name, value in (("EXTRACTORS", dict(extractors.EXTRACTORS)),
+                            ("_path_domains", set(extractors._path_domains)),
+                            ("_by_item_class", {k: list(v) for k, v in extractors._by_item_class.items()}),
+                            ("_learned", {})):
+            patcher = patch.object(extractors, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_builtin_shops_routed_by_domain(self):
+        self.assertEqual(extractor_for("https://scrapeme.live/shop/")["label"], "Shop A")
+        self.assertEqual(extractor_for("https://books.toscrape.com/catalogue/page-2.html")["label"], "Shop B")
+        self.assertEqual(extractor_for("https://www.webscraper.io/test-sites/")["label"], "Shop C (webscraper.io)")
+
+    def test_unknown_domain(self):
+        self.assertIsNone(extractor_for("https://unknown.example/"))
+        self.assertIsNone(extractor_for(None))
+        self.assertIsNone(ready_selector("https://unknown.example/"))
+
+    def test_subdomain_and_path_keys(self):
+        register_extractor("shop.example", item=".tile", name=".tile-name", price=".tile-price")
+        register_extractor("shop.example/outlet", item=".deal", name=".deal-name", price=".deal-price")
+
+        self.assertEqual(extractor_for("https://eu.shop.example/lamps")["key"], "shop.example")
+        self.assertEqual(extractor_for("https://shop.example/outlet/page/2")["key"], "shop.example/outlet")
+        self.assertEqual(ready_selector("https://shop.example/outlet/"), ".deal")
+
+    def test_parse_products_runs_only_the_routed_extractor(self):
+        register_extractor("shop.example", item=".tile", name=".tile-name", price=".tile-price")
+
+        products = parse_products(SHOP_D_HTML, "https://shop.example/lamps")
+        self.assertEqual([p["name"] for p in products], ["Lamp", "Desk"])
+        self.assertEqual(products[0]["price"], 19.99)
+
+        # Strona innego sklepu pod zmapowaną domeną nie jest „rozpoznawana” jako inny sklep
+        self.assertEqual(parse_products(SHOP_D_HTML, "https://books.toscrape.com/"), [])
+
+    def test_structural_fingerprint_for_unmapped_domain(self):
+        register_extractor("shop.example", item=".tile", name=".tile-name", price=".tile-price")
+
+        self.assertEqual(class_tokens(SHOP_D_HTML), {"tile", "tile-name", "tile-price"})
+        self.assertEqual([e["key"] for e in guess_extractors(SHOP_D_HTML)], ["shop.example"])
+
+        products = parse_products(SHOP_D_HTML, "https://mirror.example/lamps")
+        self.assertEqual(len(products), 2)
+        # Rozpoznanie zapamiętane dla domeny
+        self.assertEqual(extractor_for("https://mirror.example/other")["key"], "shop.example")
+
+    def test_fingerprint_requires_all_classes(self):
+        html = '<div class="tile"><span class="tile-name">Lamp</span></div>'
+        register_extractor("shop.example", item=".tile", name=".tile-name", price=".tile-price")
+        self.assertEqual(guess_extractors(html), [])
+
+if __name__ == '__main__':
+    unittest.main()
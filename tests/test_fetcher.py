@@ -1,14 +1,21 @@
 
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 import requests
-from scraper.fetcher import fetch_html
+from scraper.fetcher import fetch_html, fetch_with_fallback
+from scraper.http_cache import NOT_MODIFIED
 
 class TestFetchHTML(unittest.TestCase):
 
+    def setUp(self):
+        patcher = patch('scraper.fetcher.validator_cache')
+        self.mock_cache = patcher.start()
+        self.mock_cache.conditional_headers.return_value = {}
+        self.addCleanup(patcher.stop)
+
     @patch('scraper.fetcher.robot_manager')
     @patch('scraper.fetcher.limiter')
-    @patch('scraper.fetcher.requests.get')
+    @patch('scraper.fetcher.session_manager.get')
     def test_fetch_html_success(self, mock_get, mock_limiter, mock_robot_manager):
         # Arrange
         mock_robot_manager.can_fetch.return_value = True
@@ -41,7 +48,7 @@ class TestFetchHTML(unittest.TestCase):
 
     @patch('scraper.fetcher.robot_manager')
     @patch('scraper.fetcher.limiter')
-    @patch('scraper.fetcher.requests.get')
+    @patch('scraper.fetcher.session_manager.get')
     def test_fetch_html_http_error(self, mock_get, mock_limiter, mock_robot_manager):
         # Arrange
         mock_robot_manager.can_fetch.return_value = True
@@ -58,7 +65,7 @@ class TestFetchHTML(unittest.TestCase):
 
     @patch('scraper.fetcher.robot_manager')
     @patch('scraper.fetcher.limiter')
-    @patch('scraper.fetcher.requests.get')
+    @patch('scraper.fetcher.session_manager.get')
     def test_fetch_html_request_exception(self, mock_get, mock_limiter, mock_robot_manager):
         # Arrange
         mock_robot_manager.can_fetch.return_value = True
@@ -72,14 +79,14 @@ class TestFetchHTML(unittest.TestCase):
         
     @patch('scraper.fetcher.robot_manager')
     @patch('scraper.fetcher.limiter')
-    @patch('scraper.fetcher.requests.get')
+    @patch('scraper.fetcher.session_manager.get')
     def test_fetch_html_429_retry(self, mock_get, mock_limiter, mock_robot_manager):
         # Arrange
         mock_robot_manager.can_fetch.return_value = True
         
         # First call raises 429, second call is successful
         mock_429_response = MagicMock()
-        error_response_obj = MagicMock(status_code=429)
+        error_response_obj = MagicMock(status_code=429, headers={"Retry-After": "30"})
         http_error = requests.exceptions.HTTPError(response=error_response_obj)
         mock_429_response.raise_for_status.side_effect = http_error
 
@@ -97,7 +104,104 @@ class TestFetchHTML(unittest.TestCase):
         # Assert
         self.assertEqual(html, "<html>Success</html>")
         self.assertEqual(mock_get.call_count, 2)
-        mock_limiter.handle_error_429.assert_called_once_with("http://example.com")
+        mock_limiter.handle_error_429.assert_called_once_with("http://example.com", retry_after=30.0)
+        mock_limiter.record_success.assert_called_once()
+
+    @patch('scraper.fetcher.robot_manager')
+    @patch('scraper.fetcher.limiter')
+    @patch('scraper.fetcher.session_manager.get')
+    def test_fetch_html_server_error_slows_domain(self, mock_get, mock_limiter, mock_robot_manager):
+        # Arrange
+        mock_robot_manager.can_fetch.return_value = True
+        mock_response = MagicMock()
+        error_response_obj = MagicMock(status_code=503, headers={})
+        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=error_response_obj)
+        mock_get.return_value = mock_response
+
+        # Act
+        html = fetch_html("http://example.com")
+
+        # Assert
+        self.assertIsNone(html)
+        mock_limiter.record_error.assert_called_once_with("http://example.com", 503, None)
+        mock_limiter.handle_error_429.assert_not_called()
+
+    @patch('scraper.fetcher.robot_manager')
+    @patch('scraper.fetcher.limiter')
+    @patch('scraper.fetcher.session_manager.get')
+    def test_fetch_html_not_modified(self, mock_get, mock_limiter, mock_robot_manager):
+        # Arrange
+        mock_robot_manager.can_fetch.return_value = True
+        self.mock_cache.conditional_headers.return_value = {"If-None-Match": '"abc"'}
+        mock_get.return_value = MagicMock(status_code=304)
+
+        # Act
+        html = fetch_html("http://example.com")
+
+        # Assert
+        self.assertIs(html, NOT_MODIFIED)
+        mock_get.assert_called_once_with("http://example.com", timeout=10, headers={"If-None-Match": '"abc"'})
+        self.mock_cache.record_hit.assert_called_once_with("http://example.com")
+        self.mock_cache.record_miss.assert_not_called()
+
+    @patch('scraper.fetcher.strategy_memory')
+    @patch('scraper.fetcher.fetch_html_selenium')
+    @patch('scraper.fetcher.fetch_html', return_value=NOT_MODIFIED)
+    def test_fetch_with_fallback_not_modified_skips_selenium(self, mock_fetch_html, mock_selenium, mock_strategy):
+        # Arrange
+        mock_strategy.choose.return_value = "requests"
+
+        # Act
+        html = fetch_with_fallback("http://example.com")
+
+        # Assert
+        self.assertIs(html, NOT_MODIFIED)
+        mock_selenium.assert_not_called()
+        mock_strategy.record_not_modified.assert_called_once_with("http://example.com")
+
+
+class TestFetchWithFallback(unittest.TestCase):
+
+    def setUp(self):
+        for target in ('scraper.fetcher.validator_cache', 'scraper.fetcher.strategy_memory'):
+            patcher = patch(target)
+            setattr(self, target.rsplit('.', 1)[1], patcher.start())
+            self.addCleanup(patcher.stop)
+
+    @patch('scraper.fetcher.fetch_html_selenium')
+    @patch('scraper.fetcher.fetch_html')
+    def test_learned_selenium_skips_requests(self, mock_fetch_html, mock_selenium):
+        # Arrange
+        self.strategy_memory.choose.return_value = "selenium"
+        mock_selenium.return_value = "<html>rendered</html>"
+
+        # Act
+        html = fetch_with_fallback("http://example.com", wait_selector=".item")
+
+        # Assert
+        self.assertEqual(html, "<html>rendered</html>")
+        mock_fetch_html.assert_not_called()
+        self.validator_cache.invalidate.assert_called_once_with("http://example.com")
+        mock_selenium.assert_called_once_with("http://example.com", wait_selector=".item")
+        self.strategy_memory.record_fetch.assert_called_once_with("http://example.com", "selenium", "<html>rendered</html>")
+
+    @patch('scraper.fetcher.fetch_html_selenium')
+    @patch('scraper.fetcher.fetch_html')
+    def test_short_html_falls_back_to_selenium(self, mock_fetch_html, mock_selenium):
+        # Arrange
+        self.strategy_memory.choose.return_value = "requests"
+        mock_fetch_html.return_value = "<html>short</html>"
+        mock_selenium.return_value = "<html>rendered</html>"
+
+        # Act
+        html = fetch_with_fallback("http://example.com")
+
+        # Assert
+        self.assertEqual(html, "<html>rendered</html>")
+        self.strategy_memory.record_fetch.assert_has_calls([
+            call("http://example.com", "requests", "<html>short</html>"),
+            call("http://example.com", "selenium", "<html>rendered</html>"),
+        ])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+
+import os
+import tempfile
+import unittest
+from scraper.fingerprint import PageFingerprints
+
+class TestPageFingerprints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "fingerprints.json")
+        self.fingerprints = PageFingerprints(path=self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_volatile_tokens_are_ignored(self):
+        # Arrange
+        first = '<script nonce="abc123">x()</script><input type="hidden" name="csrf_token" value="111"><p>Price</p>'
+        second = '<script nonce="zzz999">x()</script><input type="hidden" name="csrf_token" value="222">\n<p>Price</p>'
+
+        # Act / Assert
+        self.assertEqual(self.fingerprints.fingerprint("shop", first), self.fingerprints.fingerprint("shop", second))
+        self.assertNotEqual(
+            self.fingerprints.fingerprint("shop", first),
+            self.fingerprints.fingerprint("shop", first.replace("Price", "Other")),
+        )
+
+    def test_per_source_rules(self):
+        # Arrange
+        self.fingerprints.configure({"shop": [r'data-session="[^"]*"']})
+        first = '<div data-session="1">A</div>'
+        second = '<div data-session="2">A</div>'
+
+        # Act / Assert
+        self.assertEqual(self.fingerprints.fingerprint("shop", first), self.fingerprints.fingerprint("shop", second))
+        self.assertNotEqual(self.fingerprints.fingerprint("other", first), self.fingerprints.fingerprint("other", second))
+
+    def test_cached_products_only_for_same_hash(self):
+        # Arrange
+        self.fingerprints.remember("shop", "abc", [{"name": "p"}])
+
+        # Act / Assert
+        self.assertEqual(self.fingerprints.cached_products("shop", "abc"), [{"name": "p"}])
+        self.assertIsNone(self.fingerprints.cached_products("shop", "def"))
+        self.assertIsNone(self.fingerprints.cached_products("other", "abc"))
+
+    def test_empty_products_are_not_remembered(self):
+        # Act
+        self.fingerprints.remember("shop", "abc", [])
+
+        # Assert
+        self.assertIsNone(self.fingerprints.cached_products("shop", "abc"))
+
+    def test_save_and_reload(self):
+        # Arrange
+        self.fingerprints.remember("shop", "abc", [{"name": "p"}])
+
+        # Act
+        self.fingerprints.save()
+        reloaded = PageFingerprints(path=self.path)
+
+        # Assert
+        self.assertEqual(reloaded.cached_products("shop", "abc"), [{"name": "p"}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from scraper.http_cache import ValidatorCache
+
+class TestValidatorCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "http_cache.json")
+        self.cache = ValidatorCache(path=self.path, max_entries=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _response(self, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers["ETag"] = etag
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        return MagicMock(headers=headers)
+
+    def test_conditional_headers_require_cached_products(self):
+        # Arrange
+        self.cache.record_miss("http://a.com", self._response(etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT"))
+
+        # Act / Assert
+        self.assertEqual(self.cache.conditional_headers("http://a.com"), {})
+        self.cache.store_products("http://a.com", [{"name": "p"}])
+        self.assertEqual(self.cache.conditional_headers("http://a.com"), {
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        })
+
+    def test_empty_products_are_not_cached(self):
+        # Arrange
+        self.cache.record_miss("http://a.com", self._response(etag='"v1"'))
+
+        # Act
+        self.cache.store_products("http://a.com", [])
+
+        # Assert: no 304 can short-circuit a page that produced no products
+        self.assertIsNone(self.cache.cached_products("http://a.com"))
+        self.assertEqual(self.cache.conditional_headers("http://a.com"), {})
+
+    def test_response_without_validators_is_not_cached(self):
+        # Act
+        self.cache.record_miss("http://a.com", self._response())
+
+        # Assert
+        self.assertIsNone(self.cache.cached_products("http://a.com"))
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 1, "entries": 0})
+
+    def test_eviction_and_counters(self):
+        # Arrange
+        for url in ("http://a.com", "http://b.com"):
+            self.cache.record_miss(url, self._response(etag='"x"'))
+        self.cache.record_hit("http://a.com")  # a.com is now the most recently used
+
+        # Act
+        self.cache.record_miss("http://c.com", self._response(etag='"y"'))
+
+        # Assert
+        self.assertEqual(list(self.cache.entries), ["http://a.com", "http://c.com"])
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 3, "entries": 2})
+
+    def test_eviction_by_size(self):
+        # Arrange
+        cache = ValidatorCache(path=self.path, max_entries=100, max_bytes=700)
+        products = [{"name": "x" * 40, "price": 1.0, "currency": "EUR"}] * 3
+        for url in ("http://a.com", "http://b.com", "http://c.com"):
+            cache.record_miss(url, self._response(etag='"x"'))
+            cache.store_products(url, products)
+
+        # Assert: the least recently used entry is dropped to stay under the byte budget
+        self.assertEqual(list(cache.entries), ["http://b.com", "http://c.com"])
+        self.assertLessEqual(cache.bytes, 700)
+        cache.save()
+        self.assertLessEqual(os.path.getsize(self.path), 700)
+
+        # A reload with a smaller budget trims the persisted file
+        reloaded = ValidatorCache(path=self.path, max_bytes=400)
+        self.assertIsNone(reloaded.cached_products("http://b.com"))
+        self.assertEqual(len(reloaded.cached_products("http://c.com")), 3)
+
+    def test_save_and_reload(self):
+        # Arrange
+        self.cache.record_miss("http://a.com", self._response(etag='"v1"'))
+        self.cache.store_products("http://a.com", [{"name": "p", "price": 1.0, "currency": "EUR"}])
+
+        # Act
+        self.cache.save()
+        reloaded = ValidatorCache(path=self.path)
+
+        # Assert
+        self.assertEqual(reloaded.cached_products("http://a.com"), [{"name": "p", "price": 1.0, "currency": "EUR"}])
+        self.assertEqual(reloaded.conditional_headers("http://a.com"), {"If-None-Match": '"v1"'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+
+import unittest
+from unittest.mock import patch, MagicMock
+from scraper.http_session import SessionManager
+
+class TestSessionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = SessionManager(pool_connections=2, pool_maxsize=4)
+
+    def tearDown(self):
+        self.manager.close()
+
+    def test_session_per_domain(self):
+        # Act
+        first = self.manager.session_for("http://example.com/a")
+        second = self.manager.session_for("http://example.com/b")
+        other = self.manager.session_for("http://other.com/")
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(first.headers["Accept-Encoding"], "gzip, deflate")
+        adapter = first.get_adapter("https://example.com/")
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    @patch('requests.Session.get')
+    def test_get_uses_domain_session(self, mock_get):
+        # Arrange
+        mock_get.return_value = MagicMock(text="<html></html>")
+
+        # Act
+        response = self.manager.get("http://example.com/page", timeout=10)
+
+        # Assert
+        self.assertEqual(response.text, "<html></html>")
+        mock_get.assert_called_once_with("http://example.com/page", timeout=10)
+
+    def test_stats_reports_reused_connections(self):
+        # Arrange
+        session = self.manager.session_for("http://example.com/")
+        pool = MagicMock(num_requests=5, num_connections=1)
+        adapter = session.get_adapter("http://example.com/")
+        adapter.poolmanager.pools._container["key"] = pool
+
+        # Act
+        stats = self.manager.stats()
+
+        # Assert
+        self.assertEqual(stats["example.com"], {"requests": 5, "connections": 1, "reused": 4})
+
+if __name__ == '__main__':
+    unittest.main()
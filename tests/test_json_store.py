@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+from scraper.json_store import load_json, save_json
+
+class TestJsonStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "state.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        save_json(self.path, {"Sklep": [{"name": "Żółw", "price": 1.5}]})
+        self.assertEqual(load_json(self.path), {"Sklep": [{"name": "Żółw", "price": 1.5}]})
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_missing_or_corrupt_file_gives_default(self):
+        self.assertEqual(load_json(self.path), {})
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        self.assertEqual(load_json(self.path, default=[]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch
+from scraper import extractors
+from scraper.parse_pool import ParsePool
+from scraper.parser import parse_products, parse_path_stats
+
+ITEM = ('<article class="product_pod"><h3><a href="#" title="Book {i}">Book {i}</a></h3>'
+        '<p class="price_color">£{i}.50</p></article>')
+PAGES = [("<html><body>" + ITEM.format(i=i) * 3 + "</body></html>", f"https://books.toscrape.com/page-{i}.html")
+         for i in range(10)]
+
+class TestParsePool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ParsePool(workers=2, max_batch=4)
+        self.addCleanup(self.pool.close)
+
+    def test_parse_many_matches_in_process_parse(self):
+        expected = [parse_products(html, url) for html, url in PAGES]
+        self.assertEqual(self.pool.parse_many(PAGES), expected)
+
+    def test_small_pages_are_batched(self):
+        self.pool.parse_many(PAGES)
+        stats = self.pool.stats()
+        self.assertEqual(stats["pages"], 10)
+        self.assertEqual(stats["batches"], 3)
+
+    def test_parse_single_page(self):
+        html, url = PAGES[0]
+        self.assertEqual(self.pool.parse(html, url), parse_products(html, url))
+
+    def test_worker_parse_paths_are_counted(self):
+        html, url = PAGES[1][0], "https://books.toscrape.com/worker-paths.html"
+        self.pool.parse(html, url)
+        self.assertEqual(parse_path_stats[url]["css"], 1)
+
+    def test_workers_are_spawned_with_registered_extractors(self):
+        # Workers do not fork the scraper's threads, so the registry is passed via the initializer
+        registry = dict(extractors.EXTRACTORS)
+        for name, value in (("EXTRACTORS", registry),
+                            ("_path_domains", set(extractors._path_domains)),
+                            ("_by_item_class", {k: list(v) for k, v in extractors._by_item_class.items()}),
+                            ("_learned", {})):
+            patcher = patch.object(extractors, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('scraper.parse_pool.EXTRACTORS', registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        extractors.register_extractor("pool.example", item=".tile", name=".tile-name", price=".tile-price")
+        html = '<div class="tile"><span class="tile-name">Lamp</span><span class="tile-price">9,99 €</span></div>'
+
+        self.assertEqual(self.pool.parse(html, "https://pool.example/"), [{"name": "Lamp", "price": 9.99, "currency": "EUR"}])
+        self.assertEqual(self.pool._get_executor()._mp_context.get_start_method(), "spawn")
+
+    def test_disabled_pool_parses_in_process(self):
+        pool = ParsePool(workers=0)
+        with patch('scraper.parse_pool.parse_products', return_value=[]) as mock_parse:
+            pool.parse("<html></html>", "https://books.toscrape.com/")
+        mock_parse.assert_called_once_with("<html></html>", "https://books.toscrape.com/")
+        self.assertEqual(pool.stats()["batches"], 0)
+
+    def test_falls_back_when_pool_fails(self):
+        html, url = PAGES[0]
+        with patch.object(self.pool, 'submit', side_effect=RuntimeError("broken")):
+            self.assertEqual(self.pool.parse(html, url), parse_products(html, url))
+
+if __name__ == '__main__':
+    unittest.main()
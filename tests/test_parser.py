@@ -1,6 +1,38 @@
 
 import unittest
-from scraper.parser import parse_price, detect_currency, parse_products
+from unittest.mock import patch
+from scraper.extractors import EXTRACTORS
+from scraper.parser import parse_price, detect_currency, parse_products, PARSE_ENGINES, get_parse_engine, _containers
+
+SHOP_A_HTML = """
+        <div class="product">
+            <a class="woocommerce-LoopProduct-link woocommerce-loop-product__link" href="#">
+                <h2 class="woocommerce-loop-product__title">Test Product 1</h2>
+                <span class="price"><span class="woocommerce-Price-amount amount"><bdi>12,34<span class="woocommerce-Price-currencySymbol">€</span></bdi></span></span>
+            </a>
+        </div>
+        """
+
+SHOP_B_HTML = """
+        <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+            <article class="product_pod">
+                <h3><a href="#" title="Test Product 2">Test Product 2</a></h3>
+                <div class="product_price">
+                    <p class="price_color">£23.45</p>
+                </div>
+            </article>
+        </li>
+        """
+
+SHOP_C_HTML = """
+        <div class="thumbnail">
+            <div class="caption">
+                <h4 class="pull-right price">$34.56</h4>
+                <h4><a class="title" href="#">Test Product 3</a></h4>
+            </div>
+        </div>
+        """
+
 
 class TestParser(unittest.TestCase):
 
@@ -17,14 +49,7 @@ class TestParser(unittest.TestCase):
         self.assertIsNone(detect_currency("123.45 zł"))
 
     def test_parse_products_shop_a(self):
-        html = """
-        <div class="product">
-            <a class="woocommerce-LoopProduct-link woocommerce-loop-product__link" href="#">
-                <h2 class="woocommerce-loop-product__title">Test Product 1</h2>
-                <span class="price"><span class="woocommerce-Price-amount amount"><bdi>12,34<span class="woocommerce-Price-currencySymbol">€</span></bdi></span></span>
-            </a>
-        </div>
-        """
+        html = SHOP_A_HTML
         products = parse_products(html)
         self.assertEqual(len(products), 1)
         self.assertEqual(products[0]['name'], "Test Product 1")
@@ -32,16 +57,7 @@ class TestParser(unittest.TestCase):
         self.assertEqual(products[0]['currency'], "EUR")
         
     def test_parse_products_shop_b(self):
-        html = """
-        <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
-            <article class="product_pod">
-                <h3><a href="#" title="Test Product 2">Test Product 2</a></h3>
-                <div class="product_price">
-                    <p class="price_color">£23.45</p>
-                </div>
-            </article>
-        </li>
-        """
+        html = SHOP_B_HTML
         products = parse_products(html)
         self.assertEqual(len(products), 1)
         self.assertEqual(products[0]['name'], "Test Product 2")
@@ -49,14 +65,7 @@ class TestParser(unittest.TestCase):
         self.assertEqual(products[0]['currency'], "GBP")
 
     def test_parse_products_shop_c(self):
-        html = """
-        <div class="thumbnail">
-            <div class="caption">
-                <h4 class="pull-right price">$34.56</h4>
-                <h4><a class="title" href="#">Test Product 3</a></h4>
-            </div>
-        </div>
-        """
+        html = SHOP_C_HTML
         products = parse_products(html)
         self.assertEqual(len(products), 1)
         self.assertEqual(products[0]['name'], "Test Product 3")
@@ -68,5 +77,55 @@ class TestParser(unittest.TestCase):
         products = parse_products(html)
         self.assertEqual(len(products), 0)
 
+class TestParseEngines(unittest.TestCase):
+
+    FIXTURES = [
+        SHOP_A_HTML,
+        SHOP_B_HTML,
+        SHOP_C_HTML,
+        "<div>No products here</div>",
+        """<div class="thumbnail"><h4 class="pull-right price">$1,234.56</h4>
+           <a class="title" title="Full &amp; long name" href="#">Full...</a></div>
+           <div class="thumbnail"><!-- brak ceny --><a class="title">Broken</a></div>""",
+        """<article class="product_pod"><h3><a href="#">No title attr</a></h3>
+           <p class="price_color">£5.00<script>var x = 1;</script></p></article>""",
+    ]
+
+    def test_lxml_engine_available(self):
+        self.assertIn("lxml", PARSE_ENGINES)
+
+    def test_engines_produce_identical_products(self):
+        for html in self.FIXTURES:
+            with self.subTest(html=html[:40]):
+                reference = parse_products(html, engine="bs4")
+                for engine in PARSE_ENGINES:
+                    self.assertEqual(parse_products(html, engine=engine), reference)
+
+    def test_unknown_engine_falls_back_to_bs4(self):
+        products = parse_products(SHOP_B_HTML, engine="missing")
+        self.assertEqual(products[0]['name'], "Test Product 2")
+
+    @patch('scraper.parser.LXML_PRUNE_MIN_SIZE', 0)
+    def test_partial_tree_keeps_only_product_containers(self):
+        html = ("<html><head><script>var x = 1;</script></head><body><nav><a href='#'>Menu</a></nav>"
+                + SHOP_C_HTML * 3 + "<footer><p>Stopka</p></footer></body></html>")
+        extractor = EXTRACTORS["webscraper.io"]
+        for name in PARSE_ENGINES:
+            with self.subTest(engine=name):
+                engine = get_parse_engine(name)
+                full = engine.load(html)
+                partial = engine.load(html, _containers([extractor]))
+
+                self.assertEqual(engine.extract(partial, extractor), engine.extract(full, extractor))
+                text = partial.get_text() if name == "bs4" else "".join(partial.itertext())
+                self.assertNotIn("Menu", text)
+                self.assertNotIn("Stopka", text)
+                engine.release(full)
+                engine.release(partial)
+
+    def test_empty_html(self):
+        for engine in PARSE_ENGINES:
+            self.assertEqual(parse_products("", engine=engine), [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scraper.prices import parse_price, detect_currency, normalize_price, normalize_prices
+
+class TestPrices(unittest.TestCase):
+
+    def test_parse_price_separators(self):
+        self.assertEqual(parse_price("1,234.56"), 1234.56)
+        self.assertEqual(parse_price("1.234,56 €"), 1234.56)
+        self.assertEqual(parse_price("2 499,00 PLN"), 2499.0)
+        self.assertEqual(parse_price("1 299,99 zł"), 1299.99)
+        self.assertEqual(parse_price("1.234.567"), 1234567.0)
+        self.assertEqual(parse_price("12,5"), 12.5)
+        self.assertIsNone(parse_price("No price"))
+        self.assertIsNone(parse_price(None))
+
+    def test_parse_price_separate_numbers(self):
+        # Spacja łączy tylko grupy tysięcy; sklejone ceny nie są czytane jako tysiące
+        self.assertEqual(parse_price("10.00 8.00"), 10.0)
+        self.assertEqual(parse_price("10.008.00"), 10.0)
+        self.assertEqual(parse_price("12.50."), 12.5)
+        self.assertEqual(parse_price("1\xa0234,50"), 1234.5)
+        self.assertEqual(parse_price("1,234,567.89"), 1234567.89)
+
+    def test_parse_price_sale_markup(self):
+        sale = "<span class=price><del>10.00</del> <ins>8.00</ins></span>"
+        self.assertEqual(parse_price(sale), 10.0)
+        self.assertEqual(normalize_price("<del>10.00</del> <ins>8.00</ins>"), 10.0)
+
+    def test_parse_price_locale(self):
+        self.assertEqual(parse_price("1,234", locale="en"), 1234.0)
+        self.assertEqual(parse_price("1.234", locale="pl"), 1234.0)
+        self.assertEqual(parse_price("1,234"), 1.234)
+
+    def test_parse_price_html(self):
+        self.assertEqual(parse_price("<bdi>12,34<span>&euro;</span></bdi>"), 12.34)
+        self.assertEqual(parse_price("<span>1,000.99</span>"), 1000.99)
+
+    def test_detect_currency(self):
+        self.assertEqual(detect_currency("€12"), "EUR")
+        self.assertEqual(detect_currency("£1"), "GBP")
+        self.assertEqual(detect_currency("$1"), "USD")
+        self.assertEqual(detect_currency("12.00 PLN"), "PLN")
+        self.assertIsNone(detect_currency("123.45 zł"))
+        self.assertIsNone(detect_currency(None))
+
+    def test_normalize_price(self):
+        self.assertEqual(normalize_price(120), 120.0)
+        self.assertEqual(normalize_price(np.float64(5.5)), 5.5)
+        self.assertEqual(normalize_price("No price", default=0.0), 0.0)
+        self.assertEqual(normalize_price(None, default=0.0), 0.0)
+        self.assertEqual(normalize_price(float("nan"), default=0.0), 0.0)
+        self.assertIsNone(normalize_price(True))
+
+    def test_normalize_prices_matches_scalar(self):
+        values = [54.99, 120, "123,45 zł", "£51.77", "Price: $1 234.56", "<span>1,000.99</span>",
+                  "1.234,56 €", "No price", None, float("nan"), "€ 7,50", "123,45 zł"]
+        result = normalize_prices(pd.Series(values, index=range(10, 10 + len(values))), default=0.0)
+        self.assertEqual(list(result.index), list(range(10, 10 + len(values))))
+        self.assertEqual(result.tolist(), [normalize_price(value, default=0.0) for value in values])
+
+    def test_normalize_prices_default_nan(self):
+        result = normalize_prices(["12,50", "brak", None])
+        self.assertEqual(result.iloc[0], 12.5)
+        self.assertTrue(result.iloc[1:].isna().all())
+
+    def test_normalize_prices_numpy(self):
+        numeric = normalize_prices(np.array([1, 2, 3]))
+        self.assertIsInstance(numeric, np.ndarray)
+        self.assertEqual(numeric.tolist(), [1.0, 2.0, 3.0])
+
+        text = normalize_prices(np.array(["1,5", "£2"], dtype=object))
+        self.assertIsInstance(text, np.ndarray)
+        self.assertEqual(text.tolist(), [1.5, 2.0])
+
+if __name__ == '__main__':
+    unittest.main()
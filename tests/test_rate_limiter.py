@@ -1,9 +1,13 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
-from scraper.rate_limiter import RateLimiter
+from scraper.rate_limiter import RateLimiter, SqliteRateStore, parse_retry_after
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
 import time
-from collections import deque
 
 class TestRateLimiter(unittest.TestCase):
 
@@ -22,13 +26,13 @@ class TestRateLimiter(unittest.TestCase):
         # Assert
         # No sleep on first call
         time.sleep.assert_not_called()
-        self.assertEqual(self.limiter.last_request_times["example.com"], 1000)
+        self.assertEqual(self.limiter.domain_state("example.com")["last"], 1000)
 
     @patch('time.sleep')
     @patch('time.time')
     def test_wait_respects_delay(self, mock_time, mock_sleep):
         # Arrange
-        self.limiter.last_request_times["example.com"] = 1000
+        self.limiter.store.update("example.com", lambda state: state.update(last=1000))
         mock_time.return_value = 1000.1 # 0.1s elapsed
         
         # Act
@@ -44,38 +48,259 @@ class TestRateLimiter(unittest.TestCase):
     def test_wait_rpm_limit(self, mock_time, mock_sleep):
         # Arrange
         mock_time.return_value = 1000
-        self.limiter.requests_per_minute = 5
-        self.limiter.domain_requests["example.com"] = deque()
-        
-        # Add 5 requests, with the oldest being more than 60s ago
-        self.limiter.domain_requests["example.com"].append(1000 - 70) # 70 seconds ago
-        self.limiter.domain_requests["example.com"].append(1000 - 15)
-        self.limiter.domain_requests["example.com"].append(1000 - 10)
-        self.limiter.domain_requests["example.com"].append(1000 - 5)
-        self.limiter.domain_requests["example.com"].append(1000 - 1)
+        limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=5)
 
         # Act
-        self.limiter.wait("http://example.com")
+        # A full minute's budget (5 requests) is available as a burst
+        for _ in range(5):
+            limiter.wait("http://example.com")
 
         # Assert
-        # The while loop in `wait` should be entered because the queue is full (5/5).
-        # Inside the loop, `now` (1000) - `oldest` (930) is 70, which is > 60.
-        # This should trigger `popleft()` and the loop should terminate.
-        # The while loop itself should not call sleep.
-        
-        # The while loop should have popped one element, and the function appends one.
-        # The final length should be 5.
-        self.assertEqual(len(self.limiter.domain_requests["example.com"]), 5)
+        mock_sleep.assert_not_called()
+
+        # The 6th request has to wait one emission interval (60s / 5 RPM)
+        limiter.wait("http://example.com")
+        mock_sleep.assert_called_once_with(12.0)
+
+    @patch('time.time')
+    def test_reserve_does_not_block(self, mock_time):
+        # Arrange
+        mock_time.return_value = 1000
+        limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=60, burst=1)
+
+        # Act
+        ready_times = [limiter.reserve("http://example.com") for _ in range(3)]
+        other_domain = limiter.reserve("http://other.com")
+
+        # Assert
+        self.assertEqual(ready_times, [1000, 1001, 1002])
+        self.assertEqual(other_domain, 1000)
+
+    @patch('asyncio.sleep')
+    @patch('time.time')
+    def test_wait_async(self, mock_time, mock_async_sleep):
+        # Arrange
+        mock_time.return_value = 1000
+        limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=60, burst=1)
+
+        async def two_requests():
+            await limiter.wait_async("http://example.com")
+            await limiter.wait_async("http://example.com")
+
+        # Act
+        asyncio.run(two_requests())
+
+        # Assert
+        mock_async_sleep.assert_called_once_with(1.0)
+
+    def test_reserve_thread_safe(self):
+        # Arrange
+        limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=600, burst=1)
+        ready_times = []
+
+        def worker():
+            for _ in range(50):
+                ready_times.append(limiter.reserve("http://example.com"))
+
+        # Act
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        # Every reservation gets its own slot, 0.1s apart
+        ready_times.sort()
+        self.assertEqual(len(ready_times), 200)
+        gaps = [b - a for a, b in zip(ready_times, ready_times[1:])]
+        self.assertGreaterEqual(min(gaps), 0.1 - 1e-6)
 
     def test_handle_error_429(self):
         # Act
         self.limiter.handle_error_429("http://example.com")
         
         # Assert
-        min_delay, max_delay = self.limiter.domain_delays["example.com"]
+        state = self.limiter.domain_state("example.com")
+        min_delay, max_delay = state["min_delay"], state["max_delay"]
         self.assertEqual(min_delay, 2) # 1 * 2
         self.assertEqual(max_delay, 4) # 2 * 2
 
+    def test_handle_error_429_halves_rate(self):
+        # Act
+        self.limiter.handle_error_429("http://example.com")
+
+        # Assert
+        self.assertEqual(self.limiter.domain_state("example.com")["rate"], 2.5)
+
+    def test_sustained_success_increases_rate_and_recovers_delays(self):
+        # Arrange
+        limiter = RateLimiter(min_delay=1, max_delay=2, requests_per_minute=10, success_window=3)
+        limiter.handle_error_429("http://example.com")
+
+        # Act
+        for _ in range(3):
+            limiter.record_success("http://example.com")
+
+        # Assert
+        state = limiter.domain_state("example.com")
+        self.assertEqual(state["rate"], 6)  # 10 * 0.5 + 1
+        self.assertNotIn("min_delay", state)
+
+    def test_rate_capped_at_maximum(self):
+        # Arrange
+        limiter = RateLimiter(requests_per_minute=10, max_requests_per_minute=11, success_window=1)
+
+        # Act
+        for _ in range(5):
+            limiter.record_success("http://example.com")
+
+        # Assert
+        self.assertEqual(limiter.domain_state("example.com")["rate"], 11)
+
+    @patch('time.time')
+    def test_jitter_follows_learned_rate(self, mock_time):
+        # Arrange
+        mock_time.return_value = 1000
+        limiter = RateLimiter(min_delay=1, max_delay=5, requests_per_minute=60, burst=1)
+
+        # Act: 60 RPM -> odstęp 1 s, więc opóźnienie 1–5 s jest przycięte do 1 s
+        slots = [limiter.reserve("http://example.com") for _ in range(4)]
+        # Tempo podniesione przez AIMD do 120 RPM skraca odstęp do 0,5 s
+        limiter.store.update("other.com", lambda state: state.update(rate=120))
+        faster = [limiter.reserve("http://other.com") for _ in range(3)]
+
+        # Assert
+        self.assertEqual(slots, [1000, 1001, 1002, 1003])
+        self.assertEqual(faster, [1000, 1000.5, 1001])
+
+    def test_growing_latency_slows_down(self):
+        # Arrange
+        limiter = RateLimiter(requests_per_minute=10, success_window=2, latency_factor=2.0)
+        limiter.record_success("http://example.com", latency=0.1)
+        limiter.record_success("http://example.com", latency=0.1)
+        self.assertEqual(limiter.domain_state("example.com")["rate"], 11)
+
+        # Act
+        for _ in range(10):
+            limiter.record_success("http://example.com", latency=2.0)
+
+        # Assert
+        self.assertLess(limiter.domain_state("example.com")["rate"], 10)
+
+    def test_permanent_latency_step_becomes_new_baseline(self):
+        # Arrange
+        limiter = RateLimiter(requests_per_minute=10, success_window=2, latency_factor=2.0)
+        for _ in range(2):
+            limiter.record_success("http://example.com", latency=0.1)
+
+        # Act: opóźnienia rosną na stałe (np. nowy CDN)
+        for _ in range(20):
+            limiter.record_success("http://example.com", latency=0.5)
+        slowed = limiter.domain_state("example.com")["rate"]
+        for _ in range(40):
+            limiter.record_success("http://example.com", latency=0.5)
+
+        # Assert: najpierw zwolnienie, potem tempo znów rośnie
+        self.assertLess(slowed, 10)
+        self.assertEqual(limiter.domain_state("example.com")["rate"], slowed + 20)
+
+    @patch('time.time')
+    def test_retry_after_blocks_domain(self, mock_time):
+        # Arrange
+        mock_time.return_value = 1000
+        limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=60)
+
+        # Act
+        limiter.record_error("http://example.com", 503, retry_after=30)
+
+        # Assert
+        self.assertEqual(limiter.reserve("http://example.com"), 1030)
+        self.assertEqual(limiter.reserve("http://other.com"), 1000)
+
+    @patch('time.time')
+    def test_robots_policy_caps_rate_and_delay(self, mock_time):
+        # Arrange
+        mock_time.return_value = 1000
+        limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=60, burst=1, success_window=1)
+        limiter.apply_robots_policy("example.com", crawl_delay=5, requests_per_minute=30)
+
+        # Act
+        first = limiter.reserve("http://example.com")
+        second = limiter.reserve("http://example.com")
+        limiter.record_success("http://example.com")
+
+        # Assert
+        self.assertEqual(first, 1000)
+        self.assertEqual(second, 1005)  # Crawl-delay: 5
+        self.assertEqual(limiter.domain_state("example.com")["rate"], 30)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+
+class TestSqliteRateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "rate_limits.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @patch('time.time')
+    def test_limiters_share_budget(self, mock_time):
+        # Arrange
+        mock_time.return_value = 1000
+        # Two limiters stand in for two processes (e.g. main.py and Panel.py)
+        first = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=60, burst=1,
+                            store=SqliteRateStore(self.path))
+        second = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=60, burst=1,
+                             store=SqliteRateStore(self.path))
+
+        # Act
+        ready_times = [first.reserve("http://example.com"), second.reserve("http://example.com"),
+                       first.reserve("http://example.com")]
+
+        # Assert
+        self.assertEqual(ready_times, [1000, 1001, 1002])
+
+    def test_error_state_is_shared(self):
+        # Arrange
+        first = RateLimiter(requests_per_minute=10, store=SqliteRateStore(self.path))
+        second = RateLimiter(requests_per_minute=10, store=SqliteRateStore(self.path))
+
+        # Act
+        first.handle_error_429("http://example.com")
+
+        # Assert
+        state = second.domain_state("example.com")
+        self.assertEqual(state["rate"], 5)
+        self.assertEqual((state["min_delay"], state["max_delay"]), (2, 10))
+
+    def test_concurrent_processes_get_unique_slots(self):
+        # Arrange
+        ctx = multiprocessing.get_context("spawn")
+
+        # Act
+        with ctx.Pool(3) as pool:
+            results = pool.map(_reserve_many, [self.path] * 3)
+
+        # Assert
+        ready_times = sorted(t for batch in results for t in batch)
+        gaps = [b - a for a, b in zip(ready_times, ready_times[1:])]
+        self.assertEqual(len(ready_times), 60)
+        self.assertGreaterEqual(min(gaps), 0.1 - 1e-6)
+
+
+def _reserve_many(path):
+    limiter = RateLimiter(min_delay=0, max_delay=0, requests_per_minute=600, burst=1,
+                          store=SqliteRateStore(path))
+    return [limiter.reserve("http://example.com") for _ in range(20)]
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,33 +1,48 @@
 
+import os
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+import requests
+from scraper.rate_limiter import RateLimiter
 from scraper.robot_parser import RobotManager
 
+ROBOTS_TXT = "User-agent: *\nDisallow: /disallowed\n"
+
 class TestRobotManager(unittest.TestCase):
 
     def setUp(self):
-        self.manager = RobotManager()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, "robots_cache.json")
+        self.mock_limiter = MagicMock()
+        self.manager = RobotManager(cache_path=self.cache_path, limiter=self.mock_limiter)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
 
-    @patch('urllib.robotparser.RobotFileParser')
-    def test_can_fetch_allowed(self, MockRobotFileParser):
+    def _response(self, text=ROBOTS_TXT, status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.text = text
+        return response
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_can_fetch_allowed(self, mock_session_manager):
         # Arrange
-        mock_parser = MockRobotFileParser.return_value
-        mock_parser.can_fetch.return_value = True
+        mock_session_manager.get.return_value = self._response()
         
         # Act
         allowed = self.manager.can_fetch("http://example.com/allowed")
         
         # Assert
         self.assertTrue(allowed)
-        mock_parser.set_url.assert_called_once_with("http://example.com/robots.txt")
-        mock_parser.read.assert_called_once()
-        mock_parser.can_fetch.assert_called_once_with('*', "http://example.com/allowed")
+        mock_session_manager.get.assert_called_once_with("http://example.com/robots.txt", timeout=10)
 
-    @patch('urllib.robotparser.RobotFileParser')
-    def test_can_fetch_disallowed(self, MockRobotFileParser):
+    @patch('scraper.robot_parser.session_manager')
+    def test_can_fetch_disallowed(self, mock_session_manager):
         # Arrange
-        mock_parser = MockRobotFileParser.return_value
-        mock_parser.can_fetch.return_value = False
+        mock_session_manager.get.return_value = self._response()
         
         # Act
         allowed = self.manager.can_fetch("http://example.com/disallowed")
@@ -35,11 +50,10 @@ class TestRobotManager(unittest.TestCase):
         # Assert
         self.assertFalse(allowed)
 
-    @patch('urllib.robotparser.RobotFileParser')
-    def test_can_fetch_read_error(self, MockRobotFileParser):
+    @patch('scraper.robot_parser.session_manager')
+    def test_can_fetch_read_error(self, mock_session_manager):
         # Arrange
-        mock_parser = MockRobotFileParser.return_value
-        mock_parser.read.side_effect = Exception("Failed to fetch robots.txt")
+        mock_session_manager.get.side_effect = requests.exceptions.ConnectionError("Failed to fetch robots.txt")
         
         # Act
         allowed = self.manager.can_fetch("http://example.com/any")
@@ -47,6 +61,17 @@ class TestRobotManager(unittest.TestCase):
         # Assert
         self.assertTrue(allowed)
 
+    @patch('scraper.robot_parser.session_manager')
+    def test_can_fetch_forbidden_robots(self, mock_session_manager):
+        # Arrange
+        mock_session_manager.get.return_value = self._response(text="", status_code=403)
+
+        # Act
+        allowed = self.manager.can_fetch("http://example.com/any")
+
+        # Assert
+        self.assertFalse(allowed)
+
     def test_can_fetch_disabled(self):
         # Arrange
         self.manager.disabled = True
@@ -59,21 +84,130 @@ class TestRobotManager(unittest.TestCase):
         # Ensure no parser was created
         self.assertEqual(len(self.manager.parsers), 0)
 
-    @patch('urllib.robotparser.RobotFileParser')
-    def test_can_fetch_cached_parser(self, MockRobotFileParser):
+    @patch('scraper.robot_parser.session_manager')
+    def test_can_fetch_cached_parser(self, mock_session_manager):
         # Arrange
-        mock_parser = MockRobotFileParser.return_value
-        mock_parser.can_fetch.return_value = True
+        mock_session_manager.get.return_value = self._response()
         
         # Act
         self.manager.can_fetch("http://example.com/page1")
         self.manager.can_fetch("http://example.com/page2")
         
         # Assert
-        # set_url and read should only be called once
-        mock_parser.set_url.assert_called_once_with("http://example.com/robots.txt")
-        mock_parser.read.assert_called_once()
-        self.assertEqual(mock_parser.can_fetch.call_count, 2)
+        # robots.txt should only be downloaded once
+        mock_session_manager.get.assert_called_once_with("http://example.com/robots.txt", timeout=10)
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_cache_persists_across_restarts(self, mock_session_manager):
+        # Arrange
+        mock_session_manager.get.return_value = self._response()
+        self.manager.can_fetch("http://example.com/page")
+
+        # Act
+        restarted = RobotManager(cache_path=self.cache_path, limiter=self.mock_limiter)
+        allowed = restarted.can_fetch("http://example.com/disallowed")
+
+        # Assert
+        self.assertFalse(allowed)
+        mock_session_manager.get.assert_called_once()
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_read_error_is_negatively_cached(self, mock_session_manager):
+        # Arrange
+        mock_session_manager.get.side_effect = requests.exceptions.Timeout("slow host")
+
+        # Act
+        self.manager.can_fetch("http://example.com/a")
+        self.manager.can_fetch("http://example.com/b")
+
+        # Assert
+        mock_session_manager.get.assert_called_once()
+        entry = self.manager.entries["http://example.com"]
+        self.assertEqual(entry["status"], "error")
+        self.assertLessEqual(entry["expires_at"], time.time() + self.manager.negative_ttl)
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_stale_entry_refreshed_in_background(self, mock_session_manager):
+        # Arrange
+        mock_session_manager.get.return_value = self._response()
+        self.manager.can_fetch("http://example.com/page")
+        self.manager.entries["http://example.com"]["expires_at"] = time.time() - 1
+        mock_session_manager.get.return_value = self._response(text="User-agent: *\nDisallow: /page\n")
+
+        # Act
+        # The stale rules still answer immediately...
+        stale_answer = self.manager.can_fetch("http://example.com/page")
+        self.manager._executor.shutdown(wait=True)
+
+        # Assert
+        # ...and the refreshed rules are used afterwards
+        self.assertTrue(stale_answer)
+        self.assertFalse(self.manager.can_fetch("http://example.com/page"))
+        self.assertEqual(mock_session_manager.get.call_count, 2)
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_crawl_delay_and_request_rate_feed_limiter(self, mock_session_manager):
+        # Arrange
+        mock_session_manager.get.return_value = self._response(
+            text="User-agent: *\nCrawl-delay: 3\nRequest-rate: 1/10\nDisallow: /private\n")
+
+        # Act
+        self.manager.can_fetch("http://example.com/page")
+
+        # Assert
+        self.mock_limiter.apply_robots_policy.assert_called_once_with("example.com", 3.0, 6.0)
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_removed_directives_clear_limiter_policy(self, mock_session_manager):
+        # Arrange
+        limiter = RateLimiter()
+        manager = RobotManager(cache_path=self.cache_path, limiter=limiter)
+        mock_session_manager.get.return_value = self._response(text="User-agent: *\nCrawl-delay: 3\n")
+        manager.can_fetch("http://example.com/page")
+        self.assertEqual(limiter.robots_policies["example.com"], (3.0, None))
+        mock_session_manager.get.return_value = self._response()
+
+        # Act
+        manager._refresh("http://example.com")
+
+        # Assert
+        self.assertNotIn("example.com", limiter.robots_policies)
+
+    def test_slower_refresh_does_not_overwrite_newer_rules(self):
+        # Arrange
+        old_rules = {"status": "ok", "body": "User-agent: *\nDisallow: /page\n", "expires_at": time.time() + 60}
+        new_rules = {"status": "ok", "body": ROBOTS_TXT, "expires_at": time.time() + 60}
+
+        def slow_download(domain):
+            # Zanim wolne pobranie się zakończy, inny wątek zapisuje nowsze reguły
+            with patch.object(self.manager, "_download", return_value=new_rules):
+                self.manager._refresh(domain)
+            return old_rules
+
+        # Act
+        with patch.object(self.manager, "_download", side_effect=slow_download):
+            self.manager._refresh("http://example.com")
+
+        # Assert
+        self.assertIs(self.manager.entries["http://example.com"], new_rules)
+        self.assertTrue(self.manager.can_fetch("http://example.com/page"))
+
+    @patch('scraper.robot_parser.session_manager')
+    def test_can_fetch_many_groups_by_domain(self, mock_session_manager):
+        # Arrange
+        mock_session_manager.get.return_value = self._response()
+        urls = [
+            "http://example.com/allowed",
+            "http://other.example/disallowed",
+            "http://example.com/disallowed/page",
+        ]
+
+        # Act
+        allowed = self.manager.can_fetch_many(urls)
+
+        # Assert
+        self.assertEqual(allowed, [True, False, False])
+        self.assertEqual(mock_session_manager.get.call_count, 2)
 
 if __name__ == '__main__':
     unittest.main()
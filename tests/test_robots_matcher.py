@@ -0,0 +1,70 @@
+import unittest
+from scraper.robots_matcher import CompiledRobots, RequestRate
+
+ROBOTS_TXT = """
+# Przykładowy robots.txt
+User-agent: *
+Disallow: /cart
+Disallow: /*?add-to-cart=
+Disallow: /*.pdf$
+Allow: /cart/public
+Crawl-delay: 2
+Request-rate: 30/60
+
+User-agent: BadBot
+Disallow: /
+"""
+
+class TestCompiledRobots(unittest.TestCase):
+
+    def setUp(self):
+        self.robots = CompiledRobots(ROBOTS_TXT)
+
+    def test_prefix_rules(self):
+        self.assertTrue(self.robots.can_fetch("*", "https://shop.example/product/1"))
+        self.assertFalse(self.robots.can_fetch("*", "https://shop.example/cart/checkout"))
+
+    def test_longest_match_wins(self):
+        self.assertTrue(self.robots.can_fetch("*", "https://shop.example/cart/public/info"))
+
+    def test_allow_wins_tie(self):
+        robots = CompiledRobots("User-agent: *\nDisallow: /page\nAllow: /page\n")
+        self.assertTrue(robots.can_fetch("*", "https://shop.example/page"))
+
+    def test_wildcards(self):
+        self.assertFalse(self.robots.can_fetch("*", "https://shop.example/shop/?add-to-cart=5"))
+        self.assertFalse(self.robots.can_fetch("*", "https://shop.example/docs/manual.pdf"))
+        self.assertTrue(self.robots.can_fetch("*", "https://shop.example/docs/manual.pdf?v=2"))
+
+    def test_user_agent_groups(self):
+        self.assertFalse(self.robots.can_fetch("BadBot/1.0", "https://shop.example/product/1"))
+        self.assertTrue(self.robots.can_fetch("GoodBot/1.0", "https://shop.example/product/1"))
+
+    def test_crawl_delay_and_request_rate(self):
+        self.assertEqual(self.robots.crawl_delay("*"), 2.0)
+        self.assertEqual(self.robots.request_rate("*"), RequestRate(30, 60))
+        self.assertIsNone(self.robots.crawl_delay("BadBot"))
+
+    def test_can_fetch_many(self):
+        urls = [
+            "https://shop.example/product/1",
+            "https://shop.example/cart",
+            "https://shop.example/page/2/",
+        ]
+        self.assertEqual(self.robots.can_fetch_many("*", urls), [True, False, True])
+
+    def test_results_are_memoized_per_path(self):
+        self.robots.can_fetch("*", "https://shop.example/product/1")
+        group = self.robots.default_group
+        self.assertIn("/product/1", group._memo)
+
+    def test_allow_all_and_disallow_all(self):
+        self.assertTrue(CompiledRobots(allow_all=True).can_fetch("*", "https://shop.example/cart"))
+        self.assertFalse(CompiledRobots(disallow_all=True).can_fetch_many("*", ["https://shop.example/"])[0])
+
+    def test_empty_disallow_allows_everything(self):
+        robots = CompiledRobots("User-agent: *\nDisallow:\n")
+        self.assertTrue(robots.can_fetch("*", "https://shop.example/anything"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,28 @@
 
+import os
+import tempfile
+import time
 import unittest
-from unittest.mock import patch, call
-from scraper.scheduler import run_scrape_once
+from unittest.mock import patch, call, MagicMock
+from scraper.scheduler import run_scrape_once, run_scheduler
+from scraper.fingerprint import PageFingerprints
+from scraper.http_cache import NOT_MODIFIED, ValidatorCache
+from scraper.strategy import StrategyMemory
 
 class TestScheduler(unittest.TestCase):
 
+    def setUp(self):
+        patcher = patch('scraper.scheduler.validator_cache')
+        self.mock_cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('scraper.scheduler.page_fingerprints')
+        self.mock_fingerprints = patcher.start()
+        self.mock_fingerprints.cached_products.return_value = None
+        self.addCleanup(patcher.stop)
+        patcher = patch('scraper.scheduler.strategy_memory')
+        self.mock_strategy = patcher.start()
+        self.addCleanup(patcher.stop)
+
     @patch('scraper.scheduler.fetch_with_fallback')
     @patch('scraper.scheduler.parse_products')
     @patch('scraper.scheduler.save_products')
@@ -20,7 +38,7 @@ class TestScheduler(unittest.TestCase):
         # Assert
         self.assertEqual(total_products, 1)
         mock_fetch.assert_called_once_with("http://shop1.com")
-        mock_parse.assert_called_once_with("<html></html>")
+        mock_parse.assert_called_once_with("<html></html>", "http://shop1.com")
         mock_save.assert_called_once_with([{"name": "product1", "price": 10}], "shop1")
 
     @patch('scraper.scheduler.fetch_with_fallback')
@@ -44,6 +62,7 @@ class TestScheduler(unittest.TestCase):
         mock_fetch.assert_has_calls([call("http://shop2.com"), call("http://shop2.com", wait_selector=".thumbnail")])
         self.assertEqual(mock_parse.call_count, 2)
         mock_save.assert_called_once_with([{"name": "product2", "price": 20}], "shop2")
+        self.mock_strategy.record_result.assert_has_calls([call("http://shop2.com", 0), call("http://shop2.com", 1)])
         
     @patch('scraper.scheduler.fetch_with_fallback')
     @patch('scraper.scheduler.parse_products')
@@ -83,5 +102,227 @@ class TestScheduler(unittest.TestCase):
             call([{"name": "prodB"}, {"name": "prodC"}], "shopB")
         ])
 
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_not_modified_reuses_cache(self, mock_save, mock_parse, mock_fetch):
+        # Arrange
+        urls = {"shop1": "http://shop1.com"}
+        mock_fetch.return_value = NOT_MODIFIED
+        self.mock_cache.cached_products.return_value = [{"name": "p1"}, {"name": "p2"}]
+
+        # Act
+        total_products = run_scrape_once(urls)
+
+        # Assert
+        self.assertEqual(total_products, 2)
+        mock_parse.assert_not_called()
+        mock_save.assert_not_called()
+        self.mock_cache.save.assert_called_once()
+
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_unchanged_fingerprint_skips_parse(self, mock_save, mock_parse, mock_fetch):
+        # Arrange
+        urls = {"shop1": "http://shop1.com"}
+        mock_fetch.return_value = "<html>same</html>"
+        self.mock_fingerprints.fingerprint.return_value = "abc"
+        self.mock_fingerprints.cached_products.return_value = [{"name": "p1"}]
+
+        # Act
+        total_products = run_scrape_once(urls)
+
+        # Assert
+        self.assertEqual(total_products, 1)
+        self.mock_fingerprints.cached_products.assert_called_once_with("shop1", "abc")
+        mock_parse.assert_not_called()
+        mock_save.assert_not_called()
+
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_remembers_fingerprint(self, mock_save, mock_parse, mock_fetch):
+        # Arrange
+        urls = {"shop1": "http://shop1.com"}
+        mock_fetch.return_value = "<html>new</html>"
+        mock_parse.return_value = [{"name": "p1"}]
+        self.mock_fingerprints.fingerprint.return_value = "abc"
+
+        # Act
+        run_scrape_once(urls)
+
+        # Assert
+        self.mock_fingerprints.remember.assert_called_once_with("shop1", "abc", [{"name": "p1"}])
+        self.mock_fingerprints.save.assert_called_once()
+
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_retries_selenium_for_empty_page(self, mock_save, mock_parse, mock_fetch):
+        # Arrange: the Requests HTML never parses, and Selenium fails on the first cycle only
+        urls = {"shop1": "http://shop1.com"}
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        fingerprints = PageFingerprints(path=os.path.join(tmpdir.name, "fingerprints.json"))
+        mock_fetch.side_effect = ["<html>js</html>", None, "<html>js</html>", "<html>rendered</html>"]
+        mock_parse.side_effect = lambda html, url=None: [{"name": "p1"}] if "rendered" in html else []
+
+        # Act
+        with patch('scraper.scheduler.page_fingerprints', fingerprints):
+            first = run_scrape_once(urls)
+            second = run_scrape_once(urls)
+
+        # Assert: the empty page was not remembered, so Selenium ran again
+        self.assertEqual((first, second), (0, 1))
+        self.assertEqual(mock_fetch.call_count, 4)
+        mock_fetch.assert_called_with("http://shop1.com", wait_selector=".thumbnail")
+        # Only the HTML that produced products is remembered
+        rendered = fingerprints.fingerprint("shop1", "<html>rendered</html>")
+        self.assertEqual(fingerprints.cached_products("shop1", rendered), [{"name": "p1"}])
+        self.assertIsNone(fingerprints.cached_products("shop1", fingerprints.fingerprint("shop1", "<html>js</html>")))
+
+    @patch('scraper.fetcher.robot_manager')
+    @patch('scraper.fetcher.limiter')
+    @patch('scraper.fetcher.session_manager.get')
+    @patch('scraper.fetcher.fetch_html_selenium', return_value="<html>rendered</html>")
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_js_shell_rendered_by_selenium_is_not_frozen_by_304(self, mock_save, mock_parse, mock_selenium,
+                                                               mock_get, mock_limiter, mock_robot_manager):
+        # Arrange: a JS shell with an ETag, whose products only appear after Selenium renders it
+        urls = {"shop1": "http://shop1.com"}
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cache = ValidatorCache(path=os.path.join(tmpdir.name, "http_cache.json"))
+        strategy = StrategyMemory(path=os.path.join(tmpdir.name, "strategy.json"), reprobe_every=3)
+        shell = "<html><script>" + "x" * 3000 + "</script></html>"
+
+        def get(url, timeout=10, headers=None):
+            if headers:
+                return MagicMock(status_code=304, headers={})
+            return MagicMock(status_code=200, text=shell, headers={"ETag": '"shell"'})
+
+        mock_robot_manager.can_fetch.return_value = True
+        mock_get.side_effect = get
+        mock_parse.side_effect = lambda html, url=None: [{"name": "p1", "price": 1.0}] if "rendered" in html else []
+
+        # Act
+        with patch('scraper.fetcher.validator_cache', cache), patch('scraper.scheduler.validator_cache', cache), \
+                patch('scraper.fetcher.strategy_memory', strategy), patch('scraper.scheduler.strategy_memory', strategy):
+            counts = [run_scrape_once(urls) for _ in range(5)]
+
+        # Assert: Selenium products never sit behind the shell's validators, so the
+        # Requests re-probe gets a full response and every cycle re-renders and saves
+        self.assertEqual(counts, [1] * 5)
+        self.assertEqual(mock_save.call_count, 5)
+        self.assertEqual(mock_selenium.call_count, 5)
+        self.assertTrue(all(c.kwargs.get("headers") is None for c in mock_get.call_args_list))
+
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_concurrent_same_counts(self, mock_save, mock_parse, mock_fetch):
+        # Arrange
+        urls = {"shopA": "http://shopA.com/1", "shopA2": "http://shopA.com/2", "shopB": "http://shopB.com"}
+        mock_fetch.side_effect = lambda url, **kwargs: f"<html>{url}</html>"
+        mock_parse.side_effect = lambda html, url=None: [{"name": html}]
+
+        # Act
+        total_products = run_scrape_once(urls, concurrent=True)
+
+        # Assert
+        self.assertEqual(total_products, 3)
+        self.assertEqual(mock_save.call_count, 3)
+        # Sources on the same domain keep their order
+        saved_sources = [c.args[1] for c in mock_save.call_args_list]
+        self.assertLess(saved_sources.index("shopA"), saved_sources.index("shopA2"))
+
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_concurrent_overlaps_domains(self, mock_save, mock_parse, mock_fetch):
+        # Arrange
+        urls = {f"shop{i}": f"http://shop{i}.com" for i in range(4)}
+
+        def slow_fetch(url, **kwargs):
+            time.sleep(0.2)
+            return "<html></html>"
+
+        mock_fetch.side_effect = slow_fetch
+        mock_parse.return_value = [{"name": "product"}]
+
+        # Act
+        start = time.monotonic()
+        total_products = run_scrape_once(urls, concurrent=True)
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual(total_products, 4)
+        self.assertLess(elapsed, 0.6)
+
+    @patch('scraper.scheduler.can_stream', return_value=True)
+    @patch('scraper.scheduler.ProductStream')
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_streaming(self, mock_save, mock_fetch, mock_stream, mock_can_stream):
+        # Arrange
+        urls = {"shop1": "http://shop1.com"}
+        mock_stream.return_value.__iter__.return_value = iter([{"name": "p1"}, {"name": "p2"}])
+        mock_stream.return_value.not_modified = False
+
+        # Act
+        total_products = run_scrape_once(urls, streaming=True)
+
+        # Assert
+        self.assertEqual(total_products, 2)
+        mock_fetch.assert_not_called()
+        mock_save.assert_called_once_with([{"name": "p1"}, {"name": "p2"}], "shop1")
+        self.mock_cache.store_products.assert_called_once_with("http://shop1.com", [{"name": "p1"}, {"name": "p2"}])
+
+    @patch('scraper.scheduler.can_stream', return_value=True)
+    @patch('scraper.scheduler.ProductStream')
+    @patch('scraper.scheduler.fetch_with_fallback')
+    @patch('scraper.scheduler.parse_products')
+    @patch('scraper.scheduler.save_products')
+    def test_run_scrape_once_streaming_falls_back(self, mock_save, mock_parse, mock_fetch, mock_stream, mock_can_stream):
+        # Arrange
+        urls = {"shop1": "http://shop1.com"}
+        mock_stream.return_value.__iter__.return_value = iter([])
+        mock_stream.return_value.not_modified = False
+        mock_fetch.return_value = "<html></html>"
+        mock_parse.return_value = [{"name": "p1"}]
+
+        # Act
+        total_products = run_scrape_once(urls, streaming=True)
+
+        # Assert
+        self.assertEqual(total_products, 1)
+        mock_fetch.assert_called_once_with("http://shop1.com")
+
+    @patch('scraper.scheduler.write_queue')
+    @patch('scraper.scheduler.time.sleep', side_effect=KeyboardInterrupt)
+    @patch('scraper.scheduler.run_scrape_once', return_value=0)
+    def test_run_scheduler_flushes_write_queue_on_interrupt(self, mock_run, mock_sleep, mock_queue):
+        # Act
+        run_scheduler({"shop1": "http://shop1.com"})
+
+        # Assert
+        mock_run.assert_called_once()
+        mock_queue.close.assert_called_once()
+
+    @patch('scraper.scheduler.write_queue')
+    @patch('scraper.scheduler.archive_old_data', side_effect=OSError("disk full"))
+    @patch('scraper.scheduler.time.sleep', side_effect=[None, KeyboardInterrupt])
+    @patch('scraper.scheduler.run_scrape_once', return_value=0)
+    def test_run_scheduler_archives_once_a_day(self, mock_run, mock_sleep, mock_archive, mock_queue):
+        # Act
+        run_scheduler({"shop1": "http://shop1.com"}, archive_after_days=30, archive_dir="arch")
+
+        # Assert: two cycles, one archive run, and the archive error does not stop the scheduler
+        self.assertEqual(mock_run.call_count, 2)
+        mock_archive.assert_called_once_with(30, archive_dir="arch", compression="zstd")
+        mock_queue.flush.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
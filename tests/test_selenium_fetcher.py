@@ -1,10 +1,17 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
-from scraper.selenium_fetcher import fetch_html_selenium
+from unittest.mock import PropertyMock
+from scraper import selenium_fetcher
+from scraper.selenium_fetcher import fetch_html_selenium, DriverPool, get_render_profile, IMAGE_URL_PATTERNS, wait_until_ready, DEFAULT_RENDER_PROFILE
 
 class TestSeleniumFetcher(unittest.TestCase):
 
+    def setUp(self):
+        patcher = patch('scraper.selenium_fetcher.driver_pool', DriverPool(max_size=1))
+        self.pool = patcher.start()
+        self.addCleanup(patcher.stop)
+
     @patch('scraper.selenium_fetcher.create_driver')
     @patch('scraper.selenium_fetcher.robot_manager')
     @patch('scraper.selenium_fetcher.limiter')
@@ -26,7 +33,8 @@ class TestSeleniumFetcher(unittest.TestCase):
         mock_create_driver.assert_called_once()
         mock_driver.get.assert_called_once_with("http://example.com")
         MockWebDriverWait.assert_called_once()
-        mock_driver.quit.assert_called_once()
+        mock_driver.quit.assert_not_called()
+        self.assertEqual(self.pool._idle, [mock_driver])
 
     @patch('scraper.selenium_fetcher.robot_manager')
     def test_fetch_html_selenium_robots_disallowed(self, mock_robot_manager):
@@ -47,24 +55,28 @@ class TestSeleniumFetcher(unittest.TestCase):
         # Arrange
         mock_robot_manager.can_fetch.return_value = True
         
-        mock_driver_429 = MagicMock()
-        mock_driver_429.title = "Too Many Requests"
-
-        mock_driver_success = MagicMock()
-        mock_driver_success.page_source = "<html>Success</html>"
-        
-        mock_create_driver.side_effect = [mock_driver_429, mock_driver_success]
+        mock_driver = MagicMock()
+        type(mock_driver).title = PropertyMock(side_effect=["Too Many Requests", "Shop"])
+        mock_driver.page_source = "<html>Success</html>"
+        mock_create_driver.return_value = mock_driver
         
         # Act
         html = fetch_html_selenium("http://example.com", retries=1)
         
         # Assert
         self.assertEqual(html, "<html>Success</html>")
-        self.assertEqual(mock_create_driver.call_count, 2)
+        # The pooled browser is reused for the retry
+        mock_create_driver.assert_called_once()
+        self.assertEqual(mock_driver.get.call_count, 2)
         mock_limiter.handle_error_429.assert_called_once_with("http://example.com")
 
     @patch('scraper.selenium_fetcher.create_driver', return_value=None)
-    def test_fetch_html_selenium_driver_creation_fails(self, mock_create_driver):
+    @patch('scraper.selenium_fetcher.robot_manager')
+    @patch('scraper.selenium_fetcher.limiter')
+    def test_fetch_html_selenium_driver_creation_fails(self, mock_limiter, mock_robot_manager, mock_create_driver):
+        # Arrange
+        mock_robot_manager.can_fetch.return_value = True
+
         # Act
         html = fetch_html_selenium("http://example.com")
         
@@ -88,7 +100,206 @@ class TestSeleniumFetcher(unittest.TestCase):
 
         # Assert
         self.assertEqual(html, "<html>No content</html>")
+        mock_driver.quit.assert_not_called()
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    @patch('scraper.selenium_fetcher.robot_manager')
+    @patch('scraper.selenium_fetcher.limiter')
+    def test_fetch_html_selenium_crash_discards_driver(self, mock_limiter, mock_robot_manager, mock_create_driver):
+        # Arrange
+        mock_robot_manager.can_fetch.return_value = True
+        mock_driver = MagicMock()
+        mock_driver.get.side_effect = Exception("chrome not reachable")
+        mock_create_driver.return_value = mock_driver
+
+        # Act
+        html = fetch_html_selenium("http://example.com")
+
+        # Assert
+        self.assertIsNone(html)
         mock_driver.quit.assert_called_once()
+        self.assertEqual(self.pool._idle, [])
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    @patch('scraper.selenium_fetcher.robot_manager')
+    @patch('scraper.selenium_fetcher.limiter')
+    @patch('scraper.selenium_fetcher.WebDriverWait')
+    def test_fetch_html_selenium_blocks_resources_and_records_metrics(self, MockWebDriverWait, mock_limiter, mock_robot_manager, mock_create_driver):
+        # Arrange
+        mock_robot_manager.can_fetch.return_value = True
+        mock_driver = MagicMock()
+        mock_driver.title = "Shop"
+        mock_driver.page_source = "<html></html>"
+        mock_driver.execute_script.return_value = {"bytes": 2048, "resources": 3}
+        mock_create_driver.return_value = mock_driver
+
+        # Act
+        fetch_html_selenium("http://example.com", wait_selector=".content")
+
+        # Assert
+        mock_driver.execute_cdp_cmd.assert_any_call("Network.setBlockedURLs", {
+            "urls": selenium_fetcher.DEFAULT_RENDER_PROFILE["blocked_urls"] + IMAGE_URL_PATTERNS
+        })
+        metrics = selenium_fetcher.fetch_stats[-1]
+        self.assertEqual(metrics["url"], "http://example.com")
+        self.assertEqual(metrics["bytes"], 2048)
+        self.assertIn("load_ms", metrics)
+
+    @patch.dict('scraper.selenium_fetcher.render_profiles', {"shop.example": {"block_images": False}})
+    def test_render_profile_per_domain(self):
+        # Act
+        profile = get_render_profile("https://shop.example/list")
+        default = get_render_profile("https://other.example/")
+
+        # Assert
+        self.assertFalse(profile["block_images"])
+        self.assertEqual(profile["page_load_strategy"], "eager")
+        self.assertTrue(default["block_images"])
+
+    @patch('scraper.selenium_fetcher.time.sleep')
+    @patch('scraper.selenium_fetcher.wait_until_ready')
+    @patch('scraper.selenium_fetcher.create_driver')
+    @patch('scraper.selenium_fetcher.robot_manager')
+    @patch('scraper.selenium_fetcher.limiter')
+    def test_fetch_html_selenium_waits_for_readiness_not_sleep(self, mock_limiter, mock_robot_manager, mock_create_driver, mock_wait, mock_sleep):
+        # Arrange
+        mock_robot_manager.can_fetch.return_value = True
+        mock_driver = MagicMock()
+        mock_driver.title = "Shop"
+        mock_driver.page_source = "<html></html>"
+        mock_create_driver.return_value = mock_driver
+
+        # Act
+        fetch_html_selenium("https://books.toscrape.com/catalogue/", timeout=5)
+
+        # Assert
+        mock_sleep.assert_not_called()
+        mock_wait.assert_called_once_with(mock_driver, (".product_pod", None), timeout=5)
+
+    def test_wait_until_ready_combines_selectors(self):
+        # Arrange
+        mock_driver = MagicMock()
+        mock_driver.execute_script.return_value = True
+
+        # Act
+        wait_until_ready(mock_driver, (".product_pod", None, ".thumbnail"), timeout=1)
+
+        # Assert
+        args = mock_driver.execute_script.call_args[0]
+        self.assertEqual(args[1], ".product_pod, .thumbnail")
+
+    def test_wait_until_ready_polls_until_stable(self):
+        # Arrange
+        mock_driver = MagicMock()
+        mock_driver.execute_script.side_effect = [False, False, True]
+
+        # Act
+        wait_until_ready(mock_driver, timeout=2)
+
+        # Assert
+        self.assertEqual(mock_driver.execute_script.call_count, 3)
+        self.assertIsNone(mock_driver.execute_script.call_args[0][1])
+
+
+class TestDriverPool(unittest.TestCase):
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    def test_driver_is_reused(self, mock_create_driver):
+        # Arrange
+        pool = DriverPool(max_size=2)
+        mock_create_driver.return_value = MagicMock()
+
+        # Act
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        # Assert
+        self.assertIs(first, second)
+        mock_create_driver.assert_called_once()
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    def test_driver_recycled_after_max_pages(self, mock_create_driver):
+        # Arrange
+        pool = DriverPool(max_size=1, max_pages=2)
+        old_driver, new_driver = MagicMock(), MagicMock()
+        mock_create_driver.side_effect = [old_driver, new_driver]
+
+        # Act
+        for _ in range(2):
+            pool.release(pool.acquire())
+        driver = pool.acquire()
+
+        # Assert
+        old_driver.quit.assert_called_once()
+        self.assertIs(driver, new_driver)
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    def test_unhealthy_driver_replaced(self, mock_create_driver):
+        # Arrange
+        pool = DriverPool(max_size=1)
+        dead_driver, new_driver = MagicMock(), MagicMock()
+        dead_driver.execute_script.side_effect = Exception("session deleted")
+        mock_create_driver.side_effect = [dead_driver, new_driver]
+        pool.release(pool.acquire())
+
+        # Act
+        driver = pool.acquire()
+
+        # Assert
+        self.assertIs(driver, new_driver)
+        dead_driver.quit.assert_called_once()
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    def test_drivers_are_kept_per_startup_profile(self, mock_create_driver):
+        # Arrange
+        pool = DriverPool(max_size=2)
+        eager, normal = MagicMock(), MagicMock()
+        mock_create_driver.side_effect = [eager, normal]
+        slow = dict(DEFAULT_RENDER_PROFILE, page_load_strategy="normal")
+        # CDP-only settings do not need a separate browser
+        no_images = dict(DEFAULT_RENDER_PROFILE, block_images=False)
+
+        # Act
+        pool.release(pool.acquire())
+        driver = pool.acquire(profile=slow)
+        pool.release(driver)
+
+        # Assert
+        self.assertIs(driver, normal)
+        mock_create_driver.assert_called_with(slow)
+        self.assertIs(pool.acquire(profile=no_images), eager)
+        self.assertIs(pool.acquire(profile=slow), normal)
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    def test_full_pool_replaces_idle_driver_with_other_profile(self, mock_create_driver):
+        # Arrange
+        pool = DriverPool(max_size=1)
+        eager, normal = MagicMock(), MagicMock()
+        mock_create_driver.side_effect = [eager, normal]
+        pool.release(pool.acquire())
+
+        # Act
+        driver = pool.acquire(timeout=0.05, profile=dict(DEFAULT_RENDER_PROFILE, window_size="1920,1080"))
+
+        # Assert
+        self.assertIs(driver, normal)
+        eager.quit.assert_called_once()
+        self.assertEqual(pool._created, 1)
+
+    @patch('scraper.selenium_fetcher.create_driver')
+    def test_pool_is_bounded(self, mock_create_driver):
+        # Arrange
+        pool = DriverPool(max_size=1)
+        mock_create_driver.return_value = MagicMock()
+        pool.acquire()
+
+        # Act
+        driver = pool.acquire(timeout=0.05)
+
+        # Assert
+        self.assertIsNone(driver)
+        mock_create_driver.assert_called_once()
 
 
 if __name__ == '__main__':
@@ -1,47 +1,375 @@
-
+import os
+import sqlite3
+import tempfile
+import threading
 import unittest
-from unittest.mock import patch, MagicMock
 import pandas as pd
-from scraper.storage import save_products
+from unittest.mock import patch
 from datetime import datetime
+from scraper import storage
+from scraper.storage import (
+    StorageWriter, WriteBehindQueue, save_products, load_observations, load_history, product_key, to_epoch,
+    migrate_legacy,
+)
+
+PRODUCTS = [
+    {"name": "Test Product 1", "price": 19.99, "currency": "USD"},
+    {"name": "Test Product 2", "price": 25.50, "currency": "EUR"}
+]
 
 class TestStorage(unittest.TestCase):
 
-    @patch('scraper.storage.sqlite3.connect')
-    @patch('pandas.DataFrame.to_sql')
-    def test_save_products(self, mock_to_sql, mock_connect):
-        # Arrange
-        products = [
-            {"name": "Test Product 1", "price": 19.99, "currency": "USD"},
-            {"name": "Test Product 2", "price": 25.50, "currency": "EUR"}
-        ]
-        source = "test_shop"
-        
-        # Act
-        save_products(products, source)
-        
-        # Assert
-        mock_connect.assert_called_once_with("scraped_data.db")
-        
-        # We can't easily assert the dataframe content, but we can check to_sql call
-        mock_to_sql.assert_called_once()
-        args, kwargs = mock_to_sql.call_args
-        
-        self.assertEqual(args[0], "scraped_data") # table name
-        self.assertEqual(kwargs['if_exists'], 'append')
-        self.assertEqual(kwargs['index'], False)
-        
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.writer = StorageWriter(self.path)
+
+    def tearDown(self):
+        self.writer.close()
+        self.tmp.cleanup()
+
+    def rows(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(
+                "SELECT kategoria, wartosc, waluta, region, data_zdarzenia FROM scraped_data ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def test_save_products(self):
+        with patch('scraper.storage.storage_writer', self.writer):
+            save_products(PRODUCTS, "test_shop")
+
+        rows = self.rows()
+        self.assertEqual([row[:4] for row in rows], [
+            ("Test Product 1", 19.99, "USD", "test_shop"),
+            ("Test Product 2", 25.5, "EUR", "test_shop"),
+        ])
+        # Format daty jak przy pandas.to_sql: "YYYY-MM-DD HH:MM:SS.ffffff"
+        datetime.fromisoformat(rows[0][4])
+
     def test_save_products_empty_list(self):
-        # Arrange
-        products = []
-        source = "test_shop"
+        with patch('scraper.storage.storage_writer') as mock_writer:
+            save_products([], "test_shop")
+            mock_writer.write.assert_not_called()
+
+    def test_wal_and_single_connection(self):
+        self.writer.write(PRODUCTS, "a")
+        conn = self.writer._conn
+        self.writer.write(PRODUCTS, "b")
+        self.assertIs(self.writer._conn, conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(self.writer.stats()["commits"], 2)
+
+    def test_cycle_group_commit(self):
+        with self.writer.cycle():
+            self.writer.write(PRODUCTS, "a")
+            self.writer.write(PRODUCTS, "b")
+            self.assertEqual(self.writer.stats()["buffered"], 4)
+            self.assertEqual(self.writer.stats()["commits"], 0)
+
+        self.assertEqual(len(self.rows()), 4)
+        stats = self.writer.stats()
+        self.assertEqual((stats["rows"], stats["commits"], stats["buffered"]), (4, 1, 0))
+
+    def test_cycle_flushes_on_exception(self):
+        with self.assertRaises(KeyboardInterrupt):
+            with self.writer.cycle():
+                self.writer.write(PRODUCTS, "a")
+                raise KeyboardInterrupt
+        self.assertEqual(len(self.rows()), 2)
+
+    def test_skips_products_without_price(self):
+        saved = self.writer.write(PRODUCTS + [{"name": "Broken", "price": None, "currency": None}], "a")
+        self.assertEqual(saved, 2)
+        self.assertEqual(len(self.rows()), 2)
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.writer = StorageWriter(os.path.join(self.tmp.name, "test.db"))
+        self.queue = WriteBehindQueue(self.writer, maxsize=2)
+
+    def tearDown(self):
+        self.queue.close()
+        self.writer.close()
+        self.tmp.cleanup()
+
+    def count(self):
+        return self.writer._connection().execute("SELECT COUNT(*) FROM scraped_data").fetchone()[0]
+
+    def test_flush_writes_everything(self):
+        for source in ("a", "b", "c"):
+            self.queue.put(PRODUCTS, source)
+        self.queue.flush()
+
+        self.assertEqual(self.count(), 6)
+        stats = self.queue.stats()
+        self.assertEqual(stats["depth"], 0)
+        self.assertEqual(stats["batches"], 3)
+        self.assertGreaterEqual(stats["commits"], 1)
+        self.assertIsNotNone(stats["last_commit_ms"])
+
+    def test_coalesces_queued_batches(self):
+        # Zablokowany zapis: paczki czekają w kolejce i trafiają do bazy jedną transakcją
+        release = threading.Event()
+        write_many = self.writer.write_many
+        started = threading.Event()
+        calls = []
+
+        def slow_write(batches):
+            calls.append(len(batches))
+            started.set()
+            release.wait(5)
+            return write_many(batches)
+
+        with patch.object(self.writer, 'write_many', side_effect=slow_write):
+            self.queue.put(PRODUCTS, "first")
+            started.wait(5)
+            self.queue.put(PRODUCTS, "a")
+            self.queue.put(PRODUCTS, "b")
+            release.set()
+            self.queue.flush()
+
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(self.count(), 6)
+
+    def test_backpressure_blocks_when_full(self):
+        release = threading.Event()
+        write_many = self.writer.write_many
+        started = threading.Event()
+
+        def slow_write(batches):
+            started.set()
+            release.wait(5)
+            return write_many(batches)
+
+        with patch.object(self.writer, 'write_many', side_effect=slow_write):
+            self.queue.put(PRODUCTS, "first")
+            started.wait(5)
+            self.queue.put(PRODUCTS, "a")
+            self.queue.put(PRODUCTS, "b")  # kolejka pełna (maxsize=2)
+            producer = threading.Thread(target=self.queue.put, args=(PRODUCTS, "c"))
+            producer.start()
+            producer.join(0.05)
+            self.assertTrue(producer.is_alive())
+            release.set()
+            producer.join(5)
+            self.queue.flush()
+
+        self.assertEqual(self.queue.stats()["blocked"], 1)
+        self.assertEqual(self.count(), 8)
+
+    def test_close_flushes_and_stops_thread(self):
+        self.queue.put(PRODUCTS, "a")
+        thread = self.queue._thread
+        self.queue.close()
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.count(), 2)
+
+    def test_save_products_uses_queue(self):
+        with patch('scraper.storage.write_queue', self.queue):
+            save_products(PRODUCTS, "a")
+            self.queue.flush()
+        self.assertEqual(self.count(), 2)
+
+class TestNormalizedSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def create_legacy(self, rows):
+        conn = sqlite3.connect(self.path)
+        conn.execute("""
+            CREATE TABLE scraped_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data_zdarzenia TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                kategoria TEXT NOT NULL,
+                wartosc REAL NOT NULL,
+                waluta TEXT,
+                region TEXT NOT NULL
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO scraped_data (data_zdarzenia, kategoria, wartosc, waluta, region) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        conn.close()
+
+    def test_product_key_is_stable(self):
+        self.assertEqual(product_key("Shop A", "Bulbasaur"), product_key("Shop A", "Bulbasaur"))
+        self.assertNotEqual(product_key("Shop A", "Bulbasaur"), product_key("Shop B", "Bulbasaur"))
+        self.assertEqual(to_epoch("1970-01-02"), 86400)
+
+    def test_migrates_legacy_table(self):
+        self.create_legacy([
+            ("2023-01-01 10:00:00.123456", "Product 1", 100.0, "PLN", "ShopA"),
+            ("2023-01-02 10:00:00", "Product 1", 120.0, "PLN", "ShopA"),
+            ("2023-01-01 10:00:00", "Product 1", "1 050,00 zł", None, "ShopB"),
+        ])
+        writer = StorageWriter(self.path)
+        writer.init()
+        conn = writer._conn
+
+        tables = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE name LIKE 'scraped_data%'"))
+        self.assertEqual(tables, {"scraped_data": "view", "scraped_data_legacy": "table"})
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM regions").fetchone()[0], 2)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM products").fetchone()[0], 2)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0], 3)
+        self.assertEqual(
+            conn.execute("SELECT data_zdarzenia, wartosc FROM scraped_data WHERE region = 'ShopB'").fetchall(),
+            [("2023-01-01 10:00:00", 1050.0)],
+        )
+
+        # Kolejne zapisy korzystają z tych samych wpisów słowników
+        writer.write([{"name": "Product 1", "price": 130.0, "currency": "PLN"}], "ShopA")
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM products").fetchone()[0], 2)
+        writer.close()
+
+        # Migracja jest jednorazowa
+        writer = StorageWriter(self.path)
+        writer.init()
+        self.assertEqual(writer._conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0], 4)
+        writer.close()
+
+    def test_concurrent_migration_runs_once(self):
+        self.create_legacy([("2023-01-01 10:00:00", "Product 1", 100.0, "PLN", "ShopA")])
+        first = sqlite3.connect(self.path, isolation_level=None)
+        second = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+
+        # Drugi proces widzi jeszcze tabelę, a pierwszy migruje bazę, zanim drugi weźmie blokadę
+        checked = storage._object_type
+        stale = []
+        def stale_check(conn, name):
+            if conn is second and not stale:
+                stale.append(name)
+                self.assertEqual(migrate_legacy(first), 1)
+                return "table"
+            return checked(conn, name)
+
+        with patch('scraper.storage._object_type', side_effect=stale_check):
+            self.assertEqual(migrate_legacy(second), 0)
+        self.assertFalse(second.in_transaction)
+        self.assertEqual(second.execute("SELECT COUNT(*) FROM observations").fetchone()[0], 1)
+
+    def test_read_api(self):
+        writer = StorageWriter(self.path)
+        writer.write(PRODUCTS, "ShopA", datetime(2023, 1, 1, 10))
+        writer.write(PRODUCTS[:1], "ShopB", datetime(2023, 1, 2, 10))
+        writer.write(PRODUCTS[:1], "ShopA", datetime(2023, 1, 3, 10))
+        writer.close()
+
+        df = load_observations(path=self.path)
+        self.assertEqual(list(df.columns), ["data_zdarzenia", "kategoria", "wartosc", "waluta", "region"])
+        self.assertEqual(len(df), 4)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["data_zdarzenia"]))
+
+        df = load_observations(products=["Test Product 1"], regions=["ShopA"], path=self.path)
+        self.assertEqual(sorted(df["data_zdarzenia"].dt.day), [1, 3])
+
+        history = load_history("2023-01-02", "2023-01-03", path=self.path)
+        self.assertEqual(history, [("Test Product 1", 19.99, "ShopB", "2023-01-02 10:00:00")])
+
+    def test_queries_use_covering_indexes(self):
+        from scraper.storage import _observations_query
+        writer = StorageWriter(self.path)
+        writer.write(PRODUCTS, "ShopA")
+        for products in (None, ["Test Product 1"]):
+            query, params = _observations_query("o.ts, o.price", "2023-01-01", None, products, None)
+            plan = " ".join(row[3] for row in writer._conn.execute("EXPLAIN QUERY PLAN " + query, params))
+            self.assertIn("COVERING INDEX idx_observations_", plan)
+        writer.close()
+
+class TestIntervalStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.writer = StorageWriter(self.path, mode="intervals")
+
+    def tearDown(self):
+        self.writer.close()
+        self.tmp.cleanup()
+
+    def write(self, writer, day, price):
+        writer.write([{"name": "Product 1", "price": price, "currency": "PLN"}], "ShopA", datetime(2023, 1, day, 10))
+
+    def intervals(self):
+        return self.writer._connection().execute(
+            "SELECT datetime(valid_from, 'unixepoch'), datetime(valid_to, 'unixepoch'), "
+            "datetime(last_seen, 'unixepoch'), price FROM price_intervals ORDER BY id"
+        ).fetchall()
+
+    def test_unchanged_price_extends_interval(self):
+        for day, price in ((1, 100.0), (2, 100.0), (3, 100.0), (4, 120.0), (5, 120.0)):
+            self.write(self.writer, day, price)
+
+        self.assertEqual(self.intervals(), [
+            ("2023-01-01 10:00:00", "2023-01-04 10:00:00", "2023-01-03 10:00:00", 100.0),
+            ("2023-01-04 10:00:00", None, "2023-01-05 10:00:00", 120.0),
+        ])
+        self.assertEqual(self.writer._connection().execute("SELECT COUNT(*) FROM observations").fetchone()[0], 0)
+        stats = self.writer.stats()
+        self.assertEqual((stats["intervals_opened"], stats["intervals_extended"]), (2, 3))
+
+    def test_duplicate_names_keep_lowest_price(self):
+        # Dwa warianty o tej samej nazwie w jednym sklepie nie zamykają nawzajem przedziałów
+        for day in range(1, 6):
+            self.writer.write([{"name": "Laptop X", "price": 120.0, "currency": "PLN"},
+                               {"name": "Laptop X", "price": 100.0, "currency": "PLN"}],
+                              "ShopA", datetime(2023, 1, day, 10))
+
+        self.assertEqual(self.intervals(), [("2023-01-01 10:00:00", None, "2023-01-05 10:00:00", 100.0)])
+
+    def test_index_is_loaded_at_startup(self):
+        self.write(self.writer, 1, 100.0)
+        self.writer.close()
+
+        writer = StorageWriter(self.path, mode="intervals")
+        writer.init()
+        self.assertEqual(len(writer._open), 1)
+        self.write(writer, 2, 100.0)
+        writer.close()
+        self.assertEqual(len(self.intervals()), 1)
+
+    def test_stale_index_is_reloaded(self):
+        self.write(self.writer, 1, 100.0)
+        other = StorageWriter(self.path, mode="intervals")
+        self.write(other, 2, 90.0)
+        other.close()
+
+        # Indeks self.writer pamięta cenę 100 — inny proces zamknął ten przedział
+        self.write(self.writer, 3, 100.0)
+        self.assertEqual([row[3] for row in self.intervals()], [100.0, 90.0, 100.0])
+        self.assertEqual(sum(row[1] is None for row in self.intervals()), 1)
 
-        with patch('scraper.storage.pd.DataFrame') as mock_df:
-            # Act
-            save_products(products, source)
+    def test_reads_are_transparent(self):
+        for day, price in ((1, 100.0), (2, 100.0), (3, 100.0), (4, 120.0)):
+            self.write(self.writer, day, price)
+        self.writer.close()
 
-            # Assert
-            mock_df.assert_not_called()
+        df = load_observations(path=self.path)
+        self.assertEqual(
+            sorted(zip(df["data_zdarzenia"].dt.day, df["wartosc"])), [(1, 100.0), (3, 100.0), (4, 120.0)]
+        )
+        # Zakres dat przycina przedziały: cena obowiązująca na początku zakresu
+        history = load_history("2023-01-02 10:00:00", "2023-01-04 10:00:00", path=self.path)
+        self.assertEqual(sorted(history, key=lambda row: row[3]), [
+            ("Product 1", 100.0, "ShopA", "2023-01-02 10:00:00"),
+            ("Product 1", 100.0, "ShopA", "2023-01-03 10:00:00"),
+            ("Product 1", 120.0, "ShopA", "2023-01-04 10:00:00"),
+        ])
+        self.assertEqual(len(self.writer._connection().execute("SELECT * FROM scraped_data").fetchall()), 3)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+
+import os
+import tempfile
+import unittest
+from scraper.strategy import StrategyMemory
+
+LONG_HTML = "<html>" + "x" * 3000 + "</html>"
+
+class TestStrategyMemory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "fetch_strategy.json")
+        self.memory = StrategyMemory(path=self.path, reprobe_every=3)
+        self.url = "http://shop.com"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _js_only_cycle(self):
+        backend = self.memory.choose(self.url)
+        if backend == "requests":
+            self.memory.record_fetch(self.url, "requests", "<html>shell</html>")
+        self.memory.record_fetch(self.url, "selenium", LONG_HTML)
+        self.memory.record_result(self.url, 5)
+        return backend
+
+    def test_unknown_url_starts_with_requests(self):
+        self.assertEqual(self.memory.choose(self.url), "requests")
+
+    def test_js_only_shop_goes_straight_to_selenium(self):
+        # Act
+        first = self._js_only_cycle()
+        second = self.memory.choose(self.url)
+
+        # Assert
+        self.assertEqual(first, "requests")
+        self.assertEqual(second, "selenium")
+        stats = self.memory.entries[self.url]
+        self.assertEqual(stats["last_backend"], "selenium")
+        self.assertEqual(stats["backends"]["selenium"]["avg_size"], len(LONG_HTML))
+
+    def test_empty_parse_result_counts_as_failure(self):
+        # Arrange
+        self.memory.record_fetch(self.url, "requests", LONG_HTML)
+
+        # Act
+        self.memory.record_result(self.url, 0)
+
+        # Assert
+        self.assertEqual(self.memory.entries[self.url]["backends"]["requests"]["success_rate"], 0.0)
+
+    def test_periodic_reprobe_of_requests(self):
+        # Arrange
+        self._js_only_cycle()
+
+        # Act
+        choices = [self._js_only_cycle() for _ in range(3)]
+
+        # Assert
+        self.assertEqual(choices, ["selenium", "selenium", "requests"])
+
+    def test_successful_reprobe_switches_back(self):
+        # Arrange
+        self._js_only_cycle()
+
+        # Act
+        self.memory.record_fetch(self.url, "requests", LONG_HTML)
+        self.memory.record_result(self.url, 3)
+
+        # Assert
+        self.assertEqual(self.memory.choose(self.url), "requests")
+
+    def test_save_and_reload(self):
+        # Arrange
+        self._js_only_cycle()
+
+        # Act
+        self.memory.save()
+        reloaded = StrategyMemory(path=self.path)
+
+        # Assert
+        self.assertEqual(reloaded.choose(self.url), "selenium")
+
+if __name__ == '__main__':
+    unittest.main()
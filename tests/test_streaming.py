@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from scraper.extractors import EXTRACTORS
+from scraper.parser import get_parse_engine, parse_products
+from scraper.streaming import ProductStream, can_stream
+
+ITEM = ('<div class="thumbnail"><div class="caption"><h4 class="pull-right price">${i}.99</h4>'
+        '<h4><a class="title" title="Laptop {i}" href="#">Laptop {i}</a></h4></div></div>')
+PAGE = ("<html><head><script>var tracking = {{}};</script></head><body><nav>Menu</nav>"
+        + "".join(ITEM.format(i=i) for i in range(20)) + "<footer>Stopka 2 €</footer></body></html>")
+PAGE = PAGE.replace("{{}}", "{}")
+
+def _chunks(data, size=100):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class TestIterProducts(unittest.TestCase):
+
+    def test_matches_full_parse(self):
+        engine = get_parse_engine("lxml")
+        products = list(engine.iter_products(_chunks(PAGE.encode("utf-8")), EXTRACTORS["webscraper.io"], "utf-8"))
+        self.assertEqual(products, parse_products(PAGE, "https://webscraper.io/laptops", engine="bs4"))
+        self.assertEqual(len(products), 20)
+
+    def test_yields_before_download_finishes(self):
+        engine = get_parse_engine("lxml")
+        fed = []
+
+        def chunks():
+            for chunk in _chunks(PAGE.encode("utf-8")):
+                fed.append(chunk)
+                yield chunk
+
+        first = next(engine.iter_products(chunks(), EXTRACTORS["webscraper.io"], "utf-8"))
+        self.assertEqual(first["name"], "Laptop 0")
+        self.assertLess(len(fed), len(_chunks(PAGE.encode("utf-8"))) / 2)
+
+    def test_truncated_page(self):
+        engine = get_parse_engine("lxml")
+        data = PAGE.encode("utf-8")[:len(PAGE) // 2]
+        products = list(engine.iter_products([data], EXTRACTORS["webscraper.io"], "utf-8"))
+        self.assertGreater(len(products), 0)
+
+class TestProductStream(unittest.TestCase):
+
+    def setUp(self):
+        for target in ('scraper.streaming.robot_manager', 'scraper.streaming.limiter',
+                       'scraper.streaming.validator_cache'):
+            patcher = patch(target)
+            mock = patcher.start()
+            self.addCleanup(patcher.stop)
+            setattr(self, "mock_" + target.rsplit(".", 1)[1], mock)
+        self.mock_robot_manager.can_fetch.return_value = True
+        self.mock_validator_cache.conditional_headers.return_value = {}
+
+    def _response(self, status_code=200, content_type="text/html"):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {"Content-Type": content_type}
+        response.elapsed.total_seconds.return_value = 0.2
+        response.iter_content.return_value = iter(_chunks(PAGE.encode("utf-8"), 512))
+        return response
+
+    @patch('scraper.streaming.session_manager.get')
+    def test_streams_products(self, mock_get):
+        # Arrange
+        mock_get.return_value = self._response()
+
+        # Act
+        stream = ProductStream("https://webscraper.io/laptops")
+        products = list(stream)
+
+        # Assert
+        self.assertEqual(len(products), 20)
+        self.assertEqual(products[0]["currency"], "USD")
+        mock_get.assert_called_once_with("https://webscraper.io/laptops", timeout=10, stream=True)
+        self.mock_limiter.wait.assert_called_once_with("https://webscraper.io/laptops")
+        self.mock_validator_cache.record_miss.assert_called_once()
+        self.assertIsNotNone(stream.first_product_ms)
+
+    @patch('scraper.streaming.session_manager.get')
+    def test_not_modified(self, mock_get):
+        # Arrange
+        self.mock_validator_cache.conditional_headers.return_value = {"If-None-Match": '"v1"'}
+        mock_get.return_value = self._response(status_code=304)
+
+        # Act
+        stream = ProductStream("https://webscraper.io/laptops")
+        products = list(stream)
+
+        # Assert
+        self.assertEqual(products, [])
+        self.assertTrue(stream.not_modified)
+        self.mock_validator_cache.record_hit.assert_called_once_with("https://webscraper.io/laptops")
+
+    @patch('scraper.streaming.session_manager.get')
+    def test_429_retries_once(self, mock_get):
+        # Arrange
+        mock_get.side_effect = [self._response(status_code=429), self._response()]
+
+        # Act
+        products = list(ProductStream("https://webscraper.io/laptops"))
+
+        # Assert
+        self.assertEqual(len(products), 20)
+        self.mock_limiter.handle_error_429.assert_called_once()
+
+    def test_robots_disallowed(self):
+        self.mock_robot_manager.can_fetch.return_value = False
+        self.assertEqual(list(ProductStream("https://webscraper.io/laptops")), [])
+
+    def test_can_stream_only_registered_domains(self):
+        self.assertTrue(can_stream("https://webscraper.io/laptops"))
+        self.assertFalse(can_stream("https://unknown.example/"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from scraper.structured import extract_json_ld, extract_microdata, has_json_ld, has_microdata
+from scraper.parser import parse_page, parse_products, parse_path_stats
+
+JSON_LD_PRODUCT = """
+<html><head>
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@type": "Product", "name": "Laptop X",
+ "offers": {"@type": "Offer", "price": "1299.99", "priceCurrency": "usd"}}
+</script>
+</head><body><div class="thumbnail"><h4 class="pull-right price">$1.00</h4><a class="title">Wrong</a></div></body></html>
+"""
+
+JSON_LD_LIST = """
+<script type='application/ld+json'>
+{"@context": "https://schema.org", "@graph": [
+  {"@type": "BreadcrumbList", "itemListElement": []},
+  {"@type": "ItemList", "itemListElement": [
+    {"@type": "ListItem", "position": 1, "item": {"@type": "Product", "name": "A",
+      "offers": {"@type": "AggregateOffer", "lowPrice": 5, "priceCurrency": "EUR"}}},
+    {"@type": "ListItem", "position": 2, "item": {"@type": ["Product", "Book"], "name": "B",
+      "offers": [{"@type": "Offer", "price": 7.5, "priceCurrency": "GBP"}]}}
+  ]}
+]}
+</script>
+"""
+
+MICRODATA = """
+<div itemscope itemtype="https://schema.org/Product">
+  <h2 itemprop="name">Lamp</h2>
+  <div itemprop="offers" itemscope itemtype="https://schema.org/Offer">
+    <span itemprop="price" content="19.99">19,99 zł</span>
+    <meta itemprop="priceCurrency" content="PLN">
+  </div>
+</div>
+<div itemscope itemtype="https://schema.org/Product">
+  <h2 itemprop="name">Desk</h2><span itemprop="price">£120.00</span>
+</div>
+"""
+
+class TestStructuredData(unittest.TestCase):
+
+    def test_json_ld_product(self):
+        self.assertEqual(extract_json_ld(JSON_LD_PRODUCT),
+                         [{"name": "Laptop X", "price": 1299.99, "currency": "USD"}])
+
+    def test_json_ld_item_list_in_graph(self):
+        self.assertEqual(extract_json_ld(JSON_LD_LIST), [
+            {"name": "A", "price": 5.0, "currency": "EUR"},
+            {"name": "B", "price": 7.5, "currency": "GBP"},
+        ])
+
+    def test_json_ld_invalid_or_without_products(self):
+        self.assertIsNone(extract_json_ld('<script type="application/ld+json">{broken</script>'))
+        self.assertIsNone(extract_json_ld('<script type="application/ld+json">{"@type": "Organization"}</script>'))
+
+    def test_microdata(self):
+        self.assertTrue(has_microdata(MICRODATA))
+        self.assertEqual(extract_microdata(MICRODATA), [
+            {"name": "Lamp", "price": 19.99, "currency": "PLN"},
+            {"name": "Desk", "price": 120.0, "currency": None},
+        ])
+
+    def test_cheap_detection(self):
+        self.assertFalse(has_json_ld("<div class='product'></div>"))
+        self.assertFalse(has_microdata("<div class='product'></div>"))
+
+class TestParsePaths(unittest.TestCase):
+
+    def test_structured_data_wins_over_css(self):
+        products, path = parse_page(JSON_LD_PRODUCT, "https://webscraper.io/laptop-x")
+        self.assertEqual(path, "json-ld")
+        self.assertEqual(products[0]["name"], "Laptop X")
+
+    def test_paths(self):
+        self.assertEqual(parse_page(MICRODATA)[1], "microdata")
+        self.assertEqual(parse_page('<div class="thumbnail"><h4 class="pull-right price">$1</h4>'
+                                    '<a class="title">T</a></div>')[1], "css")
+        self.assertEqual(parse_page("<div>nothing</div>"), ([], "none"))
+
+    def test_counter_per_source_url(self):
+        url = "https://structured.example/counter"
+        parse_products(JSON_LD_PRODUCT, url)
+        parse_products(JSON_LD_PRODUCT, url)
+        parse_products("<div>nothing</div>", url)
+        self.assertEqual(parse_path_stats[url]["json-ld"], 2)
+        self.assertEqual(parse_path_stats[url]["none"], 1)
+
+if __name__ == '__main__':
+    unittest.main()